@@ -12,8 +12,8 @@ from alembic import context
 from app.core.config import settings
 from app.db.base_class import Base
 from app.models.user import User  # noqa
-from app.models.portfolio import Portfolio, Transaction # noqa
-from app.models.conversation import AIConversation # noqa
+from app.models.portfolio import Portfolio, Transaction, PositionSnapshot # noqa
+from app.models.conversation import AIConversation, AIConversationTurn # noqa
 
 
 # this is the Alembic Config object, which provides
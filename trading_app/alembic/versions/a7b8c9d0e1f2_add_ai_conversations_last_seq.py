@@ -0,0 +1,40 @@
+"""Add per-conversation turn counter to ai_conversations
+
+Revision ID: a7b8c9d0e1f2
+Revises: f6a7b8c9d0e1
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7b8c9d0e1f2'
+down_revision: Union[str, None] = 'f6a7b8c9d0e1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The conversation writer allocates turn sequence numbers from this
+    # counter, so it must start at the highest seq already stored.
+    op.add_column('ai_conversations',
+    sa.Column('last_seq', sa.Integer(), server_default='0', nullable=False),
+    schema='app_data'
+    )
+    op.execute("""
+        UPDATE app_data.ai_conversations AS c
+        SET last_seq = t.max_seq
+        FROM (
+            SELECT conversation_id, max(seq) AS max_seq
+            FROM app_data.ai_conversation_turns
+            GROUP BY conversation_id
+        ) AS t
+        WHERE c.id = t.conversation_id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_column('ai_conversations', 'last_seq', schema='app_data')
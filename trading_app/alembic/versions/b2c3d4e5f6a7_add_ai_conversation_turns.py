@@ -0,0 +1,72 @@
+
+"""Add append-only ai_conversation_turns table
+
+Revision ID: b2c3d4e5f6a7
+Revises: a1b2c3d4e5f6
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'b2c3d4e5f6a7'
+down_revision: Union[str, None] = 'a1b2c3d4e5f6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('ai_conversation_turns',
+    sa.Column('conversation_id', sa.UUID(), nullable=False),
+    sa.Column('seq', sa.Integer(), nullable=False),
+    sa.Column('role', sa.String(length=16), nullable=False),
+    sa.Column('content', sa.Text(), nullable=False),
+    sa.Column('token_count', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['conversation_id'], ['app_data.ai_conversations.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('conversation_id', 'seq'),
+    schema='app_data'
+    )
+    # Explode every existing history blob into one row per message, keeping
+    # the original order. Token counts use the same ~4 chars/token estimate
+    # as the application.
+    op.execute("""
+        INSERT INTO app_data.ai_conversation_turns
+            (conversation_id, seq, role, content, token_count, created_at)
+        SELECT c.id,
+               t.ordinality,
+               COALESCE(t.message->>'role', 'user'),
+               COALESCE(t.message->>'content', ''),
+               GREATEST(1, length(COALESCE(t.message->>'content', '')) / 4),
+               c.created_at
+        FROM app_data.ai_conversations AS c
+        CROSS JOIN LATERAL jsonb_array_elements(c.history) WITH ORDINALITY AS t(message, ordinality)
+        WHERE jsonb_typeof(c.history) = 'array'
+    """)
+    # The blob is kept for existing rows but is no longer written.
+    op.alter_column('ai_conversations', 'history',
+               existing_type=postgresql.JSONB(astext_type=sa.Text()),
+               nullable=True,
+               schema='app_data')
+
+
+def downgrade() -> None:
+    # Rebuild blobs for conversations created after the upgrade.
+    op.execute("""
+        UPDATE app_data.ai_conversations AS c
+        SET history = COALESCE((
+            SELECT jsonb_agg(jsonb_build_object('role', t.role, 'content', t.content) ORDER BY t.seq)
+            FROM app_data.ai_conversation_turns AS t
+            WHERE t.conversation_id = c.id
+        ), '[]'::jsonb)
+        WHERE c.history IS NULL
+    """)
+    op.alter_column('ai_conversations', 'history',
+               existing_type=postgresql.JSONB(astext_type=sa.Text()),
+               nullable=False,
+               schema='app_data')
+    op.drop_table('ai_conversation_turns', schema='app_data')
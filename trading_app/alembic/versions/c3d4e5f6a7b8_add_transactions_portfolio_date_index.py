@@ -0,0 +1,25 @@
+
+"""Add (portfolio_id, transaction_date, id) index on transactions
+
+Revision ID: c3d4e5f6a7b8
+Revises: b2c3d4e5f6a7
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3d4e5f6a7b8'
+down_revision: Union[str, None] = 'b2c3d4e5f6a7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_app_data_transactions_portfolio_date_id', 'transactions', ['portfolio_id', 'transaction_date', 'id'], unique=False, schema='app_data')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_app_data_transactions_portfolio_date_id', table_name='transactions', schema='app_data')
@@ -0,0 +1,53 @@
+
+"""Add position_snapshots table
+
+Revision ID: d4e5f6a7b8c9
+Revises: c3d4e5f6a7b8
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4e5f6a7b8c9'
+down_revision: Union[str, None] = 'c3d4e5f6a7b8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('position_snapshots',
+    sa.Column('portfolio_id', sa.UUID(), nullable=False),
+    sa.Column('instrument_ticker', sa.String(length=20), nullable=False),
+    sa.Column('buy_quantity', sa.Numeric(precision=28, scale=8), nullable=False),
+    sa.Column('buy_cost', sa.Numeric(precision=28, scale=8), nullable=False),
+    sa.Column('sell_quantity', sa.Numeric(precision=28, scale=8), nullable=False),
+    sa.Column('sell_proceeds', sa.Numeric(precision=28, scale=8), nullable=False),
+    sa.Column('transaction_count', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['portfolio_id'], ['app_data.portfolios.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('portfolio_id', 'instrument_ticker'),
+    schema='app_data'
+    )
+    # Seed snapshots from the existing history.
+    op.execute("""
+        INSERT INTO app_data.position_snapshots
+            (portfolio_id, instrument_ticker, buy_quantity, buy_cost,
+             sell_quantity, sell_proceeds, transaction_count)
+        SELECT portfolio_id,
+               instrument_ticker,
+               COALESCE(SUM(quantity) FILTER (WHERE transaction_type = 'BUY'), 0),
+               COALESCE(SUM(quantity * price) FILTER (WHERE transaction_type = 'BUY'), 0),
+               COALESCE(SUM(quantity) FILTER (WHERE transaction_type <> 'BUY'), 0),
+               COALESCE(SUM(quantity * price) FILTER (WHERE transaction_type <> 'BUY'), 0),
+               COUNT(*)
+        FROM app_data.transactions
+        GROUP BY portfolio_id, instrument_ticker
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('position_snapshots', schema='app_data')
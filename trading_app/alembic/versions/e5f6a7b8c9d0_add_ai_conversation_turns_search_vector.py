@@ -0,0 +1,37 @@
+"""Add full-text search vector and GIN index on ai_conversation_turns
+
+Revision ID: e5f6a7b8c9d0
+Revises: d4e5f6a7b8c9
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5f6a7b8c9d0'
+down_revision: Union[str, None] = 'd4e5f6a7b8c9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Turns hold every message, including those migrated out of the legacy
+    # history blobs, so they are what gets searched. Adding a stored
+    # generated column rewrites the table under an exclusive lock; run this
+    # in a maintenance window on large installs.
+    op.add_column('ai_conversation_turns',
+    sa.Column('search_vector', postgresql.TSVECTOR(),
+              sa.Computed("to_tsvector('english'::regconfig, content)", persisted=True),
+              nullable=True),
+    schema='app_data'
+    )
+    op.create_index('ix_app_data_ai_conversation_turns_search_vector', 'ai_conversation_turns', ['search_vector'], unique=False, schema='app_data', postgresql_using='gin')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_app_data_ai_conversation_turns_search_vector', table_name='ai_conversation_turns', schema='app_data', postgresql_using='gin')
+    op.drop_column('ai_conversation_turns', 'search_vector', schema='app_data')
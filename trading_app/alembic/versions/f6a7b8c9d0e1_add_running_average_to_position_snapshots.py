@@ -0,0 +1,69 @@
+"""Add running average cost to position_snapshots
+
+Revision ID: f6a7b8c9d0e1
+Revises: e5f6a7b8c9d0
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from decimal import Decimal
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'f6a7b8c9d0e1'
+down_revision: Union[str, None] = 'e5f6a7b8c9d0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    for name in ('held_quantity', 'held_cost', 'realized_pnl'):
+        op.add_column('position_snapshots',
+        sa.Column(name, sa.Numeric(precision=28, scale=8), server_default='0', nullable=False),
+        schema='app_data'
+        )
+    op.add_column('position_snapshots',
+    sa.Column('last_transaction_date', sa.DateTime(timezone=True), nullable=True),
+    schema='app_data'
+    )
+    # The running average depends on order, so it cannot be summed in SQL;
+    # replay each ticker's history (sells beyond the quantity held are left
+    # unmatched, the average resets when the position is closed).
+    connection = op.get_bind()
+    rows = connection.execute(sa.text("""
+        SELECT portfolio_id, instrument_ticker, transaction_type, quantity, price, transaction_date
+        FROM app_data.transactions
+        ORDER BY portfolio_id, instrument_ticker, transaction_date, id
+    """))
+    states = {}
+    for portfolio_id, ticker, transaction_type, quantity, price, date in rows:
+        held, cost, realized, _ = states.get((portfolio_id, ticker), (Decimal(0), Decimal(0), Decimal(0), None))
+        if transaction_type == 'BUY':
+            held, cost = held + quantity, cost + quantity * price
+        elif held > 0:
+            matched = min(quantity, held)
+            average = cost / held
+            realized += matched * (price - average)
+            held -= matched
+            cost = cost - matched * average if held else Decimal(0)
+        states[(portfolio_id, ticker)] = (held, cost, realized, date)
+    if states:
+        connection.execute(sa.text("""
+            UPDATE app_data.position_snapshots
+            SET held_quantity = :held_quantity, held_cost = :held_cost,
+                realized_pnl = :realized_pnl, last_transaction_date = :last_transaction_date
+            WHERE portfolio_id = :portfolio_id AND instrument_ticker = :instrument_ticker
+        """), [
+            {
+                'portfolio_id': portfolio_id, 'instrument_ticker': ticker, 'held_quantity': held,
+                'held_cost': cost, 'realized_pnl': realized, 'last_transaction_date': date,
+            }
+            for (portfolio_id, ticker), (held, cost, realized, date) in states.items()
+        ])
+
+
+def downgrade() -> None:
+    for name in ('last_transaction_date', 'realized_pnl', 'held_cost', 'held_quantity'):
+        op.drop_column('position_snapshots', name, schema='app_data')
@@ -1,21 +1,25 @@
 
 # trading_app/app/api/deps.py
+from typing import AsyncGenerator, Callable
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.admission import AdmissionSlot, admission_controller
 from app.core.config import settings
-from app.db.session import get_db
+from app.db.session import get_read_db
 from app.models.user import User
 from app.schemas.token import TokenData
 from app.crud import crud_user
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
-async def get_current_user(
-    db: AsyncSession = Depends(get_db), token: str = Depends(oauth2_scheme)
-) -> User:
+async def get_user_from_token(db: AsyncSession, token: str) -> User:
+    """
+    Resolves a bearer token to an active user. Shared by the HTTP dependency
+    below and by WebSocket endpoints, which cannot use OAuth2PasswordBearer.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -29,7 +33,32 @@ async def get_current_user(
         token_data = TokenData(email=email)
     except JWTError:
         raise credentials_exception
-    user = await crud_user.get_user_by_email(db, email=token_data.email)
+    user = await crud_user.get_cached_user_by_email(db, email=token_data.email)
     if user is None:
         raise credentials_exception
-    return user
\ No newline at end of file
+    if not user.is_active:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Inactive user")
+    return user
+async def get_current_user(
+    db: AsyncSession = Depends(get_read_db), token: str = Depends(oauth2_scheme)
+) -> User:
+    return await get_user_from_token(db, token)
+
+def admit(route_class: str) -> Callable[..., AsyncGenerator[AdmissionSlot, None]]:
+    """
+    Dependency factory for admission control: rate-limits the current user
+    and holds a slot of `route_class` ("chat", "analytics" or "crud") for
+    the duration of the request. Streaming endpoints return an
+    AdmittedStreamingResponse, which keeps the slot until the body is done.
+    """
+    async def dependency(
+        current_user: User = Depends(get_current_user),
+    ) -> AsyncGenerator[AdmissionSlot, None]:
+        slot = await admission_controller.admit(route_class, current_user.id)
+        try:
+            yield slot
+        finally:
+            if not slot.kept:
+                slot.release()
+
+    return dependency
@@ -1,36 +1,91 @@
 
 # trading_app/app/api/v1/ai.py
-from fastapi import APIRouter, Depends, Body
+import asyncio
+import base64
+import binascii
+import time
+import uuid
+from typing import AsyncIterator
+
+import orjson
+from fastapi import APIRouter, Depends, Body, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api import deps
 from app.clients.librarian import librarian_client
-from app.db.session import get_db
+from app.core.admission import AdmissionSlot, AdmittedStreamingResponse
+from app.core.conditional import response_cache
+from app.core.config import settings
+from app.db.session import get_read_db
 from app.models.user import User
-from app.schemas.ai import AIChatRequest, AIChatResponse
+from app.schemas.ai import (
+    AIBatchChatRequest,
+    AIChatRequest,
+    AIChatResponse,
+    ConversationSearchHit,
+    ConversationSearchPage,
+    ConversationTurnPage,
+)
 from app.crud import crud_conversation
 
 router = APIRouter()
 
-@router.post("/chat", response_model=AIChatResponse)
+def _sse(event: str, data: dict) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(data) + b"\n\n"
+
+def _encode_search_cursor(hit: ConversationSearchHit) -> str:
+    raw = orjson.dumps([hit.rank, str(hit.conversation_id), hit.seq])
+    return base64.urlsafe_b64encode(raw).decode()
+
+def _decode_search_cursor(cursor: str) -> tuple[float, uuid.UUID, int]:
+    try:
+        rank, conversation_id, seq = orjson.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(rank), uuid.UUID(conversation_id), int(seq)
+    except (binascii.Error, orjson.JSONDecodeError, TypeError, ValueError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+async def _load_context(
+    db: AsyncSession, user: User, conversation_id: uuid.UUID | None
+) -> list[dict]:
+    """
+    Returns the bounded history window to send to the Librarian (empty for
+    a new conversation).
+    """
+    context = await crud_conversation.get_chat_context(
+        db,
+        user_id=user.id,
+        conversation_id=conversation_id,
+        max_turns=settings.CONVERSATION_HISTORY_MAX_TURNS,
+        max_tokens=settings.CONVERSATION_HISTORY_MAX_TOKENS,
+    )
+    if context is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Conversation not found")
+    return context
+
+@router.post("/chat", response_model=AIChatResponse, dependencies=[Depends(deps.admit("chat"))])
 async def chat_with_ai(
     request: AIChatRequest = Body(...),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(deps.get_current_user),
 ):
     """
     Proxy endpoint for the Librarian RAG service.
     """
+    history = await _load_context(db, current_user, request.conversation_id)
+
     # 1. Call the external Librarian service
     librarian_response = await librarian_client.query(
         user_id=str(current_user.id),
-        prompt=request.prompt
+        prompt=request.prompt,
+        conversation_history=history,
+        use_cache=request.use_cache,
     )
 
-    # 2. Persist the conversation turn in our database for this user
-    saved_convo = await crud_conversation.save_conversation(
-        db=db,
+    # 2. Queue the conversation turn for persistence (write-behind)
+    conversation_id = await crud_conversation.queue_turn(
         user_id=current_user.id,
+        conversation_id=request.conversation_id,
         prompt=request.prompt,
         response=librarian_response
     )
@@ -38,6 +93,217 @@ async def chat_with_ai(
     # 3. Return the response to the client
     return AIChatResponse(
         answer=librarian_response.get("answer", "No answer found."),
-        conversation_id=str(saved_convo.id),
+        conversation_id=str(conversation_id),
         sources=librarian_response.get("sources", [])
-    )
\ No newline at end of file
+    )
+
+@router.post("/chat/stream", response_class=StreamingResponse)
+async def chat_with_ai_stream(
+    request: AIChatRequest = Body(...),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(deps.get_current_user),
+    slot: AdmissionSlot = Depends(deps.admit("chat")),
+):
+    """
+    Streaming variant of `/chat`. Forwards the Librarian answer as
+    Server-Sent Events: one `token` event per chunk, then a `done` event
+    carrying the conversation id once the turn has been persisted.
+    """
+    user_id = current_user.id
+    history = await _load_context(db, current_user, request.conversation_id)
+    chunks = librarian_client.stream_query(
+        user_id=str(user_id), prompt=request.prompt, conversation_history=history
+    )
+
+    # Wait for the first chunk before committing to a 200, so that an
+    # unreachable Librarian still surfaces as a regular 503.
+    try:
+        first_chunk = await anext(chunks)
+    except StopAsyncIteration:
+        first_chunk = None
+
+    async def all_chunks() -> AsyncIterator[dict]:
+        if first_chunk is not None:
+            yield first_chunk
+        async for chunk in chunks:
+            yield chunk
+
+    async def event_stream() -> AsyncIterator[bytes]:
+        answer_parts: list[str] = []
+        sources: list[dict] = []
+        try:
+            async for chunk in all_chunks():
+                token = chunk.get("token")
+                if token:
+                    answer_parts.append(token)
+                    yield _sse("token", {"token": token})
+                if "sources" in chunk:
+                    sources = chunk["sources"]
+        except HTTPException as e:
+            yield _sse("error", {"detail": e.detail})
+            return
+
+        conversation_id = await crud_conversation.queue_turn(
+            user_id=user_id,
+            conversation_id=request.conversation_id,
+            prompt=request.prompt,
+            response={"answer": "".join(answer_parts), "sources": sources},
+        )
+        yield _sse("done", {"conversation_id": str(conversation_id), "sources": sources})
+
+    # The chat slot stays held until the stream ends, not just until here.
+    return AdmittedStreamingResponse(
+        event_stream(),
+        slot=slot,
+        media_type="text/event-stream",
+        # Stop Nginx from buffering the stream, which would defeat its purpose.
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post("/chat/batch", response_class=StreamingResponse)
+async def chat_with_ai_batch(
+    request: AIBatchChatRequest = Body(...),
+    current_user: User = Depends(deps.get_current_user),
+    slot: AdmissionSlot = Depends(deps.admit("chat")),
+):
+    """
+    Answers independent prompts (e.g. one per watchlist ticker) concurrently,
+    using the Librarian batch endpoint when one is configured. Every
+    Librarian call in flight holds a chat slot: the request's own, plus
+    whatever extra slots the user's chat allowance has free when the stream
+    starts, up to AI_BATCH_CONCURRENCY in total. Streams NDJSON: one
+    `{"index", "answer", "sources"}` or `{"index", "error"}` line per prompt
+    as it completes, then `{"done": true, "conversation_id", ...}`. The
+    answered prompts are saved as one new conversation, in prompt order,
+    with a single write.
+    """
+    if len(request.prompts) > settings.AI_BATCH_MAX_PROMPTS:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"At most {settings.AI_BATCH_MAX_PROMPTS} prompts per batch",
+        )
+    user_id = current_user.id
+    prompts = request.prompts
+    chunk_size = settings.LIBRARIAN_BATCH_SIZE if librarian_client.batch_api_url else 1
+    chunks = [list(range(start, min(start + chunk_size, len(prompts)))) for start in range(0, len(prompts), chunk_size)]
+
+    async def answer_chunk(indices: list[int], semaphore: asyncio.Semaphore) -> list[dict]:
+        async with semaphore:
+            try:
+                if librarian_client.batch_api_url:
+                    responses = await librarian_client.batch_query(
+                        user_id=str(user_id), prompts=[prompts[i] for i in indices], use_cache=request.use_cache
+                    )
+                else:
+                    responses = [
+                        await librarian_client.query(
+                            user_id=str(user_id), prompt=prompts[indices[0]], use_cache=request.use_cache
+                        )
+                    ]
+            except HTTPException as e:
+                return [{"index": i, "error": e.detail} for i in indices]
+        return [
+            {
+                "index": i,
+                "answer": response.get("answer", "No answer found."),
+                "sources": response.get("sources", []),
+            }
+            for i, response in zip(indices, responses)
+        ]
+
+    async def results() -> AsyncIterator[bytes]:
+        # Taken here rather than in the endpoint so the `finally` below is
+        # guaranteed to give them back.
+        extra_slots = 0
+        started = time.perf_counter()
+        while extra_slots < min(settings.AI_BATCH_CONCURRENCY, len(chunks)) - 1 and slot.pool.try_acquire(user_id):
+            extra_slots += 1
+        semaphore = asyncio.Semaphore(1 + extra_slots)
+        tasks = [asyncio.create_task(answer_chunk(indices, semaphore)) for indices in chunks]
+        try:
+            answered: dict[int, dict] = {}
+            for next_done in asyncio.as_completed(tasks):
+                for item in await next_done:
+                    if "answer" in item:
+                        answered[item["index"]] = item
+                    yield orjson.dumps(item) + b"\n"
+
+            conversation_id = None
+            if answered:
+                conversation_id = await crud_conversation.queue_exchanges(
+                    user_id=user_id,
+                    conversation_id=None,
+                    exchanges=[(prompts[i], answered[i]) for i in sorted(answered)],
+                )
+            yield orjson.dumps({
+                "done": True,
+                "conversation_id": str(conversation_id) if conversation_id else None,
+                "answered": len(answered),
+                "failed": len(prompts) - len(answered),
+            }) + b"\n"
+        finally:
+            for task in tasks:
+                task.cancel()
+            for _ in range(extra_slots):
+                slot.pool.release(user_id, time.perf_counter() - started)
+
+    return AdmittedStreamingResponse(results(), slot=slot, media_type="application/x-ndjson")
+
+
+@router.get(
+    "/conversations/search", response_model=ConversationSearchPage, dependencies=[Depends(deps.admit("analytics"))]
+)
+async def search_conversations(
+    q: str = Query(..., min_length=1, max_length=200),
+    cursor: str | None = None,
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(deps.get_current_user),
+):
+    """
+    Searches the caller's conversation messages, best match first, with a
+    highlighted snippet per hit. `q` takes web search syntax: words,
+    "quoted phrases", OR and -excluded words. Pass `next_cursor` back as
+    `cursor` with the same `q` for the next page.
+    """
+    after = _decode_search_cursor(cursor) if cursor else None
+    rows = await crud_conversation.search_turns(
+        db, user_id=current_user.id, text=q, after=after, limit=limit
+    )
+    hits = [ConversationSearchHit.model_validate(row) for row in rows]
+    next_cursor = _encode_search_cursor(hits[-1]) if len(hits) == limit else None
+    return ConversationSearchPage(hits=hits, next_cursor=next_cursor)
+
+
+@router.get(
+    "/conversations/{conversation_id}/turns", response_model=ConversationTurnPage, dependencies=[Depends(deps.admit("crud"))]
+)
+async def read_conversation_turns(
+    request: Request,
+    conversation_id: uuid.UUID,
+    before_seq: int | None = Query(None, ge=1),
+    limit: int = Query(50, ge=1, le=200),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(deps.get_current_user),
+):
+    """
+    Pages backwards through a conversation. Each page is one index range
+    scan on (conversation_id, seq), so cost does not grow with length.
+    Supports If-None-Match; the ETag changes when new turns are persisted.
+    """
+    async def build() -> ConversationTurnPage:
+        conversation = await crud_conversation.get_conversation(
+            db, conversation_id=conversation_id, user_id=current_user.id
+        )
+        if conversation is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Conversation not found")
+        newest_first = await crud_conversation.get_turns_page(
+            db, conversation_id=conversation_id, before_seq=before_seq, limit=limit
+        )
+        next_before_seq = newest_first[-1].seq if len(newest_first) == limit else None
+        return ConversationTurnPage(turns=newest_first[::-1], next_before_seq=next_before_seq)
+
+    return await response_cache.respond(
+        request, user_id=current_user.id, scopes=[f"conversation:{conversation_id}"], build=build
+    )
@@ -9,6 +9,7 @@ from app.schemas import user as user_schema
 from app.schemas import token as token_schema
 from app.crud import crud_user
 from app.core import security
+from app.core.hashing import password_hasher
 from app.db.session import get_db
 
 router = APIRouter()
@@ -31,8 +32,16 @@ async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
 ):
     user = await crud_user.get_user_by_email(db, email=form_data.username)
-    if not user or not security.verify_password(form_data.password, user.hashed_password):
+    if not user:
         raise HTTPException(status_code=400, detail="Incorrect email or password")
+    verified, new_hash = await password_hasher.verify_and_update(
+        form_data.password, user.hashed_password
+    )
+    if not verified:
+        raise HTTPException(status_code=400, detail="Incorrect email or password")
+    if new_hash:
+        # The stored hash uses an outdated bcrypt cost; upgrade it transparently.
+        await crud_user.update_password_hash(db, db_user=user, hashed_password=new_hash)
     
     access_token_expires = timedelta(minutes=security.settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = security.create_access_token(
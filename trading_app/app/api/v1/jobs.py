@@ -0,0 +1,99 @@
+# trading_app/app/api/v1/jobs.py
+import uuid
+from fastapi import APIRouter, Depends, HTTPException, Query, WebSocket, WebSocketDisconnect, status
+from redis.exceptions import RedisError
+
+from app.api import deps
+from app.core.redis import redis_client
+from app.db.session import AsyncSessionLocal
+from app.models.user import User
+from app.schemas.ai import AIChatRequest
+from app.schemas.job import JobRead, JobSubmitted
+from app.services.jobs import FINISHED, QUEUED, job_queue
+
+router = APIRouter()
+
+_QUEUE_UNAVAILABLE = HTTPException(
+    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+    detail="The job queue is unavailable, please retry shortly.",
+    headers={"Retry-After": "1"},
+)
+
+async def _get_own_job(job_id: uuid.UUID, user_id: uuid.UUID) -> dict | None:
+    job = await job_queue.get(job_id)
+    return job if job is not None and job["user_id"] == user_id else None
+
+@router.post(
+    "/ai-chat",
+    response_model=JobSubmitted,
+    status_code=status.HTTP_202_ACCEPTED,
+    dependencies=[Depends(deps.admit("chat"))],
+)
+async def submit_ai_chat(
+    request: AIChatRequest,
+    current_user: User = Depends(deps.get_current_user),
+):
+    """
+    Queues a `/ai/chat` request for a job worker and returns at once.
+    Poll `GET /jobs/{job_id}` or listen on `/jobs/{job_id}/events`.
+    """
+    try:
+        job_id = await job_queue.submit("ai_chat", current_user.id, request.model_dump(mode="json"))
+    except RedisError:
+        raise _QUEUE_UNAVAILABLE
+    return JobSubmitted(job_id=job_id, status=QUEUED)
+
+@router.get("/{job_id}", response_model=JobRead, dependencies=[Depends(deps.admit("crud"))])
+async def read_job(
+    job_id: uuid.UUID,
+    current_user: User = Depends(deps.get_current_user),
+):
+    """
+    Status of a job, with its result or error once finished. Jobs are
+    forgotten JOB_RESULT_TTL_SECONDS after they finish.
+    """
+    try:
+        job = await _get_own_job(job_id, current_user.id)
+    except RedisError:
+        raise _QUEUE_UNAVAILABLE
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return JobRead(**job)
+
+@router.websocket("/{job_id}/events")
+async def job_events(websocket: WebSocket, job_id: uuid.UUID, token: str = Query(...)):
+    """
+    Sends the job (as in `GET /jobs/{job_id}`) now and on every status
+    change, then closes once it has finished. The token is passed as a
+    query parameter because browsers cannot set headers on WebSockets.
+    """
+    async with AsyncSessionLocal() as db:
+        try:
+            user = await deps.get_user_from_token(db, token)
+        except HTTPException:
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+            return
+    job = await _get_own_job(job_id, user.id)
+    if job is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    # Subscribe before re-reading the state, so no change can slip between the two.
+    pubsub = redis_client.pubsub()
+    await pubsub.subscribe(job_queue.channel(job_id))
+    try:
+        job = await job_queue.get(job_id)
+        while job is not None:
+            await websocket.send_text(JobRead(**job).model_dump_json())
+            if job["status"] in FINISHED:
+                break
+            # Woken by a status change; the timeout re-checks the state (and
+            # doubles as a keep-alive) in case a notification was missed.
+            await pubsub.get_message(ignore_subscribe_messages=True, timeout=30.0)
+            job = await job_queue.get(job_id)
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await pubsub.aclose()
@@ -0,0 +1,70 @@
+# trading_app/app/api/v1/market.py
+import datetime
+from typing import Literal
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api import deps
+from app.core.config import settings
+from app.crud import crud_market
+from app.db.session import get_read_db
+from app.models.user import User
+from app.schemas.market import CandleSeries, InstrumentRead
+
+router = APIRouter()
+
+def _to_tick(value: datetime.datetime | None) -> int | None:
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.timezone.utc)
+    return int(value.timestamp() * 1000)
+
+@router.get("/instruments", response_model=list[InstrumentRead], dependencies=[Depends(deps.admit("crud"))])
+async def read_instruments(
+    kind: str | None = None,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(deps.get_current_user),
+):
+    return await crud_market.list_instruments(db, kind=kind)
+
+@router.get(
+    "/instruments/{instrument_name}/candles", response_model=CandleSeries, dependencies=[Depends(deps.admit("analytics"))]
+)
+async def read_candles(
+    instrument_name: str,
+    resolution: str = Query(..., max_length=10),
+    start: datetime.datetime | None = None,
+    end: datetime.datetime | None = None,
+    max_points: int = Query(1_000, ge=3, le=settings.MARKET_MAX_POINTS),
+    method: Literal["ohlc", "lttb"] = "ohlc",
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(deps.get_current_user),
+):
+    """
+    Candles for a chart, downsampled server-side to at most `max_points`.
+
+    `method=ohlc` merges consecutive candles into wider ones (no extreme is
+    lost); `method=lttb` keeps the original candles that best preserve the
+    shape of the close series. Ranges of more than MARKET_CANDLE_CACHE_WINDOW
+    candles outside the cache are always merged OHLC-style, by the database.
+    """
+    instrument = await crud_market.get_instrument(db, instrument_name=instrument_name)
+    if instrument is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Instrument not found")
+    candles, source_points = await crud_market.get_chart_candles(
+        db,
+        instrument_name=instrument_name,
+        resolution=resolution,
+        start=_to_tick(start),
+        end=_to_tick(end),
+        max_points=max_points,
+        method=method,
+    )
+    return CandleSeries(
+        instrument_name=instrument_name,
+        resolution=resolution,
+        method=method,
+        source_points=source_points,
+        **candles.to_columns(),
+    )
@@ -0,0 +1,301 @@
+
+# trading_app/app/api/v1/portfolios.py
+import asyncio
+import time
+import uuid
+import numpy as np
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, WebSocket, WebSocketDisconnect, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api import deps
+from app.core.cache import LRUCache
+from app.core.conditional import response_cache
+from app.core.config import settings
+from app.crud import crud_market, crud_portfolio, crud_position_snapshot, crud_transaction
+from app.db.session import get_db, get_read_db, AsyncSessionLocal
+from app.models.user import User
+from app.schemas.portfolio import (
+    EquityCurveRead,
+    PortfolioHoldings,
+    PortfolioPositions,
+    RiskReport,
+    SnapshotRebuildReport,
+)
+from app.services.equity import (
+    EquityCurve,
+    build_equity_curve,
+    equity_curve_cache,
+    transaction_ticks,
+)
+from app.services.live_valuation import valuation_hub
+from app.services.market_data import closes_on_grid, lttb_indices, resolution_ms
+from app.services.positions import compute_positions, holding_from_aggregates
+from app.services.risk import PriceMatrix, compute_risk
+
+router = APIRouter()
+
+# Risk reports keyed by everything they depend on (holdings, the last candle
+# of each instrument and the parameters), so a new transaction or candle
+# simply produces a new key and stale entries age out.
+risk_report_cache = LRUCache(
+    maxsize=settings.RISK_CACHE_MAX_ENTRIES,
+    ttl=settings.RISK_CACHE_TTL_SECONDS,
+)
+
+@router.get("/{portfolio_id}/positions", response_model=PortfolioPositions, dependencies=[Depends(deps.admit("analytics"))])
+async def read_positions(
+    request: Request,
+    portfolio_id: uuid.UUID,
+    include_closed: bool = False,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(deps.get_current_user),
+):
+    """
+    Current holdings of a portfolio with average and FIFO cost basis and
+    realized P&L, computed from its full transaction history.
+    Supports If-None-Match.
+    """
+    async def build() -> PortfolioPositions:
+        portfolio = await crud_portfolio.get_portfolio(db, portfolio_id=portfolio_id, user_id=current_user.id)
+        if portfolio is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Portfolio not found")
+        txns = await crud_transaction.get_transaction_arrays(db, portfolio_id=portfolio_id)
+        positions = compute_positions(txns)
+        return PortfolioPositions(
+            portfolio_id=portfolio_id,
+            transaction_count=len(txns),
+            positions=positions.to_records(include_closed=include_closed),
+        )
+
+    return await response_cache.respond(
+        request, user_id=current_user.id, scopes=[f"portfolio:{portfolio_id}"], build=build
+    )
+
+@router.get("/{portfolio_id}/holdings", response_model=PortfolioHoldings, dependencies=[Depends(deps.admit("analytics"))])
+async def read_holdings(
+    request: Request,
+    portfolio_id: uuid.UUID,
+    include_closed: bool = False,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(deps.get_current_user),
+):
+    """
+    Current holdings with average cost and realized P&L, read from the
+    incrementally maintained position snapshots (one row per ticker)
+    instead of replaying the transaction history. Supports If-None-Match.
+    """
+    async def build() -> PortfolioHoldings:
+        portfolio = await crud_portfolio.get_portfolio(db, portfolio_id=portfolio_id, user_id=current_user.id)
+        if portfolio is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Portfolio not found")
+        snapshots = await crud_position_snapshot.get_snapshots(db, portfolio_id=portfolio_id)
+        holdings = [
+            holding_from_aggregates(
+                snapshot.instrument_ticker,
+                snapshot.buy_quantity,
+                snapshot.sell_quantity,
+                snapshot.held_quantity,
+                snapshot.held_cost,
+                snapshot.realized_pnl,
+                snapshot.transaction_count,
+            )
+            for snapshot in snapshots
+        ]
+        if not include_closed:
+            holdings = [holding for holding in holdings if holding["quantity"] != 0]
+        return PortfolioHoldings(portfolio_id=portfolio_id, holdings=holdings)
+
+    return await response_cache.respond(
+        request, user_id=current_user.id, scopes=[f"portfolio:{portfolio_id}"], build=build
+    )
+
+@router.post(
+    "/{portfolio_id}/holdings/rebuild", response_model=SnapshotRebuildReport, dependencies=[Depends(deps.admit("analytics"))]
+)
+async def rebuild_holdings(
+    portfolio_id: uuid.UUID,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(deps.get_current_user),
+):
+    """
+    Recomputes the position snapshots from the full transaction history and
+    repairs them if they have drifted. Reports the tickers that differed.
+    """
+    portfolio = await crud_portfolio.get_portfolio(db, portfolio_id=portfolio_id, user_id=current_user.id)
+    if portfolio is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Portfolio not found")
+    report = await crud_position_snapshot.rebuild_portfolio(db, portfolio_id=portfolio_id)
+    return SnapshotRebuildReport(portfolio_id=portfolio_id, **report)
+
+async def _get_equity_curve(db: AsyncSession, *, portfolio_id: uuid.UUID, timeframe: str) -> EquityCurve:
+    """
+    Serves the cached curve, rebuilding only the tail the cache asks for:
+    candles are loaded from that tick onward and appended to the prefix.
+    """
+    prefix, start, version = equity_curve_cache.plan(portfolio_id, timeframe)
+    if start == -1:
+        return prefix
+    txns = await crud_transaction.get_transaction_arrays(db, portfolio_id=portfolio_id)
+    if len(txns):
+        # Bound the grid before loading candles or allocating anything for it.
+        span_from = int(transaction_ticks(txns).min()) if start is None else start
+        grid_points = (time.time() * 1000 - span_from) / resolution_ms(timeframe)
+        if grid_points > settings.EQUITY_CURVE_MAX_GRID_POINTS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Timeframe '{timeframe}' spans over {settings.EQUITY_CURVE_MAX_GRID_POINTS} candles "
+                "for this portfolio; use a coarser timeframe",
+            )
+    if start is None and len(txns):
+        # Include the candle that contains the first transaction.
+        candles_from = int(transaction_ticks(txns).min()) - resolution_ms(timeframe)
+    else:
+        candles_from = start
+    prices = {
+        ticker: await crud_market.get_candles(
+            db, instrument_name=ticker, resolution=timeframe, start=candles_from
+        )
+        for ticker in np.unique(txns.tickers)
+    }
+    tail = build_equity_curve(txns, prices, start=start)
+    curve = tail if prefix is None else prefix.extend(tail)
+    equity_curve_cache.set(portfolio_id, timeframe, curve, version)
+    return curve
+
+@router.get("/{portfolio_id}/equity", response_model=EquityCurveRead, dependencies=[Depends(deps.admit("analytics"))])
+async def read_equity_curve(
+    portfolio_id: uuid.UUID,
+    timeframe: str = Query("1D", max_length=10),
+    max_points: int = Query(1_000, ge=3, le=settings.MARKET_MAX_POINTS),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(deps.get_current_user),
+):
+    """
+    Portfolio value at every candle close of `timeframe` (an OHLC
+    resolution such as '60' or '1D') since the first transaction, with net
+    invested capital and P&L, downsampled with LTTB to `max_points`.
+    """
+    portfolio = await crud_portfolio.get_portfolio(db, portfolio_id=portfolio_id, user_id=current_user.id)
+    if portfolio is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Portfolio not found")
+    try:
+        resolution_ms(timeframe)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid timeframe")
+    curve = await _get_equity_curve(db, portfolio_id=portfolio_id, timeframe=timeframe)
+    index = lttb_indices(curve.tick, curve.value, max_points)
+    return EquityCurveRead(
+        portfolio_id=portfolio_id,
+        timeframe=timeframe,
+        source_points=len(curve),
+        tick=curve.tick[index].tolist(),
+        value=curve.value[index].tolist(),
+        net_invested=curve.net_invested[index].tolist(),
+        pnl=curve.pnl[index].tolist(),
+    )
+
+@router.get("/{portfolio_id}/risk", response_model=RiskReport, dependencies=[Depends(deps.admit("analytics"))])
+async def read_risk(
+    portfolio_id: uuid.UUID,
+    lookback_days: int = Query(365, ge=30, le=5 * 366),
+    confidence: float = Query(0.95, gt=0.5, lt=1),
+    window: int = Query(20, ge=2, le=365),
+    benchmark: str | None = Query(settings.RISK_BENCHMARK_INSTRUMENT, max_length=50),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(deps.get_current_user),
+):
+    """
+    Volatility (overall and rolling over `window` days), historical and
+    parametric VaR, max drawdown, beta against `benchmark` and the holdings
+    correlation matrix, all computed in one pass over the daily returns of
+    the currently held instruments.
+
+    Results are memoized on the holdings and the latest candle of every
+    instrument, so they are recomputed only after a transaction or a new
+    candle.
+    """
+    portfolio = await crud_portfolio.get_portfolio(db, portfolio_id=portfolio_id, user_id=current_user.id)
+    if portfolio is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Portfolio not found")
+    holdings = {
+        snapshot.instrument_ticker: float(snapshot.buy_quantity - snapshot.sell_quantity)
+        for snapshot in await crud_position_snapshot.get_snapshots(db, portfolio_id=portfolio_id)
+        if snapshot.buy_quantity != snapshot.sell_quantity
+    }
+    since = int((time.time() - lookback_days * 86_400) * 1000)
+    instruments = sorted(holdings) + ([benchmark] if benchmark and benchmark not in holdings else [])
+    prices = {
+        name: await crud_market.get_candles(db, instrument_name=name, resolution="1D", start=since)
+        for name in instruments
+    }
+    key = (
+        portfolio_id, lookback_days, confidence, window, benchmark,
+        tuple(holdings.items()),
+        tuple(int(prices[name].tick[-1]) if len(prices[name]) else None for name in instruments),
+    )
+    report = risk_report_cache.get(key)
+    if report is None:
+        matrix = PriceMatrix.from_candles(prices, sorted(holdings))
+        benchmark_closes = None
+        if benchmark and len(prices[benchmark]):
+            benchmark_closes = closes_on_grid(prices[benchmark], matrix.tick)
+        report = compute_risk(
+            matrix,
+            np.array([holdings[ticker] for ticker in matrix.tickers]),
+            benchmark=benchmark_closes,
+            confidence=confidence,
+            window=window,
+            periods_per_year=settings.RISK_PERIODS_PER_YEAR,
+        )
+        risk_report_cache.set(key, report)
+    return RiskReport(
+        portfolio_id=portfolio_id,
+        lookback_days=lookback_days,
+        confidence=confidence,
+        benchmark=benchmark,
+        **report,
+    )
+
+@router.websocket("/{portfolio_id}/live")
+async def portfolio_live(websocket: WebSocket, portfolio_id: uuid.UUID, token: str = Query(...)):
+    """
+    Pushes the portfolio's valuation (JSON text frames) whenever a held
+    instrument's price or the holdings change. Browsers cannot set headers
+    on WebSocket requests, so the JWT is passed as the `token` query
+    parameter. A client that falls behind receives only the latest value.
+    """
+    # Authorize on a short-lived session; the connection may stay open for hours.
+    async with AsyncSessionLocal() as db:
+        try:
+            user = await deps.get_user_from_token(db, token)
+        except HTTPException:
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+            return
+        portfolio = await crud_portfolio.get_portfolio(db, portfolio_id=portfolio_id, user_id=user.id)
+    if portfolio is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    slot = await valuation_hub.subscribe(portfolio_id)
+
+    async def send() -> None:
+        while True:
+            await websocket.send_text((await slot.get()).decode())
+
+    async def receive() -> None:
+        # Nothing is expected from the client; this only notices it leaving.
+        while True:
+            await websocket.receive_text()
+
+    tasks = [asyncio.create_task(send()), asyncio.create_task(receive())]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            error = task.exception()
+            if error is not None and not isinstance(error, WebSocketDisconnect):
+                raise error
+    finally:
+        for task in tasks:
+            task.cancel()
+        valuation_hub.unsubscribe(portfolio_id, slot)
@@ -0,0 +1,208 @@
+
+# trading_app/app/api/v1/transactions.py
+import base64
+import binascii
+import datetime
+import time
+import uuid
+from typing import AsyncIterator, Literal
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, UploadFile, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api import deps
+from app.core.admission import AdmissionSlot, AdmittedStreamingResponse
+from app.core.conditional import response_cache
+from app.core.config import settings
+from app.crud import crud_portfolio, crud_position_snapshot, crud_transaction
+from app.db.session import get_db, get_read_db, AsyncSessionLocal
+from app.models.portfolio import Transaction
+from app.models.user import User
+from app.schemas.transaction import (
+    TransactionCreate,
+    TransactionImportReport,
+    TransactionPage,
+    TransactionRead,
+    TransactionUpdate,
+)
+from app.services.transaction_import import (
+    ImportReport,
+    iter_lines,
+    iter_raw_rows,
+    iter_valid_records,
+)
+
+router = APIRouter()
+
+def _encode_cursor(transaction: Transaction) -> str:
+    raw = orjson.dumps([transaction.transaction_date.isoformat(), str(transaction.id)])
+    return base64.urlsafe_b64encode(raw).decode()
+
+def _decode_cursor(cursor: str) -> tuple[datetime.datetime, uuid.UUID]:
+    try:
+        date, transaction_id = orjson.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.datetime.fromisoformat(date), uuid.UUID(transaction_id)
+    except (binascii.Error, orjson.JSONDecodeError, TypeError, ValueError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+def _ndjson_line(transaction: Transaction) -> bytes:
+    return orjson.dumps({
+        "id": str(transaction.id),
+        "portfolio_id": str(transaction.portfolio_id),
+        "instrument_ticker": transaction.instrument_ticker,
+        "transaction_type": transaction.transaction_type,
+        "quantity": str(transaction.quantity),
+        "price": str(transaction.price),
+        "transaction_date": transaction.transaction_date.isoformat(),
+    }) + b"\n"
+
+@router.get("", response_model=TransactionPage)
+async def list_transactions(
+    request: Request,
+    portfolio_id: uuid.UUID | None = None,
+    ticker: str | None = Query(None, max_length=20),
+    side: Literal["BUY", "SELL"] | None = None,
+    start: datetime.datetime | None = None,
+    end: datetime.datetime | None = None,
+    cursor: str | None = None,
+    limit: int = Query(100, ge=1, le=1_000),
+    output: Literal["json", "ndjson"] = Query("json", alias="format"),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(deps.get_current_user),
+    slot: AdmissionSlot = Depends(deps.admit("crud")),
+):
+    """
+    Lists the current user's transactions, newest first.
+
+    `format=json` returns one keyset-paginated page; pass `next_cursor` back
+    as `cursor` for the next one. `format=ndjson` streams every matching
+    row (ignoring `cursor`/`limit`) through a server-side cursor, for full
+    exports with flat memory use. JSON pages support If-None-Match; the
+    ETag changes whenever any of the user's transactions do.
+    """
+    filters = dict(
+        user_id=current_user.id,
+        portfolio_id=portfolio_id,
+        ticker=ticker,
+        side=side,
+        start=start,
+        end=end,
+    )
+
+    if output == "ndjson":
+        async def export() -> AsyncIterator[bytes]:
+            # The request-scoped session is closed before the body streams,
+            # so the export runs on a session of its own.
+            async with AsyncSessionLocal() as stream_db:
+                query = crud_transaction.build_transactions_query(**filters)
+                async for transaction in crud_transaction.stream_transactions(stream_db, query=query):
+                    yield _ndjson_line(transaction)
+
+        return AdmittedStreamingResponse(export(), slot=slot, media_type="application/x-ndjson")
+
+    after = _decode_cursor(cursor) if cursor else None
+
+    async def build() -> TransactionPage:
+        query = crud_transaction.build_transactions_query(**filters, after=after)
+        items = await crud_transaction.get_transactions_page(db, query=query, limit=limit)
+        next_cursor = _encode_cursor(items[-1]) if len(items) == limit else None
+        return TransactionPage(
+            items=[TransactionRead.model_validate(item) for item in items],
+            next_cursor=next_cursor,
+        )
+
+    return await response_cache.respond(
+        request, user_id=current_user.id, scopes=[f"user:{current_user.id}"], build=build
+    )
+
+@router.post(
+    "", response_model=TransactionRead, status_code=status.HTTP_201_CREATED, dependencies=[Depends(deps.admit("crud"))]
+)
+async def create_transaction(
+    transaction_in: TransactionCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(deps.get_current_user),
+):
+    portfolio = await crud_portfolio.get_portfolio(db, portfolio_id=transaction_in.portfolio_id, user_id=current_user.id)
+    if portfolio is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Portfolio not found")
+    return await crud_transaction.create_transaction(db, transaction_in=transaction_in, user_id=current_user.id)
+
+@router.put("/{transaction_id}", response_model=TransactionRead, dependencies=[Depends(deps.admit("crud"))])
+async def update_transaction(
+    transaction_id: uuid.UUID,
+    transaction_in: TransactionUpdate,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(deps.get_current_user),
+):
+    db_transaction = await crud_transaction.get_transaction(db, transaction_id=transaction_id, user_id=current_user.id)
+    if db_transaction is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Transaction not found")
+    return await crud_transaction.update_transaction(
+        db, db_transaction=db_transaction, transaction_in=transaction_in, user_id=current_user.id
+    )
+
+@router.delete(
+    "/{transaction_id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(deps.admit("crud"))]
+)
+async def delete_transaction(
+    transaction_id: uuid.UUID,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(deps.get_current_user),
+):
+    db_transaction = await crud_transaction.get_transaction(db, transaction_id=transaction_id, user_id=current_user.id)
+    if db_transaction is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Transaction not found")
+    await crud_transaction.delete_transaction(db, db_transaction=db_transaction, user_id=current_user.id)
+
+def _detect_format(file: UploadFile) -> str:
+    filename = (file.filename or "").lower()
+    content_type = (file.content_type or "").lower()
+    if filename.endswith((".ndjson", ".jsonl")) or "ndjson" in content_type:
+        return "ndjson"
+    return "csv"
+
+@router.post("/import", response_model=TransactionImportReport, dependencies=[Depends(deps.admit("crud"))])
+async def import_transactions(
+    file: UploadFile,
+    portfolio_id: uuid.UUID = Query(...),
+    file_format: Literal["csv", "ndjson"] | None = Query(None, alias="format"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(deps.get_current_user),
+):
+    """
+    Bulk-imports a broker history from a CSV (with header) or NDJSON file.
+
+    The file is read in chunks and every row is validated as it streams
+    past; valid rows are fed straight into a PostgreSQL COPY, all inside a
+    single transaction, so memory use does not depend on file size.
+    Invalid rows are skipped and reported.
+    """
+    portfolio = await crud_portfolio.get_portfolio(db, portfolio_id=portfolio_id, user_id=current_user.id)
+    if portfolio is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Portfolio not found")
+
+    report = ImportReport(max_errors=settings.TRANSACTION_IMPORT_MAX_ERRORS)
+    raw_rows = iter_raw_rows(iter_lines(file.read), file_format or _detect_format(file))
+    records = iter_valid_records(raw_rows, portfolio_id, report)
+
+    imported = await crud_transaction.copy_transactions(db, records=records)
+    # Snapshot deltas are applied in the COPY's transaction, so both land or neither does.
+    await crud_position_snapshot.apply_deltas(db, portfolio_id=portfolio_id, deltas=report.deltas)
+    # Imported rows may predate existing ones, so their running averages are replayed.
+    await crud_position_snapshot.replay_running_cost(db, portfolio_id=portfolio_id, tickers=set(report.deltas))
+    await db.commit()
+    if report.earliest_date is not None:
+        await crud_transaction.notify_portfolio_changed(
+            portfolio_id, report.earliest_date, user_id=current_user.id
+        )
+
+    elapsed = time.perf_counter() - report.started_at
+    return TransactionImportReport(
+        rows_total=report.rows_total,
+        rows_imported=imported,
+        rows_rejected=report.rows_rejected,
+        elapsed_seconds=elapsed,
+        rows_per_second=report.rows_total / elapsed if elapsed > 0 else 0.0,
+        errors=report.errors,
+    )
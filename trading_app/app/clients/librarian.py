@@ -1,56 +1,386 @@
 
 # trading_app/app/clients/librarian.py
+import asyncio
+import hashlib
+import re
+import time
+from typing import AsyncIterator
+
 import aiohttp
+import orjson
 from fastapi import status, HTTPException
 from loguru import logger
 
+from app.clients.resilience import CircuitBreaker, LatencyTracker, backoff_delay
+from app.core.cache import SingleFlight, TieredCache
 from app.core.config import settings
+from app.core.metrics import LIBRARIAN_REQUEST_DURATION, librarian_trace_config
+from app.core.pools import worker_pools
+
+_WHITESPACE = re.compile(r"\s+")
+
+def _cache_key(user_id: str, prompt: str, conversation_history: list | None) -> str:
+    """
+    Hashes the normalized prompt, so that trivially different spellings of
+    the same question share an entry.
+
+    A question asked without conversation history is shared across users:
+    that is where the hit rate comes from (everyone asking "BTC outlook?").
+    The trade-off is that such an answer is computed for whichever user
+    asked first, although every user's id is sent upstream; this relies on
+    the Librarian personalizing only through the conversation. Once there
+    is history, the answer depends on the user's own context, so the user
+    and the history become part of the key and nothing is shared.
+    """
+    normalized = _WHITESPACE.sub(" ", prompt).strip().casefold().encode()
+    if not conversation_history:
+        return hashlib.sha256(b"shared\0" + normalized).hexdigest()
+    context = orjson.dumps(conversation_history, option=orjson.OPT_SORT_KEYS)
+    return hashlib.sha256(b"user\0" + user_id.encode() + b"\0" + normalized + b"\0" + context).hexdigest()
+
+class LibrarianRequestError(Exception):
+    """
+    A single upstream attempt failed. `retryable` is False for errors that
+    another attempt cannot fix (e.g. 4xx responses). `upstream_fault` is True
+    only for failures that say the Librarian itself is unhealthy (5xx,
+    timeouts, connection errors); only those count towards the breaker.
+    """
+
+    def __init__(self, message: str, retryable: bool = True, upstream_fault: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
+        self.upstream_fault = upstream_fault
 
 class LibrarianClient:
     def __init__(self):
         self.api_url = settings.LIBRARIAN_API_URL
+        self.stream_api_url = settings.LIBRARIAN_STREAM_API_URL
+        self.batch_api_url = settings.LIBRARIAN_BATCH_API_URL
         self.api_key = settings.LIBRARIAN_API_KEY
         # Create a single, reusable session for the lifespan of the application
         # for performance and resource management.
         self._session: aiohttp.ClientSession | None = None
+        # History-free answers are shared across users; the rest are per user
+        # (see `_cache_key`).
+        self.cache = TieredCache(
+            "librarian",
+            maxsize=settings.LIBRARIAN_CACHE_MAX_ENTRIES,
+            ttl=settings.LIBRARIAN_CACHE_TTL_SECONDS,
+        )
+        self._inflight = SingleFlight()
+        self.breaker = CircuitBreaker(
+            failure_threshold=settings.LIBRARIAN_BREAKER_FAILURE_THRESHOLD,
+            reset_timeout=settings.LIBRARIAN_BREAKER_RESET_SECONDS,
+        )
+        self.latency = LatencyTracker()
+        self.timeout = aiohttp.ClientTimeout(
+            total=settings.LIBRARIAN_TOTAL_TIMEOUT_SECONDS,
+            sock_connect=settings.LIBRARIAN_CONNECT_TIMEOUT_SECONDS,
+            sock_read=settings.LIBRARIAN_FIRST_BYTE_TIMEOUT_SECONDS,
+        )
 
     async def get_session(self) -> aiohttp.ClientSession:
         if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=worker_pools.librarian_limit,
+                limit_per_host=worker_pools.librarian_limit_per_host,
+                keepalive_timeout=settings.LIBRARIAN_KEEPALIVE_SECONDS,
+                ttl_dns_cache=settings.LIBRARIAN_DNS_CACHE_SECONDS,
+            )
             self._session = aiohttp.ClientSession(
-                headers={"Authorization": f"Bearer {self.api_key}"}
+                connector=connector,
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                trace_configs=[librarian_trace_config()],
             )
         return self._session
 
-    async def query(self, user_id: str, prompt: str, conversation_history: list | None = None) -> dict:
+    async def query(
+        self,
+        user_id: str,
+        prompt: str,
+        conversation_history: list | None = None,
+        use_cache: bool = True,
+    ) -> dict:
         """
-        Sends a query to the Librarian RAG service.
+        Sends a query to the Librarian RAG service, answering from the response
+        cache when possible. Concurrent identical queries that share a cache
+        entry also share one upstream request. Pass `use_cache=False` to always go upstream.
+        """
+        if not use_cache:
+            return await self._query(user_id, prompt, conversation_history)
+
+        key = _cache_key(user_id, prompt, conversation_history)
+        cached = await self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        async def fetch_and_store() -> dict:
+            response = await self._query(user_id, prompt, conversation_history)
+            await self.cache.set(key, response)
+            return response
+
+        return await self._inflight.do(key, fetch_and_store)
+
+    async def batch_query(self, user_id: str, prompts: list[str], use_cache: bool = True) -> list[dict]:
+        """
+        Answers several independent prompts (no conversation history) with
+        one call to the Librarian batch endpoint, in the order given. Cached
+        answers are served locally and only the misses are sent upstream.
+        Requires `batch_api_url`.
+        """
+        keys = [_cache_key(user_id, prompt, None) for prompt in prompts]
+        answers: list[dict | None] = [None] * len(prompts)
+        if use_cache:
+            for i, key in enumerate(keys):
+                answers[i] = await self.cache.get(key)
+        missing = [i for i, answer in enumerate(answers) if answer is None]
+        if missing:
+            response = await self._request(
+                {
+                    "user_id": user_id,
+                    "queries": [{"prompt": prompts[i], "conversation_history": []} for i in missing],
+                },
+                self.batch_api_url,
+            )
+            results = response.get("results", [])
+            if len(results) != len(missing):
+                logger.error(f"Librarian batch returned {len(results)} results for {len(missing)} prompts")
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Error connecting to the AI service.",
+                )
+            for i, result in zip(missing, results):
+                answers[i] = result
+                if use_cache:
+                    await self.cache.set(keys[i], result)
+        return answers
+
+    def cache_stats(self) -> dict:
+        return {**self.cache.stats(), "coalesced": self._inflight.coalesced}
+
+    async def _query(self, user_id: str, prompt: str, conversation_history: list | None = None) -> dict:
+        """
+        Calls the Librarian with retries, optional hedging and a circuit
+        breaker. Any terminal failure surfaces as a 503.
         """
-        session = await self.get_session()
         payload = {
             "prompt": prompt,
             "user_id": user_id,
             "conversation_history": conversation_history or []
         }
-        
+        return await self._request(payload, self.api_url)
+
+    async def _request(self, payload: dict, url: str) -> dict:
+        """
+        The whole call, retries and backoff included, must finish within
+        LIBRARIAN_TOTAL_TIMEOUT_SECONDS; each attempt only gets what is left
+        of that budget.
+        """
+        deadline = asyncio.get_running_loop().time() + settings.LIBRARIAN_TOTAL_TIMEOUT_SECONDS
         try:
-            async with session.post(self.api_url, json=payload, timeout=30) as response:
+            async with asyncio.timeout_at(deadline):
+                for attempt in range(settings.LIBRARIAN_MAX_RETRIES + 1):
+                    if not self.breaker.allow():
+                        raise HTTPException(
+                            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                            detail="The AI service is temporarily unavailable.",
+                            headers={"Retry-After": str(int(self.breaker.reset_timeout))},
+                        )
+                    try:
+                        response = await self._hedged_post(payload, url, deadline)
+                    except LibrarianRequestError as e:
+                        if e.upstream_fault:
+                            self.breaker.record_failure()
+                        else:
+                            # The Librarian answered; that says nothing about
+                            # its health either way.
+                            self.breaker.abandon_trial()
+                        delay = backoff_delay(attempt, settings.LIBRARIAN_RETRY_BACKOFF_SECONDS)
+                        remaining = deadline - asyncio.get_running_loop().time()
+                        if not e.retryable or attempt == settings.LIBRARIAN_MAX_RETRIES or delay >= remaining:
+                            raise HTTPException(
+                                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                                detail="Error connecting to the AI service.",
+                            )
+                        logger.warning(f"Librarian attempt {attempt + 1} failed ({e}); retrying in {delay:.2f}s")
+                        await asyncio.sleep(delay)
+                    except BaseException:
+                        # Cancelled (e.g. the client went away or the deadline
+                        # passed) or an unexpected error: no verdict on the
+                        # Librarian, but a half-open trial must not be left
+                        # hanging.
+                        self.breaker.abandon_trial()
+                        raise
+                    else:
+                        self.breaker.record_success()
+                        return response
+        except TimeoutError:
+            logger.error(
+                f"Librarian call exceeded its {settings.LIBRARIAN_TOTAL_TIMEOUT_SECONDS}s overall deadline"
+            )
+            self.breaker.record_failure()
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Error connecting to the AI service.",
+            )
+
+    def _attempt_timeout(self, deadline: float) -> aiohttp.ClientTimeout:
+        # aiohttp treats a zero total as "no timeout", so keep it positive.
+        remaining = max(deadline - asyncio.get_running_loop().time(), 0.001)
+        return aiohttp.ClientTimeout(
+            total=min(self.timeout.total, remaining),
+            sock_connect=self.timeout.sock_connect,
+            sock_read=self.timeout.sock_read,
+        )
+
+    async def _hedged_post(self, payload: dict, url: str, deadline: float) -> dict:
+        """
+        Sends the request and, if it has not completed within the recent p95
+        latency, races a second identical request against it. The first
+        successful response wins and the other request is cancelled.
+        """
+        if not settings.LIBRARIAN_HEDGE_ENABLED:
+            return await self._post(payload, url, deadline)
+
+        p95 = self.latency.percentile(0.95)
+        hedge_delay = max(settings.LIBRARIAN_HEDGE_MIN_DELAY_SECONDS, p95 or 0.0)
+        primary = asyncio.create_task(self._post(payload, url, deadline))
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=hedge_delay)
+            if not done:
+                tasks.add(asyncio.create_task(self._post(payload, url, deadline)))
+            error: LibrarianRequestError | None = None
+            for next_done in asyncio.as_completed(tasks):
+                try:
+                    return await next_done
+                except LibrarianRequestError as e:
+                    error = e
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _post(self, payload: dict, url: str, deadline: float) -> dict:
+        session = await self.get_session()
+        start = time.perf_counter()
+        status_label = "error"
+        try:
+            async with session.post(url, json=payload, timeout=self._attempt_timeout(deadline)) as response:
+                status_label = str(response.status)
                 if response.status == status.HTTP_200_OK:
-                    return await response.json()
-                else:
+                    try:
+                        result = await response.json(loads=orjson.loads)
+                    except ValueError as e:
+                        raise LibrarianRequestError(
+                            f"Invalid JSON response: {e}", retryable=False, upstream_fault=False
+                        )
+                    self.latency.record(time.perf_counter() - start)
+                    return result
+                error_text = await response.text()
+                logger.error(
+                    f"Librarian service returned error {response.status}: {error_text}"
+                )
+                # 429 and 5xx are transient; other client errors are not.
+                # Only 5xx means the Librarian itself is in trouble.
+                server_error = response.status >= 500
+                raise LibrarianRequestError(
+                    f"HTTP {response.status}",
+                    retryable=server_error or response.status == 429,
+                    upstream_fault=server_error,
+                )
+        except (aiohttp.ClientError, TimeoutError) as e:
+            logger.error(f"Could not connect to Librarian service: {e!r}")
+            raise LibrarianRequestError(repr(e))
+        finally:
+            LIBRARIAN_REQUEST_DURATION.labels(phase="total", status=status_label).observe(
+                time.perf_counter() - start
+            )
+
+    async def stream_query(
+        self, user_id: str, prompt: str, conversation_history: list | None = None
+    ) -> AsyncIterator[dict]:
+        """
+        Sends a query to the Librarian streaming endpoint and yields each
+        decoded chunk as soon as it arrives. Accepts both SSE (`data: {...}`)
+        and newline-delimited JSON framing.
+        """
+        if not self.breaker.allow():
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="The AI service is temporarily unavailable.",
+                headers={"Retry-After": str(int(self.breaker.reset_timeout))},
+            )
+        session = await self.get_session()
+        payload = {
+            "prompt": prompt,
+            "user_id": user_id,
+            "conversation_history": conversation_history or [],
+            "stream": True,
+        }
+        # No total timeout: a long answer is fine as long as chunks keep coming.
+        timeout = aiohttp.ClientTimeout(
+            total=None,
+            sock_connect=settings.LIBRARIAN_CONNECT_TIMEOUT_SECONDS,
+            sock_read=settings.LIBRARIAN_STREAM_READ_TIMEOUT_SECONDS,
+        )
+
+        start = time.perf_counter()
+        status_label = "error"
+        verdict = False  # Whether the breaker has been told how this call went
+        try:
+            async with session.post(
+                self.stream_api_url,
+                json=payload,
+                timeout=timeout,
+                headers={"Accept": "text/event-stream"},
+            ) as response:
+                status_label = str(response.status)
+                if response.status != status.HTTP_200_OK:
                     error_text = await response.text()
                     logger.error(
-                        f"Librarian service returned error {response.status}: {error_text}"
+                        f"Librarian stream returned error {response.status}: {error_text}"
                     )
+                    if response.status >= 500:
+                        self.breaker.record_failure()
+                        verdict = True
                     raise HTTPException(
                         status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
                         detail="The AI service is currently unavailable.",
                     )
-        except aiohttp.ClientError as e:
-            logger.error(f"Could not connect to Librarian service: {e}")
+                self.breaker.record_success()
+                verdict = True
+                async for raw_line in response.content:
+                    line = raw_line.strip()
+                    if line.startswith(b"data:"):
+                        line = line[5:].strip()
+                    if not line or line.startswith(b":") or line.startswith(b"event:"):
+                        continue
+                    if line == b"[DONE]":
+                        break
+                    try:
+                        chunk = orjson.loads(line)
+                    except orjson.JSONDecodeError as e:
+                        logger.error(f"Librarian stream sent a malformed chunk: {e}")
+                        raise HTTPException(
+                            status_code=status.HTTP_502_BAD_GATEWAY,
+                            detail="The AI service sent an invalid response.",
+                        )
+                    yield chunk
+        except (aiohttp.ClientError, TimeoutError) as e:
+            logger.error(f"Librarian stream failed: {e!r}")
+            self.breaker.record_failure()
+            verdict = True
             raise HTTPException(
                 status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
                 detail="Error connecting to the AI service.",
             )
+        finally:
+            if not verdict:
+                self.breaker.abandon_trial()
+            LIBRARIAN_REQUEST_DURATION.labels(phase="stream_total", status=status_label).observe(
+                time.perf_counter() - start
+            )
 
     async def close(self):
         if self._session and not self._session.closed:
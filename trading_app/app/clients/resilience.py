@@ -0,0 +1,91 @@
+
+# trading_app/app/clients/resilience.py
+import random
+import time
+from collections import deque
+
+
+class CircuitBreaker:
+    """
+    Classic three-state circuit breaker.
+
+    - closed: requests flow; consecutive failures are counted.
+    - open: requests are refused until `reset_timeout` seconds have passed.
+    - half_open: a single trial request is let through; its outcome closes
+      or re-opens the circuit. A trial that ends without an outcome (the
+      caller was cancelled) is abandoned, and one that has not reported
+      within `trial_timeout` seconds is presumed lost; either way the next
+      call becomes the new trial.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float, trial_timeout: float | None = None):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.trial_timeout = reset_timeout if trial_timeout is None else trial_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_started_at = 0.0
+
+    def allow(self) -> bool:
+        if self.state == self.CLOSED:
+            return True
+        now = time.monotonic()
+        if (
+            (self.state == self.OPEN and now - self._opened_at >= self.reset_timeout)
+            or (self.state == self.HALF_OPEN and now - self._trial_started_at >= self.trial_timeout)
+        ):
+            self.state = self.HALF_OPEN
+            self._trial_started_at = now
+            return True
+        return False
+
+    def abandon_trial(self) -> None:
+        """
+        Call when a request let through by `allow` ends with neither success
+        nor failure. Outside half-open there is nothing to undo.
+        """
+        if self.state == self.HALF_OPEN:
+            self.state = self.OPEN
+            self._opened_at = time.monotonic() - self.reset_timeout
+
+    def record_success(self) -> None:
+        self.state = self.CLOSED
+        self._failures = 0
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+
+
+class LatencyTracker:
+    """
+    Keeps a sliding window of recent successful request latencies and
+    reports a percentile over it.
+    """
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self._samples: deque[float] = deque(maxlen=window)
+        self.min_samples = min_samples
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, q: float) -> float | None:
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+def backoff_delay(attempt: int, base: float, cap: float = 5.0) -> float:
+    """
+    Exponential backoff with full jitter: uniform in [0, min(cap, base * 2^attempt)].
+    """
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
@@ -0,0 +1,287 @@
+# trading_app/app/core/admission.py
+import asyncio
+import math
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass
+
+from fastapi import HTTPException, status
+from fastapi.responses import StreamingResponse
+from loguru import logger
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+from app.core.redis import redis_client
+
+# Refills the bucket for the elapsed time, then takes one token if there is
+# one. Returns {allowed, seconds until a token is available}; the delay is
+# a string because Lua numbers are truncated to integers on the way out.
+_TOKEN_BUCKET_LUA = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local retry_after = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    retry_after = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+return {allowed, tostring(retry_after)}
+"""
+
+
+def _reject(status_code: int, detail: str, retry_after: float) -> HTTPException:
+    return HTTPException(
+        status_code=status_code,
+        detail=detail,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+class TokenBucket:
+    """
+    Per-user request rate limit shared by every worker through Redis.
+    A Redis outage lets requests through rather than failing them.
+    """
+
+    def __init__(self, name: str, *, rate: float, burst: int, redis: Redis | None = None):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.redis = redis if redis is not None else redis_client
+        self._script = self.redis.register_script(_TOKEN_BUCKET_LUA)
+
+    async def take(self, user_id: uuid.UUID) -> float:
+        """
+        Returns 0 when the request may proceed, otherwise the number of
+        seconds until the user's next token.
+        """
+        try:
+            allowed, retry_after = await self._script(
+                keys=[f"ratelimit:{self.name}:{user_id}"],
+                args=[self.rate, self.burst, time.time()],
+            )
+        except RedisError as e:
+            logger.warning(f"Rate limiter '{self.name}' unavailable, admitting request: {e}")
+            return 0.0
+        return 0.0 if int(allowed) else float(retry_after)
+
+
+class ConcurrencyPool:
+    """
+    Caps in-flight requests of one class in this worker.
+
+    Beyond `limit`, up to `max_queue` requests wait in FIFO order, and no
+    user may hold more than `per_user` slots. A request is turned away at
+    once when the wait it can expect (queue position times the recent mean
+    service time, divided by `limit`) already exceeds `max_wait`; otherwise
+    it waits at most `max_wait` seconds. Failing fast keeps queues short,
+    which is what keeps tail latency flat for the requests that do run.
+    """
+
+    def __init__(self, name: str, *, limit: int, max_queue: int, per_user: int, max_wait: float):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.per_user = per_user
+        self.max_wait = max_wait
+        self.active = 0
+        self._waiters: deque[asyncio.Future] = deque()
+        self._per_user: dict[uuid.UUID, int] = {}
+        self._mean_service = 0.0
+        self.admitted = 0
+        self.rejected = 0
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def expected_wait(self) -> float:
+        return (self.waiting + 1) * self._mean_service / self.limit
+
+    async def acquire(self, user_id: uuid.UUID) -> None:
+        held = self._per_user.get(user_id, 0)
+        if held >= self.per_user:
+            self.rejected += 1
+            raise _reject(
+                status.HTTP_429_TOO_MANY_REQUESTS,
+                "Too many concurrent requests for this user.",
+                self._mean_service,
+            )
+        self._per_user[user_id] = held + 1
+        try:
+            if self.active < self.limit and not self._waiters:
+                self.active += 1
+            else:
+                await self._wait()
+        except BaseException:
+            self._drop_user(user_id)
+            raise
+        self.admitted += 1
+
+    def try_acquire(self, user_id: uuid.UUID) -> bool:
+        """
+        Takes a slot only if one is free right now and the user is below
+        `per_user`; never queues. Release it with `release` as usual.
+        """
+        held = self._per_user.get(user_id, 0)
+        if held >= self.per_user or self.active >= self.limit or self._waiters:
+            return False
+        self._per_user[user_id] = held + 1
+        self.active += 1
+        self.admitted += 1
+        return True
+
+    async def _wait(self) -> None:
+        expected = self.expected_wait()
+        if self.waiting >= self.max_queue or expected > self.max_wait:
+            self.rejected += 1
+            raise _reject(status.HTTP_503_SERVICE_UNAVAILABLE, "The service is busy, please retry shortly.", expected)
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait({waiter}, timeout=self.max_wait)
+        except BaseException:
+            # Cancelled (e.g. the client went away) after being handed a slot.
+            if waiter.done():
+                self._hand_off()
+            else:
+                waiter.cancel()
+                self._waiters.remove(waiter)
+            raise
+        if not waiter.done():
+            waiter.cancel()
+            self._waiters.remove(waiter)
+            self.rejected += 1
+            raise _reject(status.HTTP_503_SERVICE_UNAVAILABLE, "The service is busy, please retry shortly.", self.max_wait)
+
+    def _drop_user(self, user_id: uuid.UUID) -> None:
+        held = self._per_user.get(user_id, 0) - 1
+        if held > 0:
+            self._per_user[user_id] = held
+        else:
+            self._per_user.pop(user_id, None)
+
+    def _hand_off(self) -> None:
+        # Give the slot straight to the next waiter so it cannot be taken
+        # by a newcomer that skipped the queue.
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def release(self, user_id: uuid.UUID, service_seconds: float) -> None:
+        self._drop_user(user_id)
+        self._mean_service += 0.1 * (service_seconds - self._mean_service)
+        self._hand_off()
+
+    def stats(self) -> dict:
+        return {
+            "active": self.active,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "mean_service_seconds": self._mean_service,
+        }
+
+
+@dataclass
+class AdmissionSlot:
+    """
+    A held slot. Released when the request ends, or, once `keep()` has been
+    called, by the AdmittedStreamingResponse that carries it.
+    """
+
+    pool: ConcurrencyPool
+    user_id: uuid.UUID
+    started: float
+    kept: bool = False
+    released: bool = False
+
+    def keep(self) -> None:
+        self.kept = True
+
+    def release(self) -> None:
+        if not self.released:
+            self.released = True
+            self.pool.release(self.user_id, time.perf_counter() - self.started)
+
+
+class AdmittedStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse that holds `slot` until the response is over, however
+    it ends: streamed to the end, client gone, cancelled, or failed before
+    the body iterator ever started (when its own `finally` would not run).
+    """
+
+    def __init__(self, content, *, slot: AdmissionSlot, **kwargs):
+        super().__init__(content, **kwargs)
+        slot.keep()
+        self.slot = slot
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.slot.release()
+
+
+class AdmissionController:
+    """
+    Admission per route class ("chat", "analytics", "crud"): the user's
+    token bucket first (429), then a slot in the class's pool (429/503).
+    """
+
+    def __init__(self, pools: dict[str, ConcurrencyPool], buckets: dict[str, TokenBucket]):
+        self.pools = pools
+        self.buckets = buckets
+
+    async def admit(self, route_class: str, user_id: uuid.UUID) -> AdmissionSlot:
+        bucket = self.buckets.get(route_class)
+        if bucket is not None:
+            retry_after = await bucket.take(user_id)
+            if retry_after > 0:
+                self.pools[route_class].rejected += 1
+                raise _reject(status.HTTP_429_TOO_MANY_REQUESTS, "Rate limit exceeded.", retry_after)
+        pool = self.pools[route_class]
+        await pool.acquire(user_id)
+        return AdmissionSlot(pool=pool, user_id=user_id, started=time.perf_counter())
+
+    def stats(self) -> dict:
+        return {
+            f"{name}_{key}": value
+            for name, pool in self.pools.items()
+            for key, value in pool.stats().items()
+        }
+
+
+def _build_controller() -> AdmissionController:
+    pools, buckets = {}, {}
+    for name in ("chat", "analytics", "crud"):
+        prefix = f"ADMISSION_{name.upper()}"
+        pools[name] = ConcurrencyPool(
+            name,
+            limit=getattr(settings, f"{prefix}_CONCURRENCY"),
+            max_queue=getattr(settings, f"{prefix}_QUEUE"),
+            per_user=getattr(settings, f"{prefix}_PER_USER"),
+            max_wait=settings.ADMISSION_MAX_WAIT_SECONDS,
+        )
+        rate = getattr(settings, f"{prefix}_RATE_PER_SECOND")
+        if rate > 0:
+            buckets[name] = TokenBucket(name, rate=rate, burst=getattr(settings, f"{prefix}_BURST"))
+    return AdmissionController(pools, buckets)
+
+
+admission_controller = _build_controller()
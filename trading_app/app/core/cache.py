@@ -0,0 +1,166 @@
+
+# trading_app/app/core/cache.py
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable
+
+import orjson
+from loguru import logger
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.core.invalidation import InvalidationBus
+from app.core.redis import redis_client
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    Bounded, in-process cache with per-entry TTL and least-recently-used
+    eviction. Not thread-safe; intended for use from the event loop only.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            return default
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, ttl: float | None = None) -> None:
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class TieredCache:
+    """
+    Two-tier cache: a process-local LRU in front of a shared Redis tier.
+
+    Values must be JSON-serializable. Redis errors are logged and treated as
+    misses so that a Redis outage degrades to the local tier instead of
+    failing the request. With an invalidation bus, `delete` also evicts the
+    key from the local tier of every other worker process.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        *,
+        maxsize: int,
+        ttl: float,
+        redis: Redis | None = None,
+        bus: InvalidationBus | None = None,
+    ):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.local = LRUCache(maxsize=maxsize, ttl=ttl)
+        self.redis = redis if redis is not None else redis_client
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.bus = bus
+        if bus is not None:
+            bus.register(f"cache:{namespace}", self.local.delete)
+
+    def _redis_key(self, key: str) -> str:
+        return f"cache:{self.namespace}:{key}"
+
+    async def get(self, key: str) -> Any:
+        value = self.local.get(key, _MISSING)
+        if value is not _MISSING:
+            self.local_hits += 1
+            return value
+
+        try:
+            raw = await self.redis.get(self._redis_key(key))
+        except RedisError as e:
+            logger.warning(f"Redis read failed for cache '{self.namespace}': {e}")
+            raw = None
+
+        if raw is None:
+            self.misses += 1
+            return None
+
+        self.redis_hits += 1
+        value = orjson.loads(raw)
+        self.local.set(key, value)
+        return value
+
+    async def set(self, key: str, value: Any, ttl: float | None = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        self.local.set(key, value, ttl=ttl)
+        try:
+            await self.redis.set(self._redis_key(key), orjson.dumps(value), ex=max(1, int(ttl)))
+        except RedisError as e:
+            logger.warning(f"Redis write failed for cache '{self.namespace}': {e}")
+
+    async def delete(self, key: str) -> None:
+        self.local.delete(key)
+        try:
+            await self.redis.delete(self._redis_key(key))
+        except RedisError as e:
+            logger.warning(f"Redis delete failed for cache '{self.namespace}': {e}")
+        if self.bus is not None:
+            await self.bus.publish(f"cache:{self.namespace}", key)
+
+    def stats(self) -> dict:
+        hits = self.local_hits + self.redis_hits
+        lookups = hits + self.misses
+        return {
+            "local_hits": self.local_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "local_size": len(self.local),
+        }
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into one underlying call.
+    Every caller receives the same result (or exception). The shared call is
+    shielded, so one caller going away does not cancel it for the others.
+    """
+
+    def __init__(self):
+        self._inflight: dict[str, asyncio.Task] = {}
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _finish(self, key: str, task: asyncio.Task) -> None:
+        self._inflight.pop(key, None)
+        # Mark the exception as retrieved even if every caller went away.
+        if not task.cancelled():
+            task.exception()
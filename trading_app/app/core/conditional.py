@@ -0,0 +1,201 @@
+# trading_app/app/core/conditional.py
+import hashlib
+import hmac
+import uuid
+from typing import Awaitable, Callable, Sequence
+
+from fastapi import Request, Response, status
+from fastapi.responses import ORJSONResponse
+from loguru import logger
+from pydantic import BaseModel
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.core.redis import redis_client
+
+
+class ResourceVersions:
+    """
+    Version counters kept in Redis, one per scope such as
+    "portfolio:<id>", "user:<id>" or "conversation:<id>". Write paths bump
+    them after committing; readers derive ETags from them, so checking a
+    validator costs one MGET and no SQL.
+
+    A bump also sets a marker that lives for `settle_seconds`. While it
+    exists the scope is not cached, so a replica that has not replayed the
+    write yet cannot have its stale answer pinned under the new version.
+
+    A bump that fails leaves the old version in place, so validators for
+    the scope would keep matching. Such scopes are remembered and reported
+    as untrusted here until a retried bump (on the next `get`) succeeds.
+    """
+
+    def __init__(self, redis: Redis | None = None, *, settle_seconds: float):
+        self.redis = redis if redis is not None else redis_client
+        self.settle_seconds = settle_seconds
+        self._unbumped: set[str] = set()
+
+    async def get(self, scopes: Sequence[str]) -> list[int] | None:
+        """
+        Current versions of `scopes`, or None when they cannot be trusted
+        (Redis unavailable, a write still settling or its bump failed).
+        """
+        if self._unbumped:
+            await self.bump(*self._unbumped)
+            if not self._unbumped.isdisjoint(scopes):
+                return None
+        keys = [f"version:{scope}" for scope in scopes]
+        if self.settle_seconds > 0:
+            keys += [f"version:{scope}:settling" for scope in scopes]
+        try:
+            values = await self.redis.mget(keys)
+        except RedisError as e:
+            logger.warning(f"Redis read failed for resource versions: {e}")
+            return None
+        if any(value is not None for value in values[len(scopes):]):
+            return None
+        return [int(value or 0) for value in values[:len(scopes)]]
+
+    async def bump(self, *scopes: str) -> None:
+        """
+        Invalidates every validator and cached body derived from `scopes`.
+        Call after the write has committed.
+        """
+        if not scopes:
+            return
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for scope in scopes:
+                    pipe.incr(f"version:{scope}")
+                    if self.settle_seconds > 0:
+                        pipe.set(f"version:{scope}:settling", 1, px=int(self.settle_seconds * 1000))
+                await pipe.execute()
+        except RedisError as e:
+            self._unbumped.update(scopes)
+            logger.warning(f"Redis write failed for resource versions {scopes}; not caching them until it succeeds: {e}")
+        else:
+            self._unbumped.difference_update(scopes)
+
+
+def _if_none_match(request: Request) -> list[str]:
+    header = request.headers.get("if-none-match")
+    return [candidate.strip() for candidate in header.split(",")] if header else []
+
+
+def _etag_matches(candidates: list[str], etag: str) -> bool:
+    return any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
+
+class ConditionalResponseCache:
+    """
+    Conditional GETs for user-owned resources.
+
+    The ETag is an HMAC over the request URL, the user and the versions of
+    the scopes the response depends on. It is therefore known before any
+    query runs: a matching If-None-Match gets 304 straight away, and the
+    rendered body is cached under the ETag for `ttl` seconds, both in
+    process and in Redis for the other workers. Only the owner who received
+    an ETag can present it, so skipping the ownership query on 304 is safe.
+    `If-None-Match: *` proves nothing, so it is answered only after `build`
+    has run the ownership check.
+    """
+
+    def __init__(
+        self,
+        versions: ResourceVersions,
+        *,
+        secret: str,
+        maxsize: int,
+        ttl: float,
+        redis: Redis | None = None,
+    ):
+        self.versions = versions
+        self.ttl = ttl
+        self._secret = secret.encode()
+        self.local = LRUCache(maxsize=maxsize, ttl=ttl)
+        self.redis = redis if redis is not None else redis_client
+        self.not_modified = 0
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+
+    def etag(self, request: Request, user_id: uuid.UUID, versions: list[int]) -> str:
+        message = f"{request.url.path}?{request.url.query}|{user_id}|{versions}".encode()
+        return '"' + hmac.new(self._secret, message, hashlib.sha256).hexdigest()[:32] + '"'
+
+    async def _get_body(self, etag: str) -> bytes | None:
+        body = self.local.get(etag)
+        if body is not None:
+            return body
+        try:
+            body = await self.redis.get(f"response:{etag}")
+        except RedisError as e:
+            logger.warning(f"Redis read failed for response cache: {e}")
+            return None
+        if body is not None:
+            self.local.set(etag, body)
+        return body
+
+    async def _set_body(self, etag: str, body: bytes) -> None:
+        self.local.set(etag, body)
+        try:
+            await self.redis.set(f"response:{etag}", body, px=max(1, int(self.ttl * 1000)))
+        except RedisError as e:
+            logger.warning(f"Redis write failed for response cache: {e}")
+
+    async def respond(
+        self,
+        request: Request,
+        *,
+        user_id: uuid.UUID,
+        scopes: Sequence[str],
+        build: Callable[[], Awaitable[BaseModel]],
+    ) -> Response:
+        """
+        Returns 304, a cached body or a freshly built one. `build` runs the
+        query (including the ownership check) only on a cache miss.
+        """
+        versions = await self.versions.get(scopes)
+        if versions is None:
+            self.bypassed += 1
+            return ORJSONResponse((await build()).model_dump(mode="json"))
+
+        etag = self.etag(request, user_id, versions)
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        candidates = _if_none_match(request)
+        if _etag_matches(candidates, etag):
+            self.not_modified += 1
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        if "*" in candidates:
+            await build()  # Raises (e.g. 404) unless the resource exists and is the caller's
+            self.not_modified += 1
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        body = await self._get_body(etag)
+        if body is None:
+            self.misses += 1
+            body = ORJSONResponse((await build()).model_dump(mode="json")).body
+            await self._set_body(etag, body)
+        else:
+            self.hits += 1
+        return Response(body, media_type="application/json", headers=headers)
+
+    def stats(self) -> dict:
+        return {
+            "not_modified": self.not_modified,
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "local_size": len(self.local),
+        }
+
+
+resource_versions = ResourceVersions(settle_seconds=settings.RESOURCE_VERSION_SETTLE_SECONDS)
+response_cache = ConditionalResponseCache(
+    resource_versions,
+    secret=settings.SECRET_KEY,
+    maxsize=settings.RESPONSE_CACHE_MAX_ENTRIES,
+    ttl=settings.RESPONSE_CACHE_TTL_SECONDS,
+)
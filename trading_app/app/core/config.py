@@ -1,5 +1,6 @@
 
 # trading-app-backend/app/core/config.py
+from functools import cached_property
 from pydantic import PostgresDsn, computed_field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pathlib import Path
@@ -16,6 +17,37 @@ class Settings(BaseSettings):
     DATABASE_HOST: str = "pgbouncer"
     DATABASE_PORT: int = 6432
     DATABASE_DB: str = "central_db" # The database name
+    DATABASE_READ_HOST: str | None = None  # Replica (or its PgBouncer); defaults to DATABASE_HOST
+    DATABASE_READ_PORT: int | None = None  # Defaults to DATABASE_PORT
+
+    # --- Database Pools ---
+    # The write engine serves auth and every write; the read engine serves
+    # analytics and listings, so a burst of heavy reads cannot starve logins.
+    DB_WRITE_POOL_SIZE: int = 5
+    DB_WRITE_MAX_OVERFLOW: int = 5
+    DB_WRITE_POOL_TIMEOUT_SECONDS: float = 5.0
+    DB_READ_POOL_SIZE: int = 10
+    DB_READ_MAX_OVERFLOW: int = 10
+    DB_READ_POOL_TIMEOUT_SECONDS: float = 10.0
+    DB_POOL_RECYCLE_SECONDS: int = 1_800
+
+    # --- Serving ---
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000
+    WEB_CONCURRENCY: int | None = None  # Worker processes; `python -m app.serve` defaults it to the core count
+    SHUTDOWN_GRACE_SECONDS: float = 25.0  # In-flight requests get this long to finish after SIGTERM
+    # Connections to PgBouncer / the Librarian shared by all web workers. When
+    # set, each worker's pools are derived from them (see app/core/pools.py)
+    # instead of the per-engine sizes above.
+    DB_CONNECTION_BUDGET: int | None = None
+    LIBRARIAN_CONNECTION_BUDGET: int | None = None
+    # The same for the job worker processes (`python -m app.worker`), which
+    # need their own share on top of the web workers' budgets.
+    JOB_WORKER_PROCESSES: int = 1  # Job worker processes sharing the JOB_* budgets
+    JOB_DB_CONNECTION_BUDGET: int | None = None
+    JOB_LIBRARIAN_CONNECTION_BUDGET: int | None = None
+    PROCESS_ROLE: str = "web"  # "job" in job workers; set by app/worker.py
+    CACHE_INVALIDATION_CHANNEL: str = "app:cache-invalidation"
 
     # --- File-based Secret Configuration ---
     # These env vars will contain the path to the secret file inside the container
@@ -28,34 +60,166 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
     LIBRARIAN_API_URL: str = "http://librarian:8000/api/v1/chat"
+    LIBRARIAN_STREAM_API_URL: str = "http://librarian:8000/api/v1/chat/stream"
+    LIBRARIAN_STREAM_READ_TIMEOUT_SECONDS: float = 30.0  # Max silence between chunks
+    LIBRARIAN_BATCH_API_URL: str | None = None  # e.g. http://librarian:8000/api/v1/chat/batch, if offered
 
-    @computed_field
-    @property
-    def DATABASE_URL(self) -> PostgresDsn:
-        """
-        Assembles the full database connection string, reading the password
-        from the secret file.
-        """
+    # --- Librarian Client Resilience ---
+    LIBRARIAN_POOL_LIMIT: int = 100
+    LIBRARIAN_POOL_LIMIT_PER_HOST: int = 50
+    LIBRARIAN_KEEPALIVE_SECONDS: float = 30.0
+    LIBRARIAN_DNS_CACHE_SECONDS: int = 300
+    LIBRARIAN_CONNECT_TIMEOUT_SECONDS: float = 2.0
+    LIBRARIAN_FIRST_BYTE_TIMEOUT_SECONDS: float = 20.0
+    LIBRARIAN_TOTAL_TIMEOUT_SECONDS: float = 30.0
+    LIBRARIAN_MAX_RETRIES: int = 2
+    LIBRARIAN_RETRY_BACKOFF_SECONDS: float = 0.2
+    LIBRARIAN_HEDGE_ENABLED: bool = False
+    LIBRARIAN_HEDGE_MIN_DELAY_SECONDS: float = 0.5  # Floor for the p95-based hedge delay
+    LIBRARIAN_BREAKER_FAILURE_THRESHOLD: int = 5
+    LIBRARIAN_BREAKER_RESET_SECONDS: float = 30.0
+
+    # --- Redis / Caching ---
+    REDIS_URL: str = "redis://redis:6379/0"
+    USER_CACHE_TTL_SECONDS: int = 300
+    USER_CACHE_MAX_ENTRIES: int = 10_000
+    LIBRARIAN_CACHE_TTL_SECONDS: int = 600
+    LIBRARIAN_CACHE_MAX_ENTRIES: int = 1_000
+
+    # --- Admission Control (per worker, per authenticated user) ---
+    # Concurrency limits apply per worker process; token buckets are shared
+    # through Redis. A rate of 0 disables the bucket for that class.
+    ADMISSION_MAX_WAIT_SECONDS: float = 2.0  # Longest a request may queue for a slot
+    ADMISSION_CHAT_CONCURRENCY: int = 32
+    ADMISSION_CHAT_QUEUE: int = 32
+    ADMISSION_CHAT_PER_USER: int = 2
+    ADMISSION_CHAT_RATE_PER_SECOND: float = 0.5
+    ADMISSION_CHAT_BURST: int = 5
+    ADMISSION_ANALYTICS_CONCURRENCY: int = 16
+    ADMISSION_ANALYTICS_QUEUE: int = 64
+    ADMISSION_ANALYTICS_PER_USER: int = 4
+    ADMISSION_ANALYTICS_RATE_PER_SECOND: float = 5.0
+    ADMISSION_ANALYTICS_BURST: int = 20
+    ADMISSION_CRUD_CONCURRENCY: int = 64
+    ADMISSION_CRUD_QUEUE: int = 256
+    ADMISSION_CRUD_PER_USER: int = 8
+    ADMISSION_CRUD_RATE_PER_SECOND: float = 20.0
+    ADMISSION_CRUD_BURST: int = 50
+
+    # --- Conditional Responses ---
+    RESPONSE_CACHE_TTL_SECONDS: float = 10.0  # Rendered bodies, keyed by ETag
+    RESPONSE_CACHE_MAX_ENTRIES: int = 5_000
+    RESOURCE_VERSION_SETTLE_SECONDS: float = 1.0  # No caching right after a write; covers replica lag
+
+    # --- Conversation Write-Behind ---
+    CONVERSATION_WRITE_BATCH_SIZE: int = 100
+    CONVERSATION_WRITE_FLUSH_INTERVAL_SECONDS: float = 0.5
+    CONVERSATION_WRITE_MAX_QUEUE: int = 10_000
+    CONVERSATION_WRITE_MAX_RETRIES: int = 5  # Per batch, on connection loss, deadlocks and the like
+    CONVERSATION_WRITE_RETRY_BACKOFF_SECONDS: float = 0.2
+    CONVERSATION_HISTORY_MAX_TURNS: int = 20  # Context window sent to the Librarian
+    CONVERSATION_HISTORY_MAX_TOKENS: int = 4_000
+
+    # --- AI Batch Queries ---
+    AI_BATCH_MAX_PROMPTS: int = 50
+    AI_BATCH_CONCURRENCY: int = 8  # Upper bound on Librarian calls in flight per batch; each holds a chat slot
+    LIBRARIAN_BATCH_SIZE: int = 10  # Prompts per upstream call when LIBRARIAN_BATCH_API_URL is set
+
+    # --- Transactions ---
+    TRANSACTION_IMPORT_MAX_ERRORS: int = 1_000  # Rejected rows reported in detail
+
+    # --- Market Data ---
+    MARKET_CANDLE_CACHE_MAX_BYTES: int = 256 * 1024 * 1024
+    MARKET_CANDLE_CACHE_WINDOW: int = 100_000  # Most recent candles kept per instrument and resolution
+    MARKET_CANDLE_CACHE_TTL_SECONDS: float = 5.0  # After this, only newer candles are fetched
+    MARKET_MAX_POINTS: int = 10_000  # Upper bound for a chart request's max_points
+    EQUITY_CURVE_CACHE_MAX_ENTRIES: int = 1_000
+    EQUITY_CURVE_CACHE_TTL_SECONDS: float = 30.0  # After this, the last candle onward is recomputed
+    EQUITY_CURVE_MAX_GRID_POINTS: int = 200_000  # Candles an equity curve may span; coarser timeframes beyond
+    RISK_PERIODS_PER_YEAR: int = 365  # Daily candles; markets trade every day
+    RISK_BENCHMARK_INSTRUMENT: str | None = None  # Default for beta; none means beta is omitted
+    RISK_CACHE_MAX_ENTRIES: int = 1_000
+    RISK_CACHE_TTL_SECONDS: int = 3_600
+
+    # --- Live Valuation ---
+    # The Data Pipeline publishes {"instrument_name", "price", "tick"} JSON
+    # messages on LIVE_PRICE_CHANNEL.
+    LIVE_PRICE_CHANNEL: str = "market:prices"
+    LIVE_HOLDINGS_CHANNEL: str = "app:portfolio-holdings"  # Published by transaction writes
+    LIVE_PRICE_RESOLUTION: str = "1"  # Candles used for prices before the first update
+
+    # --- Background Jobs ---
+    JOB_STREAM: str = "jobs"
+    JOB_CONSUMER_GROUP: str = "job-workers"
+    JOB_STREAM_MAX_LENGTH: int = 100_000  # Approximate cap on retained stream entries
+    JOB_RESULT_TTL_SECONDS: int = 3_600
+    JOB_WORKER_CONCURRENCY: int = 16  # Jobs run at once by each worker process
+    JOB_CLAIM_IDLE_SECONDS: float = 120.0  # Jobs of a crashed worker are retried after this
+    JOB_MAX_ATTEMPTS: int = 3
+
+    # --- Startup Warm-up ---
+    DB_WARMUP_CONNECTIONS: int = 5  # Opened through PgBouncer before reporting ready
+    LIBRARIAN_HEALTH_URL: str = "http://librarian:8000/health"
+    LIBRARIAN_WARMUP_CONNECTIONS: int = 4
+    WARMUP_CANDLE_INSTRUMENTS: int = 20  # Most-held instruments whose candles are preloaded
+    WARMUP_RETRY_SECONDS: float = 2.0  # Delay between attempts while the database is unreachable
+
+    # --- Observability ---
+    EVENT_LOOP_LAG_INTERVAL_SECONDS: float = 0.5
+    METRICS_STATS_INTERVAL_SECONDS: float = 5.0  # How often each worker publishes its stats gauges (multiprocess mode)
+
+    # --- Password Hashing ---
+    PASSWORD_HASH_MAX_WORKERS: int = 2
+    PASSWORD_HASH_MAX_QUEUE: int = 32
+    BCRYPT_TARGET_MS: int = 250  # 0 disables calibration and keeps passlib's default cost
+    BCRYPT_ROUNDS: int = 0  # Fixed cost for new hashes; 0 calibrates once against BCRYPT_TARGET_MS
+    BCRYPT_MIN_ROUNDS: int = 10  # Floor for new hashes; stored hashes below it are upgraded on login
+
+    @cached_property
+    def _database_password(self) -> str:
         try:
-            password = self.DATABASE_PASSWORD_FILE.read_text().strip()
+            return self.DATABASE_PASSWORD_FILE.read_text().strip()
         except FileNotFoundError:
             logger.critical(f"Database password file not found at: {self.DATABASE_PASSWORD_FILE}")
             raise
 
+    @computed_field
+    @cached_property
+    def DATABASE_URL(self) -> PostgresDsn:
+        """
+        Assembles the full database connection string, reading the password
+        from the secret file once, on first access.
+        """
         return PostgresDsn.build(
             scheme="postgresql+asyncpg",
             username=self.DATABASE_USER,
-            password=password,
+            password=self._database_password,
             host=self.DATABASE_HOST,
             port=self.DATABASE_PORT,
             path=self.DATABASE_DB,
         )
 
     @computed_field
-    @property
+    @cached_property
+    def DATABASE_READ_URL(self) -> PostgresDsn:
+        """
+        Connection string for read-only traffic. Without a configured replica
+        it points at the primary, so both engines share one database.
+        """
+        return PostgresDsn.build(
+            scheme="postgresql+asyncpg",
+            username=self.DATABASE_USER,
+            password=self._database_password,
+            host=self.DATABASE_READ_HOST or self.DATABASE_HOST,
+            port=self.DATABASE_READ_PORT or self.DATABASE_PORT,
+            path=self.DATABASE_DB,
+        )
+
+    @computed_field
+    @cached_property
     def LIBRARIAN_API_KEY(self) -> str:
         """
-        Reads the Librarian API key from its secret file.
+        Reads the Librarian API key from its secret file once, on first access.
         """
         try:
             return self.LIBRARIAN_API_KEY_FILE.read_text().strip()
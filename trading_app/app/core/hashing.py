@@ -0,0 +1,140 @@
+
+# trading_app/app/core/hashing.py
+import asyncio
+import math
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException, status
+from loguru import logger
+from passlib.hash import bcrypt
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.core import security
+from app.core.config import settings
+
+MAX_BCRYPT_ROUNDS = 16
+# Where the first worker to calibrate publishes the cost for all the others.
+CALIBRATION_KEY = "bcrypt:rounds"
+CALIBRATION_SAMPLES = 5
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt hashing and verification in a dedicated thread pool so that
+    the event loop is never blocked. bcrypt releases the GIL, so threads give
+    real parallelism here.
+
+    At most `max_workers` calls run at once and at most `max_queue` more may
+    wait; beyond that requests are rejected with 503 rather than piling up.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int):
+        self.max_workers = max_workers
+        self.max_pending = max_workers + max_queue
+        self._pending = 0
+        self._executor: ThreadPoolExecutor | None = None
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="bcrypt"
+            )
+        return self._executor
+
+    async def _run(self, fn, *args):
+        if self._pending >= self.max_pending:
+            logger.warning(f"Password hashing queue is full ({self._pending} pending)")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="The service is busy, please retry shortly.",
+                headers={"Retry-After": "1"},
+            )
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            self._pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(security.get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(security.verify_password, plain_password, hashed_password)
+
+    async def verify_and_update(
+        self, plain_password: str, hashed_password: str
+    ) -> tuple[bool, str | None]:
+        """
+        Verifies the password and, if the stored hash uses a different cost
+        than the current one, also returns a fresh hash to persist.
+        """
+        return await self._run(
+            security.pwd_context.verify_and_update, plain_password, hashed_password
+        )
+
+    def use_rounds(self, rounds: int) -> None:
+        """
+        Hashes new passwords with `rounds`. Only hashes below
+        BCRYPT_MIN_ROUNDS are upgraded on login; costlier ones are kept, so
+        a cost change never downgrades a stored hash.
+        """
+        security.pwd_context.update(
+            bcrypt__default_rounds=max(rounds, settings.BCRYPT_MIN_ROUNDS),
+            bcrypt__min_rounds=settings.BCRYPT_MIN_ROUNDS,
+        )
+
+    async def calibrate(self, target_ms: float, redis: Redis) -> int:
+        """
+        Picks the bcrypt cost whose hashing time is closest to `target_ms`.
+        The first worker to get here measures it and publishes it in Redis;
+        every other worker, including after restarts, adopts that value so
+        that all of them agree. Delete CALIBRATION_KEY to recalibrate.
+        """
+        try:
+            shared = await redis.get(CALIBRATION_KEY)
+            if shared is None:
+                measured = await self._run(_calibrate_rounds, target_ms)
+                await redis.set(CALIBRATION_KEY, measured, nx=True)
+                shared = await redis.get(CALIBRATION_KEY)
+            rounds = int(shared)
+        except RedisError as e:
+            # Redis is optional here: fall back to this worker's own measurement.
+            logger.warning(f"Could not share the bcrypt calibration: {e!r}")
+            rounds = await self._run(_calibrate_rounds, target_ms)
+        self.use_rounds(rounds)
+        logger.info(f"Calibrated bcrypt cost to {rounds} rounds (target {target_ms} ms)")
+        return rounds
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+def _calibrate_rounds(target_ms: float) -> int:
+    # Each additional round doubles the work, so timing the floor cost is
+    # enough; the median keeps one noisy sample from skewing the result.
+    floor = settings.BCRYPT_MIN_ROUNDS
+    hasher = bcrypt.using(rounds=floor)
+    samples = []
+    for _ in range(CALIBRATION_SAMPLES):
+        start = time.perf_counter()
+        hasher.hash("calibration-password")
+        samples.append((time.perf_counter() - start) * 1000)
+    elapsed_ms = statistics.median(samples)
+    extra = round(math.log2(max(target_ms, 1) / max(elapsed_ms, 1e-3)))
+    return min(max(floor + extra, floor), MAX_BCRYPT_ROUNDS)
+
+
+password_hasher = PasswordHasher(
+    max_workers=settings.PASSWORD_HASH_MAX_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+)
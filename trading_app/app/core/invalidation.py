@@ -0,0 +1,103 @@
+# trading_app/app/core/invalidation.py
+import asyncio
+import uuid
+from typing import Any, Callable
+
+import orjson
+from loguru import logger
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.clients.resilience import backoff_delay
+from app.core.config import settings
+from app.core.redis import redis_client
+
+InvalidationHandler = Callable[[Any], None]
+
+
+class InvalidationBus:
+    """
+    Cross-worker invalidation of process-local caches over Redis pub/sub.
+
+    `publish` applies an invalidation in this process at once and broadcasts
+    it; every other worker's listener applies it on receipt. Handlers run on
+    the event loop and must be cheap and idempotent. Messages sent while a
+    worker's subscription is down are lost, so stale entries then live until
+    their cache's TTL, as they did before the bus existed.
+    """
+
+    def __init__(self, *, redis: Redis | None = None, channel: str):
+        self.redis = redis if redis is not None else redis_client
+        self.channel = channel
+        self.origin = uuid.uuid4().hex
+        self._handlers: dict[str, InvalidationHandler] = {}
+        self._task: asyncio.Task | None = None
+        self.received = 0
+
+    def register(self, kind: str, handler: InvalidationHandler) -> None:
+        self._handlers[kind] = handler
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._listen(), name="invalidation-bus")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def publish(self, kind: str, data: Any) -> None:
+        """
+        `data` must be JSON-serializable; handlers receive it decoded.
+        """
+        self._apply(kind, data)
+        message = orjson.dumps({"kind": kind, "data": data, "origin": self.origin})
+        try:
+            await self.redis.publish(self.channel, message)
+        except RedisError as e:
+            logger.warning(f"Could not broadcast '{kind}' invalidation: {e}")
+
+    def _apply(self, kind: str, data: Any) -> None:
+        handler = self._handlers.get(kind)
+        if handler is None:
+            logger.warning(f"No handler for '{kind}' invalidations")
+            return
+        handler(data)
+
+    def _handle(self, raw: bytes | str) -> None:
+        message = orjson.loads(raw)
+        if message["origin"] == self.origin:
+            return  # Already applied by `publish`
+        self.received += 1
+        self._apply(message["kind"], message["data"])
+
+    async def _listen(self) -> None:
+        attempt = 0
+        while True:
+            try:
+                async with self.redis.pubsub() as pubsub:
+                    await pubsub.subscribe(self.channel)
+                    attempt = 0
+                    async for message in pubsub.listen():
+                        if message["type"] != "message":
+                            continue
+                        try:
+                            self._handle(message["data"])
+                        except Exception:
+                            logger.exception(f"Invalid message on {self.channel}")
+            except RedisError:
+                delay = backoff_delay(attempt, base=0.5, cap=10.0)
+                attempt += 1
+                logger.warning(f"Invalidation bus lost its Redis subscription; retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    def stats(self) -> dict[str, int]:
+        return {"received": self.received, "handlers": len(self._handlers)}
+
+
+invalidation_bus = InvalidationBus(channel=settings.CACHE_INVALIDATION_CHANNEL)
@@ -0,0 +1,277 @@
+# trading_app/app/core/metrics.py
+import asyncio
+import os
+import time
+from typing import Callable
+
+import aiohttp
+from prometheus_client import CollectorRegistry, Gauge, Histogram, generate_latest, multiprocess
+from prometheus_client.core import REGISTRY, GaugeMetricFamily
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+# Latency buckets from 1 ms to 30 s, covering both DB statements and
+# Librarian calls.
+_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template.",
+    ["method", "route", "status"],
+    buckets=_LATENCY_BUCKETS,
+)
+DB_STATEMENT_DURATION = Histogram(
+    "db_statement_duration_seconds",
+    "SQL statement execution time by engine and statement type.",
+    ["engine", "operation"],
+    buckets=_LATENCY_BUCKETS,
+)
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a connection from the SQLAlchemy pool.",
+    ["engine"],
+    buckets=_LATENCY_BUCKETS,
+)
+LIBRARIAN_REQUEST_DURATION = Histogram(
+    "librarian_request_duration_seconds",
+    "Librarian call timings: connect, first_byte (response headers), total and stream_total.",
+    ["phase", "status"],
+    buckets=_LATENCY_BUCKETS,
+)
+EVENT_LOOP_LAG = Histogram(
+    "event_loop_lag_seconds",
+    "How late the event loop ran a timer; high values mean blocking work on the loop.",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+
+
+class PrometheusMiddleware:
+    """
+    ASGI middleware timing every HTTP request. Routes are labelled with
+    their path template (e.g. /api/v1/portfolios/{portfolio_id}/risk) so
+    that ids do not explode label cardinality; streaming responses are
+    timed until their last chunk.
+    """
+
+    def __init__(self, app, exclude_paths: tuple[str, ...] = ("/metrics",)):
+        self.app = app
+        self.exclude_paths = exclude_paths
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            HTTP_REQUEST_DURATION.labels(
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=str(status_code),
+            ).observe(time.perf_counter() - start)
+
+
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+    """
+    AsyncAdaptedQueuePool that records how long each checkout waited, which
+    separates pool exhaustion from slow statements. The engine label is the
+    pool's `pool_logging_name`, which survives pool recreation.
+    """
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT_WAIT.labels(engine=getattr(self, "logging_name", None) or "default").observe(
+                time.perf_counter() - start
+            )
+
+
+def instrument_engine(engine: AsyncEngine, name: str = "default") -> None:
+    """
+    Times every statement executed through the engine.
+    """
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _start_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _stop_timer(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_start"].pop()
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "UNKNOWN"
+        DB_STATEMENT_DURATION.labels(engine=name, operation=operation).observe(time.perf_counter() - started)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _drop_timer(exception_context):
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("query_start"):
+            connection.info["query_start"].pop()
+
+
+def librarian_trace_config() -> aiohttp.TraceConfig:
+    """
+    aiohttp tracing hooks for connection setup and time to first byte.
+    The total (including reading the body) is observed by the client itself.
+    """
+    trace_config = aiohttp.TraceConfig()
+
+    async def on_request_start(session, ctx, params):
+        ctx.start = time.perf_counter()
+
+    async def on_connection_create_start(session, ctx, params):
+        ctx.connect_start = time.perf_counter()
+
+    async def on_connection_create_end(session, ctx, params):
+        LIBRARIAN_REQUEST_DURATION.labels(phase="connect", status="ok").observe(
+            time.perf_counter() - ctx.connect_start
+        )
+
+    async def on_request_end(session, ctx, params):
+        LIBRARIAN_REQUEST_DURATION.labels(phase="first_byte", status=str(params.response.status)).observe(
+            time.perf_counter() - ctx.start
+        )
+
+    async def on_request_exception(session, ctx, params):
+        LIBRARIAN_REQUEST_DURATION.labels(phase="first_byte", status="error").observe(
+            time.perf_counter() - ctx.start
+        )
+
+    trace_config.on_request_start.append(on_request_start)
+    trace_config.on_connection_create_start.append(on_connection_create_start)
+    trace_config.on_connection_create_end.append(on_connection_create_end)
+    trace_config.on_request_end.append(on_request_end)
+    trace_config.on_request_exception.append(on_request_exception)
+    return trace_config
+
+
+class EventLoopLagMonitor:
+    """
+    Sleeps for `interval` seconds in a loop and records how much later than
+    requested it woke up. Blocking calls on the loop (e.g. CPU-bound work
+    run inline) show up directly as lag.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="event-loop-lag")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            EVENT_LOOP_LAG.observe(max(loop.time() - expected, 0.0))
+
+
+class StatsCollector:
+    """
+    Exposes the `stats()` dicts of in-process components (caches, write
+    queues, ...) as gauges named `<prefix>_<key>`, read at scrape time.
+    Only numeric values are exported.
+
+    In multiprocess mode a scrape cannot call into other workers, so each
+    worker also `publish`es its stats every few seconds to multiprocess
+    gauges, one series per live worker (labelled with its pid).
+    """
+
+    def __init__(self):
+        self._sources: dict[str, Callable[[], dict]] = {}
+        self._gauges: dict[str, Gauge] = {}
+        self._task: asyncio.Task | None = None
+
+    def add(self, prefix: str, stats: Callable[[], dict]) -> None:
+        self._sources[prefix] = stats
+
+    def _samples(self):
+        for prefix, stats in self._sources.items():
+            for key, value in stats().items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                yield f"{prefix}_{key}", f"{prefix} {key.replace('_', ' ')}", value
+
+    def collect(self):
+        for name, documentation, value in self._samples():
+            yield GaugeMetricFamily(name, documentation, value=value)
+
+    def publish(self) -> None:
+        for name, documentation, value in self._samples():
+            gauge = self._gauges.get(name)
+            if gauge is None:
+                # Not registered: in multiprocess mode values are read back
+                # from the files, and `collect` already serves the registry.
+                gauge = self._gauges[name] = Gauge(name, documentation, registry=None, multiprocess_mode="liveall")
+            gauge.set(value)
+
+    def start(self, interval: float) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(interval), name="stats-publisher")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self, interval: float) -> None:
+        while True:
+            self.publish()
+            await asyncio.sleep(interval)
+
+
+stats_collector = StatsCollector()
+REGISTRY.register(stats_collector)
+
+
+def multiprocess_enabled() -> bool:
+    """
+    True when PROMETHEUS_MULTIPROC_DIR is set, as `python -m app.serve`
+    does for its workers.
+    """
+    return bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+
+def render_metrics() -> bytes:
+    """
+    The /metrics exposition. In multiprocess mode it aggregates the files
+    every worker writes, so it covers all workers whichever one serves the
+    scrape.
+    """
+    if not multiprocess_enabled():
+        return generate_latest()
+    stats_collector.publish()  # Other workers' stats are at most one interval old
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry)
@@ -0,0 +1,92 @@
+# trading_app/app/core/pools.py
+from dataclasses import dataclass
+
+from loguru import logger
+
+from app.core.config import Settings, settings
+
+
+@dataclass(frozen=True)
+class EnginePool:
+    size: int
+    max_overflow: int
+
+    @property
+    def connections(self) -> int:
+        return self.size + self.max_overflow
+
+
+@dataclass(frozen=True)
+class WorkerPools:
+    """
+    Connection pool sizes for one worker process.
+    """
+
+    workers: int
+    write: EnginePool
+    read: EnginePool
+    librarian_limit: int
+    librarian_limit_per_host: int
+
+
+def split_engine_budget(connections: int, configured: EnginePool) -> EnginePool:
+    """
+    Fits an engine pool into `connections`, keeping the configured ratio
+    of steady to overflow connections and at least one steady connection.
+    """
+    connections = max(1, connections)
+    size = round(connections * configured.size / max(1, configured.connections))
+    size = min(connections, max(1, size))
+    return EnginePool(size=size, max_overflow=connections - size)
+
+
+def compute_worker_pools(config: Settings) -> WorkerPools:
+    """
+    Derives this worker's pool sizes from the deployment-wide budgets.
+
+    Every worker process opens its own pools, so N workers with the
+    per-engine settings would open N times as many PgBouncer and Librarian
+    connections. With DB_CONNECTION_BUDGET set, each of the WEB_CONCURRENCY
+    workers gets an equal share, split between the write and read engines
+    in proportion to their configured sizes. LIBRARIAN_CONNECTION_BUDGET
+    works the same way for the aiohttp connector. Unset budgets keep the
+    per-worker settings as they are.
+
+    Job workers (PROCESS_ROLE "job") split JOB_DB_CONNECTION_BUDGET and
+    JOB_LIBRARIAN_CONNECTION_BUDGET between JOB_WORKER_PROCESSES instead,
+    so they never take a share meant for the web workers.
+    """
+    if config.PROCESS_ROLE == "job":
+        workers = max(1, config.JOB_WORKER_PROCESSES)
+        db_budget, librarian_budget = config.JOB_DB_CONNECTION_BUDGET, config.JOB_LIBRARIAN_CONNECTION_BUDGET
+    else:
+        workers = max(1, config.WEB_CONCURRENCY or 1)
+        db_budget, librarian_budget = config.DB_CONNECTION_BUDGET, config.LIBRARIAN_CONNECTION_BUDGET
+    write = EnginePool(config.DB_WRITE_POOL_SIZE, config.DB_WRITE_MAX_OVERFLOW)
+    read = EnginePool(config.DB_READ_POOL_SIZE, config.DB_READ_MAX_OVERFLOW)
+    if db_budget:
+        per_worker = db_budget // workers
+        if per_worker < 2:
+            logger.warning(
+                f"A connection budget of {db_budget} is too small for {workers} {config.PROCESS_ROLE} workers; "
+                "giving each worker 2 connections"
+            )
+            per_worker = 2
+        write_share = round(per_worker * write.connections / max(1, write.connections + read.connections))
+        write_share = min(per_worker - 1, max(1, write_share))
+        write = split_engine_budget(write_share, write)
+        read = split_engine_budget(per_worker - write_share, read)
+
+    librarian_limit = config.LIBRARIAN_POOL_LIMIT
+    if librarian_budget:
+        librarian_limit = max(1, librarian_budget // workers)
+    return WorkerPools(
+        workers=workers,
+        write=write,
+        read=read,
+        librarian_limit=librarian_limit,
+        librarian_limit_per_host=min(config.LIBRARIAN_POOL_LIMIT_PER_HOST, librarian_limit),
+    )
+
+
+worker_pools = compute_worker_pools(settings)
@@ -0,0 +1,9 @@
+
+# trading_app/app/core/redis.py
+import redis.asyncio as redis
+
+from app.core.config import settings
+
+# A single connection pool shared by the whole process. No connection is
+# opened until the first command is issued.
+redis_client: redis.Redis = redis.from_url(settings.REDIS_URL)
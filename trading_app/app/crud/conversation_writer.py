@@ -0,0 +1,249 @@
+
+# trading_app/app/crud/conversation_writer.py
+import asyncio
+import time
+import uuid
+
+from loguru import logger
+from sqlalchemy import Integer, column, insert, update, values
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.exc import DataError, DBAPIError, IntegrityError, InterfaceError, OperationalError
+from sqlalchemy.exc import TimeoutError as SQLAlchemyTimeoutError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.clients.resilience import backoff_delay
+from app.core.conditional import ResourceVersions, resource_versions
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.models.conversation import AIConversation, AIConversationTurn
+
+_STOP = object()
+
+# SQLSTATE classes worth retrying: connection exceptions, transaction
+# rollbacks (serialization failures, deadlocks), insufficient resources and
+# operator intervention (e.g. an admin or failover shutdown).
+_TRANSIENT_SQLSTATE_CLASSES = ("08", "40", "53", "57")
+# Data exceptions and integrity constraint violations: the rows are at fault.
+_DATA_SQLSTATE_CLASSES = ("22", "23")
+
+
+def _sqlstate(e: Exception) -> str:
+    orig = getattr(e, "orig", None)
+    return str(getattr(orig, "sqlstate", None) or getattr(orig, "pgcode", None) or "")
+
+
+def _is_transient(e: Exception) -> bool:
+    if isinstance(e, (OperationalError, InterfaceError, SQLAlchemyTimeoutError, OSError)):
+        return True
+    if isinstance(e, DBAPIError) and e.connection_invalidated:
+        return True
+    return _sqlstate(e)[:2] in _TRANSIENT_SQLSTATE_CLASSES
+
+
+def _is_data_error(e: Exception) -> bool:
+    return isinstance(e, (DataError, IntegrityError)) or _sqlstate(e)[:2] in _DATA_SQLSTATE_CLASSES
+
+
+class ConversationWriter:
+    """
+    Write-behind queue for conversation turns.
+
+    A new conversation's header row is written at once by
+    `create_conversation`, so its id can be read back as soon as it is
+    returned. Turns are queued and persisted by a background task in
+    multi-row INSERTs of up to `batch_size` queued items, flushing at least
+    every `flush_interval` seconds. `stop()` drains everything still queued.
+    A flush that hits a transient database error is retried up to
+    `max_retries` times with backoff; one rejected for its data is split
+    until the offending turns are isolated.
+
+    Sequence numbers are allocated by the database at flush time from the
+    conversation's `last_seq` counter, in queue order, so workers writing to
+    the same conversation never collide. With `versions`, each flushed
+    conversation's version is bumped so conditional responses for it are
+    invalidated.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        *,
+        batch_size: int,
+        flush_interval: float,
+        max_queue: int,
+        max_retries: int = 0,
+        retry_backoff: float = 0.0,
+        versions: ResourceVersions | None = None,
+    ):
+        self.session_factory = session_factory
+        self.versions = versions
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._task: asyncio.Task | None = None
+        self.flushed_rows = 0
+        self.failed_rows = 0
+        self.retries = 0
+        self.last_batch_size = 0
+        self.last_flush_seconds = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="conversation-writer")
+
+    async def create_conversation(self, conversation: dict) -> None:
+        """
+        Inserts a conversation header row on the primary and commits before
+        returning, so follow-up requests find the conversation even while
+        its turns are still queued.
+        """
+        async with self.session_factory() as db:
+            await db.execute(insert(AIConversation), [conversation])
+            await db.commit()
+
+    async def enqueue(self, turns: list[dict]) -> None:
+        """
+        Queues turns, without their `seq`, for conversations that already
+        exist. Waits only when the queue is full, which applies backpressure
+        instead of growing memory without bound.
+        """
+        self.start()
+        await self._queue.put(turns)
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        await self._queue.put(_STOP)
+        await self._task
+        self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            first = await self._queue.get()
+            if first is _STOP:
+                break
+            batch = [first]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except TimeoutError:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._flush(batch)
+
+    async def _allocate_seq(self, db: AsyncSession, counts: dict[uuid.UUID, int]) -> dict[uuid.UUID, int]:
+        """
+        Advances each conversation's `last_seq` by its number of new turns
+        and returns the first sequence number allocated to each. The row
+        locks taken by the UPDATE serialize concurrent writers until commit.
+        Conversations that no longer exist are missing from the result.
+        """
+        allocation = values(
+            column("id", UUID(as_uuid=True)), column("count", Integer), name="allocation"
+        ).data(list(counts.items()))
+        result = await db.execute(
+            update(AIConversation)
+            .where(AIConversation.id == allocation.c.id)
+            .values(last_seq=AIConversation.last_seq + allocation.c.count)
+            .returning(AIConversation.id, AIConversation.last_seq)
+        )
+        return {conversation_id: last_seq - counts[conversation_id] + 1 for conversation_id, last_seq in result.all()}
+
+    async def _insert(self, turns: list[dict]) -> list[dict]:
+        """
+        Numbers and inserts `turns` in one transaction; returns the rows
+        written. Turns of conversations deleted since they were queued are
+        skipped and counted as failed.
+        """
+        counts: dict[uuid.UUID, int] = {}
+        for turn in turns:
+            counts[turn["conversation_id"]] = counts.get(turn["conversation_id"], 0) + 1
+        async with self.session_factory() as db:
+            next_seq = await self._allocate_seq(db, counts)
+            rows = []
+            for turn in turns:
+                seq = next_seq.get(turn["conversation_id"])
+                if seq is None:
+                    continue
+                rows.append({**turn, "seq": seq})
+                next_seq[turn["conversation_id"]] = seq + 1
+            if rows:
+                await db.execute(insert(AIConversationTurn), rows)
+            await db.commit()
+        dropped = len(turns) - len(rows)
+        if dropped:
+            self.failed_rows += dropped
+            logger.warning(f"Dropped {dropped} turns of conversations deleted before they were flushed")
+        return rows
+
+    async def _persist(self, turns: list[dict]) -> list[dict]:
+        """
+        `_insert` with transient errors retried after a backoff. When the
+        database rejects the data itself, the turns are split in halves and
+        retried separately, so only the offending rows are dropped.
+        """
+        attempt = 0
+        while True:
+            try:
+                return await self._insert(turns)
+            except Exception as e:
+                if _is_transient(e) and attempt < self.max_retries:
+                    delay = backoff_delay(attempt, self.retry_backoff)
+                    attempt += 1
+                    self.retries += 1
+                    logger.warning(f"Retrying {len(turns)} conversation turns in {delay:.2f}s: {e}")
+                    await asyncio.sleep(delay)
+                    continue
+                if _is_data_error(e) and len(turns) > 1:
+                    middle = len(turns) // 2
+                    return await self._persist(turns[:middle]) + await self._persist(turns[middle:])
+                self.failed_rows += len(turns)
+                logger.exception(f"Failed to persist {len(turns)} conversation turns")
+                return []
+
+    async def _flush(self, batch: list[list[dict]]) -> None:
+        turns = [turn for item_turns in batch for turn in item_turns]
+        start = time.perf_counter()
+        rows = await self._persist(turns)
+        self.last_flush_seconds = time.perf_counter() - start
+        self.last_batch_size = len(rows)
+        self.flushed_rows += len(rows)
+        if self.versions is not None and rows:
+            conversation_ids = {row["conversation_id"] for row in rows}
+            await self.versions.bump(*(f"conversation:{cid}" for cid in conversation_ids))
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self.queue_depth,
+            "flushed_rows": self.flushed_rows,
+            "failed_rows": self.failed_rows,
+            "retries": self.retries,
+            "last_batch_size": self.last_batch_size,
+            "last_flush_seconds": self.last_flush_seconds,
+        }
+
+
+conversation_writer = ConversationWriter(
+    AsyncSessionLocal,
+    batch_size=settings.CONVERSATION_WRITE_BATCH_SIZE,
+    flush_interval=settings.CONVERSATION_WRITE_FLUSH_INTERVAL_SECONDS,
+    max_queue=settings.CONVERSATION_WRITE_MAX_QUEUE,
+    max_retries=settings.CONVERSATION_WRITE_MAX_RETRIES,
+    retry_backoff=settings.CONVERSATION_WRITE_RETRY_BACKOFF_SECONDS,
+    versions=resource_versions,
+)
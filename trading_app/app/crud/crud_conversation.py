@@ -1,23 +1,196 @@
 
 # trading_app/app/crud/crud_conversation.py
+import datetime
 import uuid
+from sqlalchemy import REAL, Row, cast, func, literal, tuple_
+from sqlalchemy.dialects.postgresql import ts_headline, websearch_to_tsquery
 from sqlalchemy.future import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.models.conversation import AIConversation
-
-async def save_conversation(db: AsyncSession, *, user_id: uuid.UUID, prompt: str, response: dict) -> AIConversation:
-    # This is a simplified version. A real implementation would append to existing conversations.
-    conversation_history = [
-        {"role": "user", "content": prompt},
-        {"role": "assistant", "content": response.get("answer", "")}
-    ]
-    
-    db_convo = AIConversation(
+from app.models.conversation import AIConversation, AIConversationTurn
+from app.crud.conversation_writer import conversation_writer
+from app.db.session import use_primary
+
+def estimate_tokens(text: str) -> int:
+    # Rough rule of thumb for English text; good enough to bound prompt size.
+    return max(1, len(text) // 4)
+
+async def get_conversation(db: AsyncSession, *, conversation_id: uuid.UUID, user_id: uuid.UUID) -> AIConversation | None:
+    result = await db.execute(
+        select(AIConversation).filter(
+            AIConversation.id == conversation_id, AIConversation.user_id == user_id
+        )
+    )
+    return result.scalars().first()
+
+async def get_recent_turns(
+    db: AsyncSession, *, conversation_id: uuid.UUID, max_turns: int, max_tokens: int
+) -> list[AIConversationTurn]:
+    """
+    Loads the most recent turns that fit in both `max_turns` and
+    `max_tokens`, oldest first.
+    """
+    result = await db.execute(
+        select(AIConversationTurn)
+        .filter(AIConversationTurn.conversation_id == conversation_id)
+        .order_by(AIConversationTurn.seq.desc())
+        .limit(max_turns)
+    )
+    newest_first = result.scalars().all()
+
+    window: list[AIConversationTurn] = []
+    tokens = 0
+    for turn in newest_first:
+        tokens += turn.token_count
+        if tokens > max_tokens:
+            break
+        window.append(turn)
+    window.reverse()
+    return window
+
+async def get_chat_context(
+    db: AsyncSession, *, user_id: uuid.UUID, conversation_id: uuid.UUID | None, max_turns: int, max_tokens: int
+) -> list[dict] | None:
+    """
+    The bounded history window to send to the Librarian (empty for a new
+    conversation). None when the conversation does not exist or belongs to
+    someone else.
+
+    A conversation created moments ago may not have reached the replica
+    yet, so a miss is checked again on the primary before giving up.
+    """
+    if conversation_id is None:
+        return []
+    conversation = await get_conversation(db, conversation_id=conversation_id, user_id=user_id)
+    if conversation is None:
+        use_primary(db)
+        conversation = await get_conversation(db, conversation_id=conversation_id, user_id=user_id)
+    if conversation is None:
+        return None
+    turns = await get_recent_turns(
+        db, conversation_id=conversation_id, max_turns=max_turns, max_tokens=max_tokens
+    )
+    return [{"role": turn.role, "content": turn.content} for turn in turns]
+
+async def get_turns_page(
+    db: AsyncSession, *, conversation_id: uuid.UUID, before_seq: int | None, limit: int
+) -> list[AIConversationTurn]:
+    """
+    Keyset pagination backwards through a conversation: returns up to
+    `limit` turns with seq < `before_seq`, newest first.
+    """
+    query = select(AIConversationTurn).filter(AIConversationTurn.conversation_id == conversation_id)
+    if before_seq is not None:
+        query = query.filter(AIConversationTurn.seq < before_seq)
+    result = await db.execute(query.order_by(AIConversationTurn.seq.desc()).limit(limit))
+    return list(result.scalars().all())
+
+SEARCH_CONFIG = "english"  # Must match the generated search_vector column
+SEARCH_HEADLINE_OPTIONS = "StartSel=<mark>, StopSel=</mark>, MaxFragments=2, MaxWords=25, MinWords=8"
+
+async def search_turns(
+    db: AsyncSession,
+    *,
+    user_id: uuid.UUID,
+    text: str,
+    after: tuple[float, uuid.UUID, int] | None,
+    limit: int,
+) -> list[Row]:
+    """
+    Full-text search over a user's turns, best match first. `text` uses web
+    search syntax ("quoted phrases", OR, -excluded). Pass the (rank,
+    conversation_id, seq) of the last hit as `after` for the next page.
+
+    Matching runs on the GIN index over search_vector; ts_headline re-parses
+    the content, so it runs only for the rows of the returned page.
+    """
+    tsquery = websearch_to_tsquery(SEARCH_CONFIG, text)
+    rank = func.ts_rank_cd(AIConversationTurn.search_vector, tsquery)
+    matches = (
+        select(
+            AIConversationTurn.conversation_id,
+            AIConversationTurn.seq,
+            AIConversationTurn.role,
+            AIConversationTurn.content,
+            AIConversationTurn.created_at,
+            rank.label("rank"),
+        )
+        .join(AIConversation, AIConversation.id == AIConversationTurn.conversation_id)
+        .filter(AIConversation.user_id == user_id, AIConversationTurn.search_vector.bool_op("@@")(tsquery))
+    )
+    if after is not None:
+        after_rank, after_conversation_id, after_seq = after
+        # ts_rank_cd is a real; compare as one so the boundary row matches exactly.
+        matches = matches.filter(
+            tuple_(rank, AIConversationTurn.conversation_id, AIConversationTurn.seq)
+            < tuple_(cast(literal(after_rank), REAL), after_conversation_id, after_seq)
+        )
+    page = (
+        matches.order_by(rank.desc(), AIConversationTurn.conversation_id.desc(), AIConversationTurn.seq.desc())
+        .limit(limit)
+        .subquery()
+    )
+    result = await db.execute(
+        select(
+            page.c.conversation_id,
+            page.c.seq,
+            page.c.role,
+            page.c.created_at,
+            page.c.rank,
+            ts_headline(SEARCH_CONFIG, page.c.content, tsquery, SEARCH_HEADLINE_OPTIONS).label("snippet"),
+        ).order_by(page.c.rank.desc(), page.c.conversation_id.desc(), page.c.seq.desc())
+    )
+    return list(result.all())
+
+async def queue_turn(
+    *,
+    user_id: uuid.UUID,
+    conversation_id: uuid.UUID | None,
+    prompt: str,
+    response: dict,
+) -> uuid.UUID:
+    """
+    Hands a prompt/answer pair to the write-behind queue and returns the
+    conversation id. A new conversation is created first, when
+    `conversation_id` is None, and exists by the time its id is returned;
+    the turns become visible once the next batch is flushed.
+    """
+    return await queue_exchanges(
         user_id=user_id,
-        history=conversation_history,
-        summary=prompt[:100] # Simple summary
+        conversation_id=conversation_id,
+        exchanges=[(prompt, response)],
     )
-    db.add(db_convo)
-    await db.commit()
-    await db.refresh(db_convo)
-    return db_convo
\ No newline at end of file
+
+async def queue_exchanges(
+    *,
+    user_id: uuid.UUID,
+    conversation_id: uuid.UUID | None,
+    exchanges: list[tuple[str, dict]],
+) -> uuid.UUID:
+    """
+    Like `queue_turn` for several prompt/answer pairs at once. They are
+    queued as a single item, so they land in the same multi-row INSERT.
+    """
+    now = datetime.datetime.now(datetime.timezone.utc)
+    if conversation_id is None:
+        conversation_id = uuid.uuid4()
+        await conversation_writer.create_conversation({
+            "id": conversation_id,
+            "user_id": user_id,
+            "created_at": now,
+            "summary": exchanges[0][0][:100],
+        })
+
+    # Sequence numbers are assigned by the writer when the turns are flushed.
+    turns = []
+    for prompt, response in exchanges:
+        answer = response.get("answer", "")
+        for role, content in (("user", prompt), ("assistant", answer)):
+            turns.append({
+                "conversation_id": conversation_id,
+                "role": role,
+                "content": content,
+                "token_count": estimate_tokens(content),
+                "created_at": now,
+            })
+    await conversation_writer.enqueue(turns)
+    return conversation_id
@@ -0,0 +1,191 @@
+# trading_app/app/crud/crud_market.py
+import math
+import time
+from sqlalchemy import Select, func
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.future import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.models.market import OHLC, Instrument
+from app.services.market_data import CandleCache, Candles, downsample
+
+# Most recent candles per (instrument, resolution); older ranges go to the DB.
+candle_cache = CandleCache(max_bytes=settings.MARKET_CANDLE_CACHE_MAX_BYTES)
+
+_CANDLE_COLUMNS = (OHLC.tick, OHLC.open, OHLC.high, OHLC.low, OHLC.close, OHLC.volume)
+
+async def get_instrument(db: AsyncSession, *, instrument_name: str) -> Instrument | None:
+    result = await db.execute(select(Instrument).filter(Instrument.instrument_name == instrument_name))
+    return result.scalars().first()
+
+async def list_instruments(db: AsyncSession, *, kind: str | None = None) -> list[Instrument]:
+    query = select(Instrument).order_by(Instrument.instrument_name)
+    if kind is not None:
+        query = query.filter(Instrument.kind == kind)
+    result = await db.execute(query)
+    return list(result.scalars().all())
+
+async def fetch_candles(
+    db: AsyncSession,
+    *,
+    instrument_name: str,
+    resolution: str,
+    start: int | None = None,
+    end: int | None = None,
+) -> Candles:
+    """
+    Reads candles with start <= tick < end straight into arrays.
+    """
+    query = _range_filter(select(*_CANDLE_COLUMNS), instrument_name, resolution, start, end)
+    result = await db.execute(query.order_by(OHLC.tick))
+    return Candles.from_rows(result.all())
+
+def _range_filter(query: Select, instrument_name: str, resolution: str, start: int | None, end: int | None) -> Select:
+    query = query.filter(OHLC.instrument_name == instrument_name, OHLC.resolution == resolution)
+    if start is not None:
+        query = query.filter(OHLC.tick >= start)
+    if end is not None:
+        query = query.filter(OHLC.tick < end)
+    return query
+
+def build_bucket_query(
+    *, instrument_name: str, resolution: str, start: int | None, end: int | None, origin: int, width: int
+) -> Select:
+    """
+    Candles with start <= tick < end merged into buckets of `width` ms from
+    `origin`: first open, highest high, lowest low, last close, summed
+    volume, one row per bucket.
+    """
+    first_tick = func.min(OHLC.tick)
+    query = select(
+        first_tick,
+        func.array_agg(aggregate_order_by(OHLC.open, OHLC.tick.asc()))[1],
+        func.max(OHLC.high),
+        func.min(OHLC.low),
+        func.array_agg(aggregate_order_by(OHLC.close, OHLC.tick.desc()))[1],
+        func.sum(OHLC.volume),
+    )
+    query = _range_filter(query, instrument_name, resolution, start, end)
+    return query.group_by((OHLC.tick - origin) // width).order_by(first_tick)
+
+async def fetch_latest_candles(
+    db: AsyncSession, *, instrument_name: str, resolution: str, limit: int
+) -> Candles:
+    result = await db.execute(
+        select(*_CANDLE_COLUMNS)
+        .filter(OHLC.instrument_name == instrument_name, OHLC.resolution == resolution)
+        .order_by(OHLC.tick.desc())
+        .limit(limit)
+    )
+    return Candles.from_rows(result.all()[::-1])
+
+async def get_recent_candles(db: AsyncSession, *, instrument_name: str, resolution: str) -> Candles:
+    """
+    The latest MARKET_CANDLE_CACHE_WINDOW candles, served from the candle
+    cache. A stale entry is topped up with only the candles from its last
+    tick onward (that candle may have been still forming) instead of being
+    reloaded.
+    """
+    key = (instrument_name, resolution)
+    now = time.monotonic()
+    entry = candle_cache.get(key)
+    if entry is not None and now - entry[0] < settings.MARKET_CANDLE_CACHE_TTL_SECONDS:
+        return entry[1]
+    if entry is None or not len(entry[1]):
+        candles = await fetch_latest_candles(
+            db,
+            instrument_name=instrument_name,
+            resolution=resolution,
+            limit=settings.MARKET_CANDLE_CACHE_WINDOW,
+        )
+    else:
+        cached = entry[1]
+        newer = await fetch_candles(
+            db, instrument_name=instrument_name, resolution=resolution, start=int(cached.tick[-1])
+        )
+        candles = cached.merge(newer, max_length=settings.MARKET_CANDLE_CACHE_WINDOW)
+    candle_cache.set(key, candles, fetched_at=now)
+    return candles
+
+async def get_candles(
+    db: AsyncSession,
+    *,
+    instrument_name: str,
+    resolution: str,
+    start: int | None = None,
+    end: int | None = None,
+) -> Candles:
+    """
+    Candles with start <= tick < end. Ranges inside the cached window are
+    sliced from memory; anything reaching further back is read from the DB
+    row by row, so callers must bound the range. Charts over arbitrary
+    ranges use `get_chart_candles`.
+    """
+    recent = await get_recent_candles(db, instrument_name=instrument_name, resolution=resolution)
+    if _covers(recent, start):
+        return recent.between(start, end)
+    return await fetch_candles(
+        db, instrument_name=instrument_name, resolution=resolution, start=start, end=end
+    )
+
+async def get_chart_candles(
+    db: AsyncSession,
+    *,
+    instrument_name: str,
+    resolution: str,
+    start: int | None,
+    end: int | None,
+    max_points: int,
+    method: str,
+) -> tuple[Candles, int]:
+    """
+    At most `max_points` candles covering start <= tick < end, and how many
+    candles they stand for. Ranges inside the cached window, or holding no
+    more candles than it, are downsampled in memory with `method`. Anything
+    larger is merged into OHLC buckets by the database whatever `method`
+    is, so a long history never leaves it row by row.
+    """
+    recent = await get_recent_candles(db, instrument_name=instrument_name, resolution=resolution)
+    if _covers(recent, start):
+        candles = recent.between(start, end)
+        return downsample(candles, max_points, method), len(candles)
+
+    bounds = select(func.min(OHLC.tick), func.max(OHLC.tick), func.count())
+    first, last, count = (
+        await db.execute(_range_filter(bounds, instrument_name, resolution, start, end))
+    ).one()
+    if count <= settings.MARKET_CANDLE_CACHE_WINDOW:
+        candles = await fetch_candles(
+            db, instrument_name=instrument_name, resolution=resolution, start=start, end=end
+        )
+        return downsample(candles, max_points, method), len(candles)
+    query = build_bucket_query(
+        instrument_name=instrument_name,
+        resolution=resolution,
+        start=start,
+        end=end,
+        origin=first,
+        width=math.ceil((last - first + 1) / max_points),
+    )
+    result = await db.execute(query)
+    return Candles.from_rows(result.all()), count
+
+def _covers(recent: Candles, start: int | None) -> bool:
+    # A window shorter than its cap already holds the full history.
+    return len(recent) < settings.MARKET_CANDLE_CACHE_WINDOW or (start is not None and start >= recent.tick[0])
+
+async def get_latest_closes(
+    db: AsyncSession, *, instrument_names: list[str], resolution: str
+) -> dict[str, tuple[int, float]]:
+    """
+    (tick, close) of the newest candle of each instrument, in one query.
+    """
+    if not instrument_names:
+        return {}
+    result = await db.execute(
+        select(OHLC.instrument_name, OHLC.tick, OHLC.close)
+        .filter(OHLC.instrument_name.in_(instrument_names), OHLC.resolution == resolution)
+        .distinct(OHLC.instrument_name)
+        .order_by(OHLC.instrument_name, OHLC.tick.desc())
+    )
+    return {name: (tick, close) for name, tick, close in result.all()}
@@ -0,0 +1,12 @@
+
+# trading_app/app/crud/crud_portfolio.py
+import uuid
+from sqlalchemy.future import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.portfolio import Portfolio
+
+async def get_portfolio(db: AsyncSession, *, portfolio_id: uuid.UUID, user_id: uuid.UUID) -> Portfolio | None:
+    result = await db.execute(
+        select(Portfolio).filter(Portfolio.id == portfolio_id, Portfolio.user_id == user_id)
+    )
+    return result.scalars().first()
@@ -0,0 +1,208 @@
+
+# trading_app/app/crud/crud_position_snapshot.py
+import datetime
+import uuid
+from decimal import Decimal
+from sqlalchemy import case, delete, func, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.future import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.conditional import resource_versions
+from app.models.portfolio import Portfolio, PositionSnapshot, Transaction
+from app.services.positions import RunningCost, SnapshotDelta
+
+_AGGREGATES = ("buy_quantity", "buy_cost", "sell_quantity", "sell_proceeds", "transaction_count")
+_RUNNING = ("held_quantity", "held_cost", "realized_pnl")
+
+# Snapshot sums are rounded to 8 decimals per transaction while a rebuild
+# rounds once, so allow for accumulated rounding when comparing.
+_TOLERANCE = Decimal("0.0001")
+
+async def get_snapshots(db: AsyncSession, *, portfolio_id: uuid.UUID) -> list[PositionSnapshot]:
+    result = await db.execute(
+        select(PositionSnapshot)
+        .filter(PositionSnapshot.portfolio_id == portfolio_id)
+        .order_by(PositionSnapshot.instrument_ticker)
+    )
+    return list(result.scalars().all())
+
+async def get_most_held_tickers(db: AsyncSession, *, limit: int) -> list[str]:
+    """
+    Instruments with open positions in the most portfolios.
+    """
+    result = await db.execute(
+        select(PositionSnapshot.instrument_ticker)
+        .filter(PositionSnapshot.buy_quantity != PositionSnapshot.sell_quantity)
+        .group_by(PositionSnapshot.instrument_ticker)
+        .order_by(func.count().desc())
+        .limit(limit)
+    )
+    return list(result.scalars().all())
+
+async def _lock_portfolio(db: AsyncSession, portfolio_id: uuid.UUID) -> None:
+    # Snapshot writers take the portfolio row lock first, so the running
+    # average of a portfolio is advanced by one transaction at a time.
+    await db.execute(select(Portfolio.id).filter(Portfolio.id == portfolio_id).with_for_update())
+
+async def apply_deltas(
+    db: AsyncSession, *, portfolio_id: uuid.UUID, deltas: dict[str, SnapshotDelta]
+) -> None:
+    """
+    Adds each ticker's delta to its snapshot row in one multi-row upsert.
+    Runs in the caller's transaction; the caller commits.
+    """
+    if not deltas:
+        return
+    await _lock_portfolio(db, portfolio_id)
+    stmt = pg_insert(PositionSnapshot).values([
+        {
+            "portfolio_id": portfolio_id,
+            "instrument_ticker": ticker,
+            **{name: getattr(delta, name) for name in _AGGREGATES},
+        }
+        for ticker, delta in deltas.items()
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[PositionSnapshot.portfolio_id, PositionSnapshot.instrument_ticker],
+        set_={
+            **{name: getattr(PositionSnapshot, name) + getattr(stmt.excluded, name) for name in _AGGREGATES},
+            "updated_at": func.now(),
+        },
+    )
+    await db.execute(stmt)
+    if any(delta.transaction_count < 0 for delta in deltas.values()):
+        # Drop tickers whose last transaction was removed.
+        await db.execute(
+            delete(PositionSnapshot).filter(
+                PositionSnapshot.portfolio_id == portfolio_id,
+                PositionSnapshot.transaction_count <= 0,
+            )
+        )
+
+async def apply_transaction(
+    db: AsyncSession, *, transaction: Transaction, sign: int = 1
+) -> None:
+    """
+    Applies (sign=1) or reverts (sign=-1) a single transaction's contribution.
+    """
+    delta = SnapshotDelta()
+    delta.add(transaction.transaction_type, Decimal(transaction.quantity), Decimal(transaction.price), sign)
+    await apply_deltas(db, portfolio_id=transaction.portfolio_id, deltas={transaction.instrument_ticker: delta})
+
+def _as_utc(value: datetime.datetime) -> datetime.datetime:
+    # The database returns aware dates; ORM objects built in this process
+    # may still hold naive ones, which are taken as UTC like on insert.
+    return value.replace(tzinfo=datetime.timezone.utc) if value.tzinfo is None else value
+
+async def advance_running_cost(db: AsyncSession, *, transaction: Transaction) -> None:
+    """
+    Folds a new transaction into its ticker's running average. Call after
+    `apply_transaction` for an insert; a transaction dated before the last
+    one applied falls back to replaying the ticker.
+    """
+    await _lock_portfolio(db, transaction.portfolio_id)
+    snapshot = (await db.execute(
+        select(PositionSnapshot)
+        .filter(
+            PositionSnapshot.portfolio_id == transaction.portfolio_id,
+            PositionSnapshot.instrument_ticker == transaction.instrument_ticker,
+        )
+        .execution_options(populate_existing=True)
+    )).scalars().first()
+    last_date = snapshot.last_transaction_date if snapshot is not None else None
+    if snapshot is None or (last_date is not None and _as_utc(transaction.transaction_date) < _as_utc(last_date)):
+        await replay_running_cost(db, portfolio_id=transaction.portfolio_id, tickers={transaction.instrument_ticker})
+        return
+    state = RunningCost(*(Decimal(getattr(snapshot, name)) for name in _RUNNING))
+    state.apply(transaction.transaction_type, Decimal(transaction.quantity), Decimal(transaction.price))
+    for name in _RUNNING:
+        setattr(snapshot, name, getattr(state, name))
+    snapshot.last_transaction_date = transaction.transaction_date
+
+async def _replay(
+    db: AsyncSession, *, portfolio_id: uuid.UUID, tickers: set[str] | None
+) -> dict[str, tuple[RunningCost, datetime.datetime]]:
+    query = (
+        select(
+            Transaction.instrument_ticker,
+            Transaction.transaction_type,
+            Transaction.quantity,
+            Transaction.price,
+            Transaction.transaction_date,
+        )
+        .filter(Transaction.portfolio_id == portfolio_id)
+        .order_by(Transaction.instrument_ticker, Transaction.transaction_date, Transaction.id)
+    )
+    if tickers is not None:
+        query = query.filter(Transaction.instrument_ticker.in_(tickers))
+    states: dict[str, tuple[RunningCost, datetime.datetime]] = {}
+    for ticker, transaction_type, quantity, price, date in (await db.execute(query)).all():
+        state = states[ticker][0] if ticker in states else RunningCost()
+        state.apply(transaction_type, Decimal(quantity), Decimal(price))
+        states[ticker] = (state, date)
+    return states
+
+async def replay_running_cost(db: AsyncSession, *, portfolio_id: uuid.UUID, tickers: set[str]) -> None:
+    """
+    Recomputes the running average of `tickers` from their transactions,
+    after an update, delete, import or backdated insert. Flushes first so
+    pending changes are included; the caller commits.
+    """
+    await db.flush()
+    states = await _replay(db, portfolio_id=portfolio_id, tickers=tickers)
+    if states:
+        await db.execute(update(PositionSnapshot), [
+            {
+                "portfolio_id": portfolio_id,
+                "instrument_ticker": ticker,
+                **{name: getattr(state, name) for name in _RUNNING},
+                "last_transaction_date": date,
+            }
+            for ticker, (state, date) in states.items()
+        ])
+
+async def rebuild_portfolio(db: AsyncSession, *, portfolio_id: uuid.UUID) -> dict:
+    """
+    Recomputes a portfolio's snapshots from its transactions, compares them
+    with the stored rows and, if anything differs, replaces them. Commits.
+    Returns the number of tickers checked and those that did not match.
+    """
+    is_buy = Transaction.transaction_type == "BUY"
+    notional = Transaction.quantity * Transaction.price
+    result = await db.execute(
+        select(
+            Transaction.instrument_ticker,
+            func.sum(case((is_buy, Transaction.quantity), else_=0)),
+            func.round(func.sum(case((is_buy, notional), else_=0)), 8),
+            func.sum(case((is_buy, 0), else_=Transaction.quantity)),
+            func.round(func.sum(case((is_buy, 0), else_=notional)), 8),
+            func.count(),
+        )
+        .filter(Transaction.portfolio_id == portfolio_id)
+        .group_by(Transaction.instrument_ticker)
+    )
+    expected = {row[0]: SnapshotDelta(*row[1:]) for row in result.all()}
+    expected_running = await _replay(db, portfolio_id=portfolio_id, tickers=None)
+    snapshots = {snapshot.instrument_ticker: snapshot for snapshot in await get_snapshots(db, portfolio_id=portfolio_id)}
+
+    def matches(ticker: str) -> bool:
+        delta, snapshot, running = expected.get(ticker), snapshots.get(ticker), expected_running.get(ticker)
+        if delta is None or snapshot is None or running is None:
+            return False
+        return delta.transaction_count == snapshot.transaction_count and all(
+            abs(Decimal(getattr(delta, name)) - Decimal(getattr(snapshot, name))) <= _TOLERANCE
+            for name in _AGGREGATES[:-1]
+        ) and all(
+            abs(getattr(running[0], name) - Decimal(getattr(snapshot, name))) <= _TOLERANCE
+            for name in _RUNNING
+        )
+
+    mismatched = sorted(ticker for ticker in expected.keys() | snapshots.keys() if not matches(ticker))
+    if mismatched:
+        await _lock_portfolio(db, portfolio_id)
+        await db.execute(delete(PositionSnapshot).filter(PositionSnapshot.portfolio_id == portfolio_id))
+        await apply_deltas(db, portfolio_id=portfolio_id, deltas=expected)
+        await replay_running_cost(db, portfolio_id=portfolio_id, tickers=set(expected))
+        await db.commit()
+        await resource_versions.bump(f"portfolio:{portfolio_id}")
+    return {"tickers_checked": len(expected.keys() | snapshots.keys()), "mismatched_tickers": mismatched}
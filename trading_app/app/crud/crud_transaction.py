@@ -1,17 +1,174 @@
 
 # trading_app/app/crud/crud_transaction.py
+import datetime
 import uuid
+from typing import AsyncIterator
+from sqlalchemy import Float, Select, cast, tuple_
 from sqlalchemy.future import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.models.portfolio import Transaction
+from app.core.conditional import resource_versions
+from app.core.invalidation import invalidation_bus
+from app.crud import crud_position_snapshot
+from app.db.session import use_primary
+from app.models.portfolio import Portfolio, Transaction
 from app.schemas.transaction import TransactionCreate, TransactionUpdate
+from app.services.live_valuation import valuation_hub
+from app.services.positions import TransactionArrays
+from app.services.transaction_import import IMPORT_COLUMNS
+
+async def notify_portfolio_changed(
+    portfolio_id: uuid.UUID, changed_from: datetime.datetime, *, user_id: uuid.UUID
+) -> None:
+    """
+    Call after committing transaction writes: equity curves are recomputed
+    from `changed_from` onward, live valuations reload the holdings and
+    conditional responses for the portfolio and its owner are invalidated.
+    """
+    await invalidation_bus.publish(
+        "equity_curve_dirty",
+        {"portfolio_id": str(portfolio_id), "tick": int(changed_from.timestamp() * 1000)},
+    )
+    await resource_versions.bump(f"portfolio:{portfolio_id}", f"user:{user_id}")
+    await valuation_hub.publish_holdings_changed(portfolio_id)
 
 async def create_transaction(db: AsyncSession, *, transaction_in: TransactionCreate, user_id: uuid.UUID) -> Transaction:
     # Note: In a real app, we would also verify that the portfolio belongs to the user_id.
     db_transaction = Transaction(**transaction_in.model_dump())
     db.add(db_transaction)
+    await crud_position_snapshot.apply_transaction(db, transaction=db_transaction)
+    await crud_position_snapshot.advance_running_cost(db, transaction=db_transaction)
+    await db.commit()
+    await db.refresh(db_transaction)
+    await notify_portfolio_changed(
+        db_transaction.portfolio_id, db_transaction.transaction_date, user_id=user_id
+    )
+    return db_transaction
+
+async def get_transaction(db: AsyncSession, *, transaction_id: uuid.UUID, user_id: uuid.UUID) -> Transaction | None:
+    result = await db.execute(
+        select(Transaction)
+        .join(Portfolio, Portfolio.id == Transaction.portfolio_id)
+        .filter(Transaction.id == transaction_id, Portfolio.user_id == user_id)
+    )
+    return result.scalars().first()
+
+async def update_transaction(
+    db: AsyncSession, *, db_transaction: Transaction, transaction_in: TransactionUpdate, user_id: uuid.UUID
+) -> Transaction:
+    """
+    Reverts the old values from the position snapshot and applies the new
+    ones in the same database transaction as the row update.
+    """
+    previous_date, previous_ticker = db_transaction.transaction_date, db_transaction.instrument_ticker
+    await crud_position_snapshot.apply_transaction(db, transaction=db_transaction, sign=-1)
+    for field, value in transaction_in.model_dump().items():
+        setattr(db_transaction, field, value)
+    await crud_position_snapshot.apply_transaction(db, transaction=db_transaction)
+    await crud_position_snapshot.replay_running_cost(
+        db, portfolio_id=db_transaction.portfolio_id, tickers={previous_ticker, db_transaction.instrument_ticker}
+    )
     await db.commit()
     await db.refresh(db_transaction)
+    await notify_portfolio_changed(
+        db_transaction.portfolio_id,
+        min(previous_date, db_transaction.transaction_date),
+        user_id=user_id,
+    )
     return db_transaction
 
-# Additional CRUD functions (get, get_multi, update, remove) would be added here.
\ No newline at end of file
+async def delete_transaction(db: AsyncSession, *, db_transaction: Transaction, user_id: uuid.UUID) -> None:
+    portfolio_id, changed_from = db_transaction.portfolio_id, db_transaction.transaction_date
+    ticker = db_transaction.instrument_ticker
+    await crud_position_snapshot.apply_transaction(db, transaction=db_transaction, sign=-1)
+    await db.delete(db_transaction)
+    await crud_position_snapshot.replay_running_cost(db, portfolio_id=portfolio_id, tickers={ticker})
+    await db.commit()
+    await notify_portfolio_changed(portfolio_id, changed_from, user_id=user_id)
+
+async def get_transaction_arrays(db: AsyncSession, *, portfolio_id: uuid.UUID) -> TransactionArrays:
+    """
+    Loads every transaction of a portfolio in one query, straight into
+    columnar arrays. Numerics are cast to float8 in SQL so rows arrive as
+    floats rather than Decimals and no ORM objects are built.
+    """
+    result = await db.execute(
+        select(
+            Transaction.instrument_ticker,
+            Transaction.transaction_type,
+            cast(Transaction.quantity, Float),
+            cast(Transaction.price, Float),
+            Transaction.transaction_date,
+        )
+        .filter(Transaction.portfolio_id == portfolio_id)
+        .order_by(Transaction.instrument_ticker, Transaction.transaction_date)
+    )
+    return TransactionArrays.from_rows(result.all())
+
+async def copy_transactions(
+    db: AsyncSession, *, records: AsyncIterator[tuple]
+) -> int:
+    """
+    Streams records (in IMPORT_COLUMNS order) into app_data.transactions with
+    PostgreSQL COPY on the session's connection, inside its transaction.
+    The caller commits. Returns the number of rows copied.
+    """
+    # The router cannot see a raw COPY, so pin the session to the primary.
+    use_primary(db)
+    connection = await db.connection()
+    raw_connection = await connection.get_raw_connection()
+    status = await raw_connection.driver_connection.copy_records_to_table(
+        Transaction.__tablename__,
+        schema_name=Transaction.__table__.schema,
+        columns=IMPORT_COLUMNS,
+        records=records,
+    )
+    # asyncpg returns the command tag, e.g. "COPY 1234".
+    return int(status.split()[-1])
+
+def build_transactions_query(
+    *,
+    user_id: uuid.UUID,
+    portfolio_id: uuid.UUID | None = None,
+    ticker: str | None = None,
+    side: str | None = None,
+    start: datetime.datetime | None = None,
+    end: datetime.datetime | None = None,
+    after: tuple[datetime.datetime, uuid.UUID] | None = None,
+) -> Select:
+    """
+    Newest-first listing of a user's transactions. `after` is the
+    (transaction_date, id) of the last row already seen; rows strictly
+    older than it are returned (keyset pagination), which the
+    (portfolio_id, transaction_date, id) index serves without an offset scan.
+    """
+    query = (
+        select(Transaction)
+        .join(Portfolio, Portfolio.id == Transaction.portfolio_id)
+        .filter(Portfolio.user_id == user_id)
+    )
+    if portfolio_id is not None:
+        query = query.filter(Transaction.portfolio_id == portfolio_id)
+    if ticker is not None:
+        query = query.filter(Transaction.instrument_ticker == ticker)
+    if side is not None:
+        query = query.filter(Transaction.transaction_type == side)
+    if start is not None:
+        query = query.filter(Transaction.transaction_date >= start)
+    if end is not None:
+        query = query.filter(Transaction.transaction_date < end)
+    if after is not None:
+        query = query.filter(tuple_(Transaction.transaction_date, Transaction.id) < tuple_(*after))
+    return query.order_by(Transaction.transaction_date.desc(), Transaction.id.desc())
+
+async def get_transactions_page(db: AsyncSession, *, query: Select, limit: int) -> list[Transaction]:
+    result = await db.execute(query.limit(limit))
+    return list(result.scalars().all())
+
+async def stream_transactions(db: AsyncSession, *, query: Select, batch_size: int = 1_000) -> AsyncIterator[Transaction]:
+    """
+    Iterates over the query through a server-side cursor, fetching
+    `batch_size` rows at a time so memory stays flat for any history size.
+    """
+    result = await db.stream(query.execution_options(yield_per=batch_size))
+    async for transaction in result.scalars():
+        yield transaction
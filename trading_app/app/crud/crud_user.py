@@ -1,17 +1,48 @@
 
 # trading_app/app/crud/crud_user.py
+import uuid
 from sqlalchemy.future import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.user import User
-from app.schemas.user import UserCreate
-from app.core.security import get_password_hash
+from app.schemas.user import UserCreate, UserUpdate
+from app.core.cache import TieredCache
+from app.core.config import settings
+from app.core.hashing import password_hasher
+from app.core.invalidation import invalidation_bus
+
+# Caches the minimal identity needed to authorize a request, keyed by the
+# JWT subject (email). Password hashes are deliberately never cached.
+user_identity_cache = TieredCache(
+    "user",
+    maxsize=settings.USER_CACHE_MAX_ENTRIES,
+    ttl=settings.USER_CACHE_TTL_SECONDS,
+    bus=invalidation_bus,
+)
 
 async def get_user_by_email(db: AsyncSession, email: str) -> User | None:
     result = await db.execute(select(User).filter(User.email == email))
     return result.scalars().first()
 
+async def get_cached_user_by_email(db: AsyncSession, email: str) -> User | None:
+    """
+    Returns a detached User carrying only id, email and is_active, served
+    from the identity cache when possible.
+    """
+    identity = await user_identity_cache.get(email)
+    if identity is None:
+        user = await get_user_by_email(db, email=email)
+        if user is None:
+            return None
+        identity = {"id": str(user.id), "email": user.email, "is_active": user.is_active}
+        await user_identity_cache.set(email, identity)
+    return User(
+        id=uuid.UUID(identity["id"]),
+        email=identity["email"],
+        is_active=identity["is_active"],
+    )
+
 async def create_user(db: AsyncSession, *, user_in: UserCreate) -> User:
-    hashed_password = get_password_hash(user_in.password)
+    hashed_password = await password_hasher.hash(user_in.password)
     db_user = User(
         email=user_in.email,
         hashed_password=hashed_password,
@@ -19,4 +50,29 @@ async def create_user(db: AsyncSession, *, user_in: UserCreate) -> User:
     db.add(db_user)
     await db.commit()
     await db.refresh(db_user)
-    return db_user
\ No newline at end of file
+    return db_user
+
+async def update_user(db: AsyncSession, *, db_user: User, user_in: UserUpdate) -> User:
+    old_email = db_user.email
+    update_data = user_in.model_dump(exclude_unset=True)
+    if "password" in update_data:
+        db_user.hashed_password = await password_hasher.hash(update_data.pop("password"))
+    for field, value in update_data.items():
+        setattr(db_user, field, value)
+    db.add(db_user)
+    await db.commit()
+    await db.refresh(db_user)
+    await user_identity_cache.delete(old_email)
+    if db_user.email != old_email:
+        await user_identity_cache.delete(db_user.email)
+    return db_user
+
+async def update_password_hash(db: AsyncSession, *, db_user: User, hashed_password: str) -> User:
+    # The identity cache holds no password data, so nothing to invalidate.
+    db_user.hashed_password = hashed_password
+    db.add(db_user)
+    await db.commit()
+    return db_user
+
+async def deactivate_user(db: AsyncSession, *, db_user: User) -> User:
+    return await update_user(db, db_user=db_user, user_in=UserUpdate(is_active=False))
@@ -0,0 +1,9 @@
+
+# trading_app/app/db/base.py
+# Import every model so that string-based relationships (e.g. User.portfolios)
+# can be resolved as soon as any mapper is used.
+from app.db.base_class import Base  # noqa
+from app.models.user import User  # noqa
+from app.models.portfolio import Portfolio, Transaction, PositionSnapshot  # noqa
+from app.models.conversation import AIConversation, AIConversationTurn  # noqa
+from app.models.market import Instrument, OHLC  # noqa
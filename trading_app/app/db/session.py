@@ -1,12 +1,92 @@
-
 # trading_app/app/db/session.py
 from typing import AsyncGenerator
+from sqlalchemy import Select
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.dml import UpdateBase
 from app.core.config import settings
+from app.core.metrics import InstrumentedAsyncPool, instrument_engine
+from app.core.pools import worker_pools
+from app.db import base  # noqa: registers all models with the mapper
+
+write_engine = create_async_engine(
+    str(settings.DATABASE_URL),
+    pool_pre_ping=True,
+    poolclass=InstrumentedAsyncPool,
+    pool_logging_name="write",
+    pool_size=worker_pools.write.size,
+    max_overflow=worker_pools.write.max_overflow,
+    pool_timeout=settings.DB_WRITE_POOL_TIMEOUT_SECONDS,
+    pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+)
+# A separate pool even when both URLs are the same database: analytics
+# reads then queue behind each other instead of behind logins and writes.
+read_engine = create_async_engine(
+    str(settings.DATABASE_READ_URL),
+    pool_pre_ping=True,
+    poolclass=InstrumentedAsyncPool,
+    pool_logging_name="read",
+    pool_size=worker_pools.read.size,
+    max_overflow=worker_pools.read.max_overflow,
+    pool_timeout=settings.DB_READ_POOL_TIMEOUT_SECONDS,
+    pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+)
+instrument_engine(write_engine, "write")
+instrument_engine(read_engine, "read")
+engine = write_engine  # Migrations, COPY and anything that must see the primary
+
+_PRIMARY = "use_primary"
+
+
+class RoutingSession(Session):
+    """
+    Sends reads to the read engine and everything else to the write engine.
+
+    The first flush, DML statement or locking read pins the session to the
+    primary for the rest of its life, so a request always reads its own
+    writes even when the replica lags.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self.info.get(_PRIMARY):
+            return write_engine.sync_engine
+        if (
+            self._flushing
+            or isinstance(clause, UpdateBase)
+            or (isinstance(clause, Select) and clause._for_update_arg is not None)
+        ):
+            self.info[_PRIMARY] = True
+            return write_engine.sync_engine
+        return read_engine.sync_engine
+
+
+def use_primary(db: AsyncSession) -> None:
+    """
+    Pins a session to the primary before statements the router cannot
+    classify, such as raw-connection work like COPY.
+    """
+    db.sync_session.info[_PRIMARY] = True
+
+
+AsyncSessionLocal = async_sessionmaker(
+    autocommit=False, autoflush=False, sync_session_class=RoutingSession
+)
+
+
+async def get_read_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Default dependency: reads go to the replica until the session writes.
+    """
+    async with AsyncSessionLocal() as session:
+        yield session
 
-engine = create_async_engine(settings.DATABASE_URL, pool_pre_ping=True)
-AsyncSessionLocal = async_sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Primary-only session for auth and endpoints that must not read stale
+    rows, such as a login right after registration, and for endpoints that
+    write: their ownership checks must see the rows they are about to change.
+    """
     async with AsyncSessionLocal() as session:
-        yield session
\ No newline at end of file
+        use_primary(session)
+        yield session
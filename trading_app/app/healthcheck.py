@@ -0,0 +1,33 @@
+# trading_app/app/healthcheck.py
+"""
+Container health probe, used by the image's HEALTHCHECK:
+
+    python -m app.healthcheck
+
+Web containers are healthy once /ready answers 200, i.e. after the startup
+warm-up. Job worker containers (`python -m app.worker`) serve no HTTP and
+exit when the worker does, so the probe reports them healthy.
+"""
+import sys
+import urllib.request
+from pathlib import Path
+
+from app.core.config import settings
+
+
+def main() -> int:
+    try:
+        command = Path("/proc/1/cmdline").read_bytes().split(b"\0")
+    except OSError:
+        command = []
+    if b"app.worker" in command:
+        return 0
+    try:
+        urllib.request.urlopen(f"http://127.0.0.1:{settings.SERVER_PORT}/ready", timeout=2)
+    except OSError:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
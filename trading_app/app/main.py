@@ -1,20 +1,100 @@
 # trading_app/app/main.py
 
+import time
+_import_started = time.perf_counter()
+
 from contextlib import asynccontextmanager
 import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, Response, status
 from fastapi.responses import ORJSONResponse
+import os
+from prometheus_client import CONTENT_TYPE_LATEST, multiprocess
 
-from app.api.v1 import auth, ai  # Import new ai router
+from app.api.v1 import auth, ai, jobs, market, portfolios, transactions
 from app.clients.librarian import librarian_client
+from app.core.admission import admission_controller
+from app.core.conditional import response_cache
+from app.core.config import settings
+from app.core.hashing import password_hasher
+from app.core.invalidation import invalidation_bus
+from app.core.metrics import (
+    EventLoopLagMonitor,
+    PrometheusMiddleware,
+    multiprocess_enabled,
+    render_metrics,
+    stats_collector,
+)
+from app.core.pools import worker_pools
+from app.core.redis import redis_client
+from app.crud.conversation_writer import conversation_writer
+from app.crud.crud_market import candle_cache
+from app.crud.crud_user import user_identity_cache
+from app.db.session import read_engine, write_engine, AsyncSessionLocal
+from app.services.live_valuation import valuation_hub
+from app.services.warmup import Readiness, preload_candles, warm_db_pool, warm_librarian
+
+IMPORT_SECONDS = time.perf_counter() - _import_started
+
+readiness = Readiness()
+loop_lag_monitor = EventLoopLagMonitor(interval=settings.EVENT_LOOP_LAG_INTERVAL_SECONDS)
+
+stats_collector.add("user_cache", user_identity_cache.stats)
+stats_collector.add("librarian_cache", librarian_client.cache_stats)
+stats_collector.add("librarian", lambda: {"breaker_open": int(librarian_client.breaker.state != "closed")})
+stats_collector.add("conversation_writer", conversation_writer.stats)
+stats_collector.add("candle_cache", candle_cache.stats)
+stats_collector.add("response_cache", response_cache.stats)
+stats_collector.add("admission", admission_controller.stats)
+stats_collector.add("invalidation_bus", invalidation_bus.stats)
+stats_collector.add("password_hasher", lambda: {"pending": password_hasher.pending})
+for _name, _engine in (("db_write_pool", write_engine), ("db_read_pool", read_engine)):
+    stats_collector.add(_name, lambda pool=_engine.pool: {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+    })
 
 # Use lifespan events to manage the aiohttp session
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # On startup, the client session is created implicitly on first use
+    # Secrets were read once at import (engine and Librarian client setup).
+    started = time.perf_counter()
+    readiness.timings["import"] = IMPORT_SECONDS
+    if settings.BCRYPT_ROUNDS > 0:
+        password_hasher.use_rounds(settings.BCRYPT_ROUNDS)
+    elif settings.BCRYPT_TARGET_MS > 0:
+        await password_hasher.calibrate(settings.BCRYPT_TARGET_MS, redis_client)
+    conversation_writer.start()
+    invalidation_bus.start()
+    loop_lag_monitor.start()
+    if multiprocess_enabled():
+        stats_collector.start(settings.METRICS_STATS_INTERVAL_SECONDS)
+    readiness.record("startup", started)
+    # Pools and caches are warmed in the background; /ready turns 200 once done.
+    readiness.start(
+        # Never open more than a worker's steady pool; overflow would just be discarded.
+        ("db_write_pool", lambda: warm_db_pool(write_engine, min(settings.DB_WARMUP_CONNECTIONS, worker_pools.write.size)), True),
+        ("db_read_pool", lambda: warm_db_pool(read_engine, min(settings.DB_WARMUP_CONNECTIONS, worker_pools.read.size)), True),
+        ("librarian_pool", lambda: warm_librarian(
+            librarian_client, min(settings.LIBRARIAN_WARMUP_CONNECTIONS, worker_pools.librarian_limit_per_host)
+        ), False),
+        ("candle_cache", lambda: preload_candles(AsyncSessionLocal, settings.WARMUP_CANDLE_INSTRUMENTS), False),
+    )
     yield
+    await readiness.stop()
+    await loop_lag_monitor.stop()
+    await stats_collector.stop()
+    if multiprocess_enabled():
+        # Drops this worker's live gauges from the aggregated /metrics.
+        multiprocess.mark_process_dead(os.getpid())
+    # Drain queued conversation turns before tearing anything down
+    await conversation_writer.stop()
+    await valuation_hub.stop()
+    await invalidation_bus.stop()
     # On shutdown, gracefully close the client session
     await librarian_client.close()
+    await redis_client.aclose()
+    password_hasher.shutdown()
     
 # Using uvloop for performance, as specified in the tech stack
 # uvicorn automatically detects and uses it if installed.
@@ -30,11 +110,16 @@ app = FastAPI(
     description="API for portfolio and asset management.",
     default_response_class=ORJSONResponse, # High-performance JSON library
 )
+app.add_middleware(PrometheusMiddleware)
 
 
 # Include API routers
 app.include_router(auth.router, prefix="/api/v1/auth", tags=["auth"])
 app.include_router(ai.router, prefix="/api/v1/ai", tags=["ai"]) # Add the new router
+app.include_router(portfolios.router, prefix="/api/v1/portfolios", tags=["portfolios"])
+app.include_router(transactions.router, prefix="/api/v1/transactions", tags=["transactions"])
+app.include_router(market.router, prefix="/api/v1/market", tags=["market"])
+app.include_router(jobs.router, prefix="/api/v1/jobs", tags=["jobs"])
 
 @app.get("/health", tags=["Monitoring"])
 async def health_check():
@@ -43,6 +128,24 @@ async def health_check():
     """
     return {"status": "ok"}
 
-# This part is for local development and will not be used by Uvicorn in production
+@app.get("/ready", tags=["Monitoring"])
+async def readiness_check(response: Response):
+    """
+    503 until the startup warm-up (DB pool, Librarian connections, caches)
+    has finished, 200 afterwards. Reports how long each phase took.
+    """
+    if not readiness.ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return readiness.report()
+
+@app.get("/metrics", tags=["Monitoring"], include_in_schema=False)
+async def metrics():
+    """
+    Prometheus metrics, aggregated over all worker processes when served
+    by `python -m app.serve`.
+    """
+    return Response(render_metrics(), media_type=CONTENT_TYPE_LATEST)
+
+# This part is for local development; production runs `python -m app.serve`
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    uvicorn.run(app, host=settings.SERVER_HOST, port=settings.SERVER_PORT)
\ No newline at end of file
@@ -1,10 +1,9 @@
-
 # trading_app/app/models/conversation.py
 import uuid
 import datetime
-from sqlalchemy import ForeignKey, Text, DateTime
+from sqlalchemy import Computed, ForeignKey, Text, DateTime, Integer, String, func
 from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy.dialects.postgresql import UUID, JSONB, TSVECTOR
 
 from app.db.base_class import Base
 
@@ -15,5 +14,32 @@ class AIConversation(Base):
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("app_data.users.id"), index=True, nullable=False)
     created_at: Mapped[datetime.datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
-    history: Mapped[dict] = mapped_column(JSONB, nullable=False) # Stores chat history
-    summary: Mapped[str | None] = mapped_column(Text)
\ No newline at end of file
+    # Legacy chat history blob. New turns live in AIConversationTurn.
+    history: Mapped[list | None] = mapped_column(JSONB)
+    summary: Mapped[str | None] = mapped_column(Text)
+    # Highest seq allocated to this conversation's turns; advanced by the
+    # conversation writer in the same transaction that inserts them.
+    last_seq: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+
+class AIConversationTurn(Base):
+    """
+    One message of a conversation. Turns are append-only and keyed by
+    (conversation_id, seq), so loading the tail of a conversation is an
+    index range scan no matter how long it has grown.
+    """
+    __tablename__ = "ai_conversation_turns"
+    __table_args__ = {"schema": "app_data"}
+
+    conversation_id: Mapped[uuid.UUID] = mapped_column(
+        ForeignKey("app_data.ai_conversations.id", ondelete="CASCADE"), primary_key=True
+    )
+    seq: Mapped[int] = mapped_column(Integer, primary_key=True)
+    role: Mapped[str] = mapped_column(String(16), nullable=False)  # 'user' or 'assistant'
+    content: Mapped[str] = mapped_column(Text, nullable=False)
+    token_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    created_at: Mapped[datetime.datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    # Maintained by Postgres and GIN-indexed for full-text search; deferred
+    # so loading turns does not drag the vectors along.
+    search_vector: Mapped[str | None] = mapped_column(
+        TSVECTOR, Computed("to_tsvector('english'::regconfig, content)", persisted=True), deferred=True
+    )
@@ -0,0 +1,30 @@
+# trading_app/app/models/market.py
+from sqlalchemy import BigInteger, Float, String
+from sqlalchemy.orm import Mapped, declarative_base, mapped_column
+
+# Tables owned by the Data Pipeline. They hang off their own metadata so that
+# Alembic (which targets Base.metadata) never tries to create or alter them;
+# only the columns the app reads are mapped.
+MarketBase = declarative_base()
+
+class Instrument(MarketBase):
+    __tablename__ = "instruments"
+    __table_args__ = {"schema": "public"}
+
+    instrument_name: Mapped[str] = mapped_column(String, primary_key=True)
+    kind: Mapped[str | None] = mapped_column(String)  # e.g. 'spot', 'future', 'option'
+    base_currency: Mapped[str | None] = mapped_column(String)
+    quote_currency: Mapped[str | None] = mapped_column(String)
+
+class OHLC(MarketBase):
+    __tablename__ = "ohlc"
+    __table_args__ = {"schema": "public"}
+
+    instrument_name: Mapped[str] = mapped_column(String, primary_key=True)
+    resolution: Mapped[str] = mapped_column(String, primary_key=True)  # e.g. '1', '60', '1D'
+    tick: Mapped[int] = mapped_column(BigInteger, primary_key=True)  # Candle open time, epoch milliseconds
+    open: Mapped[float] = mapped_column(Float, nullable=False)
+    high: Mapped[float] = mapped_column(Float, nullable=False)
+    low: Mapped[float] = mapped_column(Float, nullable=False)
+    close: Mapped[float] = mapped_column(Float, nullable=False)
+    volume: Mapped[float] = mapped_column(Float, nullable=False)
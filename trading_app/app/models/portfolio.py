@@ -2,7 +2,7 @@
 # trading_app/app/models/portfolio.py
 import uuid
 import datetime
-from sqlalchemy import String, ForeignKey, Numeric, DateTime, Text
+from sqlalchemy import String, ForeignKey, Numeric, DateTime, Text, Index, Integer, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.dialects.postgresql import UUID
 
@@ -22,7 +22,11 @@ class Portfolio(Base):
 
 class Transaction(Base):
     __tablename__ = "transactions"
-    __table_args__ = {"schema": "app_data"}
+    __table_args__ = (
+        # Serves date-ordered, keyset-paginated listing per portfolio.
+        Index("ix_app_data_transactions_portfolio_date_id", "portfolio_id", "transaction_date", "id"),
+        {"schema": "app_data"},
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     portfolio_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("app_data.portfolios.id"), nullable=False)
@@ -32,4 +36,33 @@ class Transaction(Base):
     price: Mapped[float] = mapped_column(Numeric(19, 8), nullable=False)
     transaction_date: Mapped[datetime.datetime] = mapped_column(DateTime(timezone=True), nullable=False)
 
-    portfolio: Mapped["Portfolio"] = relationship(back_populates="transactions")
\ No newline at end of file
+    portfolio: Mapped["Portfolio"] = relationship(back_populates="transactions")
+
+class PositionSnapshot(Base):
+    """
+    Running per-ticker aggregates of a portfolio's transactions. Every
+    transaction write adds (or, on delete, subtracts) its own contribution,
+    so holdings are read in O(holdings) rather than O(transactions).
+    """
+    __tablename__ = "position_snapshots"
+    __table_args__ = {"schema": "app_data"}
+
+    portfolio_id: Mapped[uuid.UUID] = mapped_column(
+        ForeignKey("app_data.portfolios.id", ondelete="CASCADE"), primary_key=True
+    )
+    instrument_ticker: Mapped[str] = mapped_column(String(20), primary_key=True)
+    buy_quantity: Mapped[float] = mapped_column(Numeric(28, 8), nullable=False, default=0)
+    buy_cost: Mapped[float] = mapped_column(Numeric(28, 8), nullable=False, default=0)
+    sell_quantity: Mapped[float] = mapped_column(Numeric(28, 8), nullable=False, default=0)
+    sell_proceeds: Mapped[float] = mapped_column(Numeric(28, 8), nullable=False, default=0)
+    transaction_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    # Running average cost, which depends on transaction order: advanced in
+    # place for a transaction dated at or after `last_transaction_date`,
+    # replayed from the ticker's history for anything else.
+    held_quantity: Mapped[float] = mapped_column(Numeric(28, 8), nullable=False, default=0)
+    held_cost: Mapped[float] = mapped_column(Numeric(28, 8), nullable=False, default=0)
+    realized_pnl: Mapped[float] = mapped_column(Numeric(28, 8), nullable=False, default=0)
+    last_transaction_date: Mapped[datetime.datetime | None] = mapped_column(DateTime(timezone=True))
+    updated_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
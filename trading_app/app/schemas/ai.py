@@ -1,12 +1,51 @@
 
 # trading_app/app/schemas/ai.py
+import uuid
+import datetime
+from typing import Annotated
 from pydantic import BaseModel, Field
 
 class AIChatRequest(BaseModel):
     prompt: str = Field(..., min_length=1, max_length=2000)
-    conversation_id: str | None = None # To continue an existing chat
+    conversation_id: uuid.UUID | None = None # To continue an existing chat
+    use_cache: bool = True # Set to False to force a fresh answer from the Librarian
+
+class AIBatchChatRequest(BaseModel):
+    # The count is capped by AI_BATCH_MAX_PROMPTS in the endpoint.
+    prompts: list[Annotated[str, Field(min_length=1, max_length=2000)]] = Field(..., min_length=1)
+    use_cache: bool = True
 
 class AIChatResponse(BaseModel):
     answer: str
     conversation_id: str
-    sources: list[dict] = []
\ No newline at end of file
+    sources: list[dict] = []
+
+class ConversationTurnRead(BaseModel):
+    seq: int
+    role: str
+    content: str
+    created_at: datetime.datetime
+
+    class Config:
+        from_attributes = True
+
+class ConversationTurnPage(BaseModel):
+    turns: list[ConversationTurnRead] # Oldest first
+    next_before_seq: int | None = None # Pass as `before_seq` to fetch older turns
+
+class ConversationSearchHit(BaseModel):
+    conversation_id: uuid.UUID
+    seq: int
+    role: str
+    created_at: datetime.datetime
+    rank: float
+    # Matching fragments with the hits wrapped in <mark></mark>. The rest is
+    # the raw message text, not HTML-escaped.
+    snippet: str
+
+    class Config:
+        from_attributes = True
+
+class ConversationSearchPage(BaseModel):
+    hits: list[ConversationSearchHit] # Best match first
+    next_cursor: str | None = None # Pass as `cursor` to fetch the next page
@@ -0,0 +1,20 @@
+# trading_app/app/schemas/job.py
+import uuid
+from typing import Any, Literal
+from pydantic import BaseModel
+
+JobStatus = Literal["queued", "running", "succeeded", "failed"]
+
+class JobSubmitted(BaseModel):
+    job_id: uuid.UUID
+    status: JobStatus
+
+class JobRead(BaseModel):
+    id: uuid.UUID
+    kind: str
+    status: JobStatus
+    attempts: int
+    created_at: float  # Unix seconds
+    finished_at: float | None = None
+    result: Any = None  # Set once status is "succeeded"
+    error: str | None = None  # Set once status is "failed"
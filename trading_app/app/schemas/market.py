@@ -0,0 +1,26 @@
+# trading_app/app/schemas/market.py
+from pydantic import BaseModel
+
+class InstrumentRead(BaseModel):
+    instrument_name: str
+    kind: str | None = None
+    base_currency: str | None = None
+    quote_currency: str | None = None
+
+    class Config:
+        from_attributes = True
+
+class CandleSeries(BaseModel):
+    """
+    Candles in columnar form: element i of every list is one candle.
+    """
+    instrument_name: str
+    resolution: str
+    method: str
+    source_points: int # Candles in the range before downsampling
+    tick: list[int] # Candle open time, epoch milliseconds
+    open: list[float]
+    high: list[float]
+    low: list[float]
+    close: list[float]
+    volume: list[float]
@@ -0,0 +1,71 @@
+
+# trading_app/app/schemas/portfolio.py
+import uuid
+from decimal import Decimal
+from pydantic import BaseModel
+
+class PositionRead(BaseModel):
+    instrument_ticker: str
+    quantity: float
+    average_cost: float
+    average_cost_basis: float
+    fifo_cost_basis: float
+    realized_pnl_average: float
+    realized_pnl_fifo: float
+
+class PortfolioPositions(BaseModel):
+    portfolio_id: uuid.UUID
+    transaction_count: int
+    positions: list[PositionRead]
+
+class HoldingRead(BaseModel):
+    instrument_ticker: str
+    quantity: Decimal
+    average_cost: Decimal
+    cost_basis: Decimal
+    realized_pnl: Decimal
+    transaction_count: int
+
+class PortfolioHoldings(BaseModel):
+    portfolio_id: uuid.UUID
+    holdings: list[HoldingRead]
+
+class SnapshotRebuildReport(BaseModel):
+    portfolio_id: uuid.UUID
+    tickers_checked: int
+    mismatched_tickers: list[str] # Non-empty means the snapshots were rewritten
+
+class EquityCurveRead(BaseModel):
+    """
+    Portfolio valuation series in columnar form: element i of every list
+    is one point.
+    """
+    portfolio_id: uuid.UUID
+    timeframe: str
+    source_points: int # Points before downsampling
+    tick: list[int] # Candle open time, epoch milliseconds
+    value: list[float]
+    net_invested: list[float] # Buy cost minus sell proceeds to date
+    pnl: list[float]
+
+class RiskReport(BaseModel):
+    """
+    Risk of the current holdings over daily history. VaR figures are
+    one-day losses in portfolio currency; volatilities are annualized.
+    """
+    portfolio_id: uuid.UUID
+    lookback_days: int
+    confidence: float
+    observations: int
+    portfolio_value: float
+    volatility: float | None
+    rolling_volatility_tick: list[int]
+    rolling_volatility: list[float]
+    var_historical: float | None
+    var_parametric: float | None
+    max_drawdown: float | None # Fraction of peak value
+    beta: float | None
+    benchmark: str | None
+    tickers: list[str] # Order of instrument_volatility and the correlation rows/columns
+    instrument_volatility: list[float]
+    correlation: list[list[float]]
@@ -2,16 +2,27 @@
 # trading_app/app/schemas/transaction.py
 import uuid
 import datetime
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from decimal import Decimal
 
 class TransactionBase(BaseModel):
     instrument_ticker: str = Field(..., max_length=20)
     transaction_type: str = Field(..., pattern="^(BUY|SELL)$") # Enforce BUY or SELL
-    quantity: Decimal = Field(..., gt=0)
-    price: Decimal = Field(..., gt=0)
+    # Bounds of the Numeric(19, 8) columns, so out-of-range values are
+    # rejected here rather than by the database mid-write.
+    quantity: Decimal = Field(..., gt=0, max_digits=19, decimal_places=8)
+    price: Decimal = Field(..., gt=0, max_digits=19, decimal_places=8)
     transaction_date: datetime.datetime
 
+    @field_validator("transaction_date")
+    @classmethod
+    def _to_utc(cls, value: datetime.datetime) -> datetime.datetime:
+        # Naive dates are taken as UTC, as the database already did on
+        # insert; aware ones are converted so all dates compare with each other.
+        if value.tzinfo is None:
+            return value.replace(tzinfo=datetime.timezone.utc)
+        return value.astimezone(datetime.timezone.utc)
+
 class TransactionCreate(TransactionBase):
     portfolio_id: uuid.UUID
 
@@ -23,4 +34,19 @@ class TransactionRead(TransactionBase):
     portfolio_id: uuid.UUID
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+class TransactionPage(BaseModel):
+    items: list[TransactionRead]
+    next_cursor: str | None = None # Pass as `cursor` to fetch the next (older) page
+
+class TransactionImportError(BaseModel):
+    row: int
+    errors: list[str]
+
+class TransactionImportReport(BaseModel):
+    rows_total: int
+    rows_imported: int
+    rows_rejected: int
+    elapsed_seconds: float
+    rows_per_second: float
+    errors: list[TransactionImportError] # Capped; see rows_rejected for the full count
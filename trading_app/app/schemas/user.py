@@ -11,6 +11,12 @@ class UserBase(BaseModel):
 class UserCreate(UserBase):
     password: str
 
+# Properties that may be changed on an existing user
+class UserUpdate(BaseModel):
+    email: EmailStr | None = None
+    password: str | None = None
+    is_active: bool | None = None
+
 # Properties to return to client
 class UserRead(UserBase):
     id: uuid.UUID
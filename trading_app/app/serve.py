@@ -0,0 +1,60 @@
+# trading_app/app/serve.py
+"""
+Production entry point:
+
+    python -m app.serve
+
+Runs WEB_CONCURRENCY uvicorn worker processes (default: one per CPU core)
+behind a single listening socket. Each worker sizes its database and
+Librarian pools from DB_CONNECTION_BUDGET / LIBRARIAN_CONNECTION_BUDGET
+(see app/core/pools.py), so adding workers does not add connections.
+
+Metrics run in Prometheus multiprocess mode: workers write them to files in
+PROMETHEUS_MULTIPROC_DIR (a fresh temporary directory unless set) and
+/metrics aggregates all of them.
+
+On SIGTERM the workers stop accepting connections, let in-flight requests
+finish for up to SHUTDOWN_GRACE_SECONDS and then run the lifespan shutdown,
+which drains queued conversation turns. Give the container a stop timeout
+longer than the grace period, or it is killed mid-drain.
+"""
+import os
+import tempfile
+from pathlib import Path
+
+import uvicorn
+
+from app.core.config import settings
+
+
+def prepare_multiprocess_metrics() -> None:
+    """
+    Points the workers at an empty PROMETHEUS_MULTIPROC_DIR; files left by
+    a previous run would otherwise be counted again.
+    """
+    directory = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if not directory:
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="prometheus-")
+        return
+    Path(directory).mkdir(parents=True, exist_ok=True)
+    for stale in Path(directory).glob("*.db"):
+        stale.unlink()
+
+
+def main() -> None:
+    workers = settings.WEB_CONCURRENCY or os.cpu_count() or 1
+    # Workers are spawned and read their settings afresh; the count must
+    # reach them so each one takes its share of the connection budgets.
+    os.environ["WEB_CONCURRENCY"] = str(workers)
+    prepare_multiprocess_metrics()
+    uvicorn.run(
+        "app.main:app",
+        host=settings.SERVER_HOST,
+        port=settings.SERVER_PORT,
+        workers=workers,
+        timeout_graceful_shutdown=settings.SHUTDOWN_GRACE_SECONDS,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+# trading_app/app/services/equity.py
+import time
+import uuid
+from dataclasses import dataclass
+
+import numpy as np
+
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.core.invalidation import invalidation_bus
+from app.services.market_data import Candles, closes_on_grid
+from app.services.positions import TransactionArrays
+
+
+@dataclass(frozen=True)
+class EquityCurve:
+    """
+    Portfolio valuation at each candle close, aligned on `tick` (epoch ms).
+    `net_invested` is buy cost minus sell proceeds to date.
+    """
+    tick: np.ndarray          # int64
+    value: np.ndarray         # float64
+    net_invested: np.ndarray  # float64
+
+    def __len__(self) -> int:
+        return len(self.tick)
+
+    @property
+    def pnl(self) -> np.ndarray:
+        return self.value - self.net_invested
+
+    def before(self, tick: int) -> "EquityCurve":
+        end = int(np.searchsorted(self.tick, tick, side="left"))
+        return EquityCurve(self.tick[:end], self.value[:end], self.net_invested[:end])
+
+    def extend(self, newer: "EquityCurve") -> "EquityCurve":
+        return EquityCurve(
+            np.concatenate((self.tick, newer.tick)),
+            np.concatenate((self.value, newer.value)),
+            np.concatenate((self.net_invested, newer.net_invested)),
+        )
+
+
+def transaction_ticks(txns: TransactionArrays) -> np.ndarray:
+    return txns.timestamp.astype("datetime64[ms]").astype(np.int64)
+
+
+def build_equity_curve(
+    txns: TransactionArrays, prices: dict[str, Candles], *, start: int | None = None
+) -> EquityCurve:
+    """
+    Values the portfolio at every candle tick >= `start` (default: the
+    first transaction's candle) with no per-tick Python loop:
+
+    - the grid is the union of all instruments' candle ticks;
+    - per instrument, each transaction's signed quantity is binned at the
+      candle containing it and cumulated, so transactions before `start`
+      land in the first row as the opening position;
+    - closes are forward-filled onto the grid with `searchsorted`.
+
+    Instruments are valued one at a time into a single value column, so
+    memory grows with the grid, not with grid x instruments. Callers bound
+    the grid (see EQUITY_CURVE_MAX_GRID_POINTS).
+
+    An instrument without candles is valued at its latest transaction price.
+    """
+    empty = EquityCurve(np.empty(0, dtype=np.int64), np.empty(0), np.empty(0))
+    if not len(txns):
+        return empty
+    ticks = transaction_ticks(txns)
+    tickers, codes = np.unique(txns.tickers, return_inverse=True)
+    codes = codes.ravel()
+
+    grid = np.unique(np.concatenate(
+        [prices[t].tick for t in tickers if t in prices] or [np.empty(0, dtype=np.int64)]
+    ))
+    # Candles start at or before the first transaction's candle.
+    first = grid[max(int(np.searchsorted(grid, ticks.min(), side="right")) - 1, 0)] if len(grid) else 0
+    grid = grid[grid >= (first if start is None else max(start, first))]
+    if not len(grid):
+        return empty
+
+    signed_qty = np.where(txns.is_buy, txns.quantity, -txns.quantity)
+    row = np.clip(np.searchsorted(grid, ticks, side="right") - 1, 0, None)
+    net_invested = np.cumsum(np.bincount(row, weights=signed_qty * txns.price, minlength=len(grid)))
+
+    order = np.argsort(ticks, kind="stable")
+    last_price = np.zeros(len(tickers))
+    last_price[codes[order]] = txns.price[order]
+    value = np.zeros(len(grid))
+    for j, ticker in enumerate(tickers):
+        mine = codes == j
+        positions = np.cumsum(np.bincount(row[mine], weights=signed_qty[mine], minlength=len(grid)))
+        candles = prices.get(ticker)
+        if candles is None or not len(candles):
+            value += positions * last_price[j]
+        else:
+            value += positions * closes_on_grid(candles, grid)
+
+    return EquityCurve(grid, value, net_invested)
+
+
+class EquityCurveCache:
+    """
+    Equity curves per (portfolio, timeframe), each with the earliest
+    transaction time changed since it was built. A read recomputes only the
+    tail from that point (or from the last, possibly still forming, candle
+    once the entry is older than `ttl`) and keeps the prefix.
+
+    Every change also bumps the portfolio's version. A build that saw an
+    older version than the current one is not stored, since it may predate
+    the change (including a portfolio's first build, which has no entry to
+    mark dirty yet).
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.ttl = ttl
+        self._curves = LRUCache(maxsize=maxsize, ttl=float("inf"))
+        self._timeframes: dict[uuid.UUID, set[str]] = {}
+        self._dirty_from: dict[tuple[uuid.UUID, str], int] = {}
+        self._versions: dict[uuid.UUID, int] = {}
+
+    def mark_dirty(self, portfolio_id: uuid.UUID, tick: int) -> None:
+        self._versions[portfolio_id] = self._versions.get(portfolio_id, 0) + 1
+        for timeframe in self._timeframes.get(portfolio_id, ()):
+            key = (portfolio_id, timeframe)
+            self._dirty_from[key] = min(self._dirty_from.get(key, tick), tick)
+
+    def plan(self, portfolio_id: uuid.UUID, timeframe: str) -> tuple[EquityCurve | None, int | None, int]:
+        """
+        Returns (cached prefix, start tick of the tail to recompute, version).
+        A start of None means build from scratch; -1 means the cached curve
+        is current. Pass the version back to `set`.
+        """
+        key = (portfolio_id, timeframe)
+        version = self._versions.get(portfolio_id, 0)
+        entry = self._curves.get(key)
+        if entry is None:
+            return None, None, version
+        curve, built_at = entry
+        dirty = self._dirty_from.get(key)
+        if dirty is not None:
+            # Recompute from the candle that contains the changed transaction.
+            row = int(np.searchsorted(curve.tick, dirty, side="right")) - 1
+            if row < 0:
+                return None, None, version
+            return curve.before(int(curve.tick[row])), int(curve.tick[row]), version
+        if time.monotonic() - built_at >= self.ttl and len(curve):
+            return curve.before(int(curve.tick[-1])), int(curve.tick[-1]), version
+        return curve, -1, version
+
+    def set(self, portfolio_id: uuid.UUID, timeframe: str, curve: EquityCurve, version: int) -> None:
+        if version != self._versions.get(portfolio_id, 0):
+            # A change raced the build. Any existing entry keeps its dirty
+            # mark; without one, the next read builds from scratch.
+            return
+        key = (portfolio_id, timeframe)
+        self._curves.set(key, (curve, time.monotonic()))
+        self._timeframes.setdefault(portfolio_id, set()).add(timeframe)
+        self._dirty_from.pop(key, None)
+
+
+equity_curve_cache = EquityCurveCache(
+    maxsize=settings.EQUITY_CURVE_CACHE_MAX_ENTRIES,
+    ttl=settings.EQUITY_CURVE_CACHE_TTL_SECONDS,
+)
+# Writes mark curves dirty through the bus, so every worker's copy is patched.
+invalidation_bus.register(
+    "equity_curve_dirty",
+    lambda data: equity_curve_cache.mark_dirty(uuid.UUID(data["portfolio_id"]), data["tick"]),
+)
@@ -0,0 +1,272 @@
+# trading_app/app/services/jobs.py
+import asyncio
+import time
+import uuid
+from typing import Awaitable, Callable
+
+import orjson
+from loguru import logger
+from redis.asyncio import Redis
+from redis.exceptions import RedisError, ResponseError
+
+from app.clients.resilience import backoff_delay
+from app.core.config import settings
+from app.core.redis import redis_client
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+FINISHED = (SUCCEEDED, FAILED)
+
+# (user_id, payload) -> JSON-serializable result
+JobHandler = Callable[[uuid.UUID, dict], Awaitable[dict]]
+
+
+class JobError(Exception):
+    """
+    Raised by a handler to fail its job with a message meant for the user.
+    """
+
+
+def _decode(value: bytes | str) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+class JobQueue:
+    """
+    Jobs on a Redis stream, with their state in a `job:<id>` hash.
+
+    The hash (status, result or error) expires `result_ttl` seconds after
+    submission and again after completion. Every status change is
+    published on `job-events:<id>` for WebSocket listeners.
+    """
+
+    def __init__(self, redis: Redis, *, stream: str, group: str, result_ttl: int, max_length: int):
+        self.redis = redis
+        self.stream = stream
+        self.group = group
+        self.result_ttl = result_ttl
+        self.max_length = max_length
+
+    @staticmethod
+    def _key(job_id: uuid.UUID) -> str:
+        return f"job:{job_id}"
+
+    @staticmethod
+    def channel(job_id: uuid.UUID) -> str:
+        return f"job-events:{job_id}"
+
+    async def submit(self, kind: str, user_id: uuid.UUID, payload: dict) -> uuid.UUID:
+        job_id = uuid.uuid4()
+        key = self._key(job_id)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(key, mapping={
+                "kind": kind,
+                "user_id": str(user_id),
+                "status": QUEUED,
+                "created_at": time.time(),
+                "attempts": 0,
+            })
+            pipe.expire(key, self.result_ttl)
+            pipe.xadd(
+                self.stream,
+                {"job_id": str(job_id), "kind": kind, "user_id": str(user_id), "payload": orjson.dumps(payload)},
+                maxlen=self.max_length,
+                approximate=True,
+            )
+            await pipe.execute()
+        return job_id
+
+    async def get(self, job_id: uuid.UUID) -> dict | None:
+        raw = await self.redis.hgetall(self._key(job_id))
+        if not raw:
+            return None
+        job = {_decode(key): _decode(value) for key, value in raw.items()}
+        return {
+            "id": job_id,
+            "kind": job["kind"],
+            "user_id": uuid.UUID(job["user_id"]),
+            "status": job["status"],
+            "attempts": int(job.get("attempts", 0)),
+            "created_at": float(job["created_at"]),
+            "finished_at": float(job["finished_at"]) if "finished_at" in job else None,
+            "result": orjson.loads(job["result"]) if "result" in job else None,
+            "error": job.get("error"),
+        }
+
+    async def start(self, job_id: uuid.UUID) -> int | None:
+        """
+        Marks a job running and returns its attempt number, or None when
+        its state has already expired.
+        """
+        key = self._key(job_id)
+        if not await self.redis.exists(key):
+            return None
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hincrby(key, "attempts", 1)
+            pipe.hset(key, "status", RUNNING)
+            pipe.publish(self.channel(job_id), RUNNING)
+            attempts, *_ = await pipe.execute()
+        return int(attempts)
+
+    async def finish(self, job_id: uuid.UUID, *, result: dict | None = None, error: str | None = None) -> None:
+        key = self._key(job_id)
+        status = SUCCEEDED if error is None else FAILED
+        mapping = {"status": status, "finished_at": time.time()}
+        if error is None:
+            mapping["result"] = orjson.dumps(result)
+        else:
+            mapping["error"] = error
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(key, mapping=mapping)
+            pipe.expire(key, self.result_ttl)
+            pipe.publish(self.channel(job_id), status)
+            await pipe.execute()
+
+
+class JobWorker:
+    """
+    One consumer of the job stream's consumer group, running up to
+    `concurrency` jobs at once.
+
+    A message is acknowledged only after its outcome has been stored, so
+    the jobs of a worker that dies stay pending and are claimed by another
+    worker once idle for `claim_idle` seconds. After `max_attempts`
+    deliveries a job is failed instead of being retried again. `stop()`
+    stops taking new jobs and lets the running ones finish.
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        handlers: dict[str, JobHandler],
+        *,
+        concurrency: int,
+        consumer: str,
+        claim_idle: float,
+        max_attempts: int,
+        block_seconds: float = 2.0,
+    ):
+        self.queue = queue
+        self.handlers = handlers
+        self.concurrency = concurrency
+        self.consumer = consumer
+        self.claim_idle = claim_idle
+        self.max_attempts = max_attempts
+        self.block_seconds = block_seconds
+        self._tasks: set[asyncio.Task] = set()
+        self._stopping = asyncio.Event()
+        self._next_claim = 0.0
+        self.succeeded = 0
+        self.failed = 0
+
+    @property
+    def redis(self) -> Redis:
+        return self.queue.redis
+
+    async def _ensure_group(self) -> None:
+        try:
+            await self.redis.xgroup_create(self.queue.stream, self.queue.group, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    def stop(self) -> None:
+        self._stopping.set()
+
+    async def run(self) -> None:
+        await self._ensure_group()
+        loop = asyncio.get_running_loop()
+        failures = 0
+        while not self._stopping.is_set():
+            free = self.concurrency - len(self._tasks)
+            if free <= 0:
+                await asyncio.wait(self._tasks, return_when=asyncio.FIRST_COMPLETED)
+                continue
+            try:
+                messages = []
+                if loop.time() >= self._next_claim:
+                    self._next_claim = loop.time() + self.claim_idle / 2
+                    messages = await self._claim_stale(free)
+                if not messages:
+                    messages = await self._read(free)
+            except RedisError as e:
+                delay = backoff_delay(failures, 0.5)
+                failures += 1
+                logger.warning(f"Job stream read failed, retrying in {delay:.1f}s: {e}")
+                await asyncio.sleep(delay)
+                continue
+            failures = 0
+            for message_id, fields in messages:
+                task = asyncio.create_task(self._handle(message_id, fields))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+        if self._tasks:
+            await asyncio.wait(self._tasks)
+
+    async def _read(self, count: int) -> list:
+        response = await self.redis.xreadgroup(
+            self.queue.group,
+            self.consumer,
+            {self.queue.stream: ">"},
+            count=count,
+            block=int(self.block_seconds * 1000),
+        )
+        return [message for _, messages in response for message in messages]
+
+    async def _claim_stale(self, count: int) -> list:
+        _, messages, *_ = await self.redis.xautoclaim(
+            self.queue.stream,
+            self.queue.group,
+            self.consumer,
+            min_idle_time=int(self.claim_idle * 1000),
+            count=count,
+        )
+        return messages
+
+    async def _handle(self, message_id: bytes, fields: dict) -> None:
+        fields = {_decode(key): value for key, value in fields.items()}
+        job_id = uuid.UUID(_decode(fields["job_id"]))
+        kind = _decode(fields["kind"])
+        try:
+            attempts = await self.queue.start(job_id)
+            if attempts is not None:
+                await self._execute(job_id, kind, attempts, fields)
+            await self.redis.xack(self.queue.stream, self.queue.group, message_id)
+        except RedisError as e:
+            # Left pending; another delivery will pick it up.
+            logger.warning(f"Job {job_id} could not be recorded: {e}")
+
+    async def _execute(self, job_id: uuid.UUID, kind: str, attempts: int, fields: dict) -> None:
+        handler = self.handlers.get(kind)
+        if attempts > self.max_attempts:
+            error = f"Job abandoned after {self.max_attempts} attempts"
+        elif handler is None:
+            error = f"Unknown job kind '{kind}'"
+        else:
+            try:
+                result = await handler(uuid.UUID(_decode(fields["user_id"])), orjson.loads(fields["payload"]))
+            except JobError as e:
+                error = str(e)
+            except Exception:
+                logger.exception(f"Job {job_id} ({kind}) failed")
+                error = "The job failed unexpectedly."
+            else:
+                await self.queue.finish(job_id, result=result)
+                self.succeeded += 1
+                return
+        await self.queue.finish(job_id, error=error)
+        self.failed += 1
+
+    def stats(self) -> dict:
+        return {"running": len(self._tasks), "succeeded": self.succeeded, "failed": self.failed}
+
+
+job_queue = JobQueue(
+    redis_client,
+    stream=settings.JOB_STREAM,
+    group=settings.JOB_CONSUMER_GROUP,
+    result_ttl=settings.JOB_RESULT_TTL_SECONDS,
+    max_length=settings.JOB_STREAM_MAX_LENGTH,
+)
@@ -0,0 +1,249 @@
+# trading_app/app/services/live_valuation.py
+import asyncio
+import uuid
+
+import orjson
+from loguru import logger
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.clients.resilience import backoff_delay
+from app.core.config import settings
+from app.core.redis import redis_client
+from app.crud import crud_market, crud_position_snapshot
+from app.db.session import AsyncSessionLocal
+from app.services.positions import holding_from_aggregates
+
+
+class LatestValue:
+    """
+    Single-slot mailbox: a new value replaces one not yet taken, so a slow
+    consumer only ever receives the most recent value.
+    """
+
+    def __init__(self):
+        self._value = None
+        self._ready = asyncio.Event()
+        self.coalesced = 0
+
+    def put(self, value) -> None:
+        if self._ready.is_set():
+            self.coalesced += 1
+        self._value = value
+        self._ready.set()
+
+    async def get(self):
+        await self._ready.wait()
+        self._ready.clear()
+        return self._value
+
+
+class ValuationHub:
+    """
+    Per-process fan-out of live portfolio valuations.
+
+    Every worker subscribes to the price and holdings-change channels in
+    Redis, so updates reach connections on any worker. Price updates mark
+    the portfolios holding that instrument; on the next loop iteration each
+    marked portfolio is valued and serialized once, and the same payload is
+    put in every connection's LatestValue, however many clients watch it.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        *,
+        redis: Redis | None = None,
+        price_channel: str,
+        holdings_channel: str,
+    ):
+        self.session_factory = session_factory
+        self.redis = redis if redis is not None else redis_client
+        self.price_channel = price_channel
+        self.holdings_channel = holdings_channel
+        self._subscribers: dict[uuid.UUID, set[LatestValue]] = {}
+        self._holdings: dict[uuid.UUID, dict[str, tuple[float, float]]] = {}
+        self._by_instrument: dict[str, set[uuid.UUID]] = {}
+        self._prices: dict[str, tuple[int, float]] = {}
+        self._pending: set[uuid.UUID] = set()
+        self._flush_scheduled = False
+        self._task: asyncio.Task | None = None
+        self.valuations = 0
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._listen(), name="valuation-hub")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def subscribe(self, portfolio_id: uuid.UUID) -> LatestValue:
+        """
+        Registers a connection and immediately queues the current valuation.
+        """
+        self.start()
+        slot = LatestValue()
+        if portfolio_id not in self._holdings:
+            await self._load(portfolio_id)
+        self._subscribers.setdefault(portfolio_id, set()).add(slot)
+        slot.put(self._valuate(portfolio_id))
+        return slot
+
+    def unsubscribe(self, portfolio_id: uuid.UUID, slot: LatestValue) -> None:
+        slots = self._subscribers.get(portfolio_id)
+        if slots is None:
+            return
+        slots.discard(slot)
+        if not slots:
+            del self._subscribers[portfolio_id]
+            self._set_holdings(portfolio_id, {})
+            del self._holdings[portfolio_id]
+
+    async def publish_holdings_changed(self, portfolio_id: uuid.UUID) -> None:
+        """
+        Tells every worker to reload a portfolio's holdings. A Redis outage
+        only delays live updates, so errors are logged, not raised.
+        """
+        try:
+            await self.redis.publish(self.holdings_channel, str(portfolio_id))
+        except RedisError:
+            logger.warning(f"Could not publish holdings change for portfolio {portfolio_id}")
+
+    def on_price(self, instrument_name: str, price: float, tick: int) -> None:
+        current = self._prices.get(instrument_name)
+        if current is not None and current[0] > tick:
+            return  # Out-of-order update
+        self._prices[instrument_name] = (tick, price)
+        portfolio_ids = self._by_instrument.get(instrument_name)
+        if portfolio_ids:
+            self._pending.update(portfolio_ids)
+            self._schedule_flush()
+
+    async def _load(self, portfolio_id: uuid.UUID) -> None:
+        async with self.session_factory() as db:
+            snapshots = await crud_position_snapshot.get_snapshots(db, portfolio_id=portfolio_id)
+            holdings = {}
+            for snapshot in snapshots:
+                holding = holding_from_aggregates(
+                    snapshot.instrument_ticker,
+                    snapshot.buy_quantity,
+                    snapshot.sell_quantity,
+                    snapshot.held_quantity,
+                    snapshot.held_cost,
+                    snapshot.realized_pnl,
+                    snapshot.transaction_count,
+                )
+                if holding["quantity"]:
+                    holdings[snapshot.instrument_ticker] = (
+                        float(holding["quantity"]), float(holding["average_cost"])
+                    )
+            missing = [name for name in holdings if name not in self._prices]
+            closes = await crud_market.get_latest_closes(
+                db, instrument_names=missing, resolution=settings.LIVE_PRICE_RESOLUTION
+            )
+        for name, (tick, close) in closes.items():
+            self._prices.setdefault(name, (tick, close))
+        self._set_holdings(portfolio_id, holdings)
+
+    def _set_holdings(self, portfolio_id: uuid.UUID, holdings: dict[str, tuple[float, float]]) -> None:
+        for name in self._holdings.get(portfolio_id, {}):
+            portfolio_ids = self._by_instrument.get(name)
+            if portfolio_ids is not None:
+                portfolio_ids.discard(portfolio_id)
+                if not portfolio_ids:
+                    del self._by_instrument[name]
+        self._holdings[portfolio_id] = holdings
+        for name in holdings:
+            self._by_instrument.setdefault(name, set()).add(portfolio_id)
+
+    def _valuate(self, portfolio_id: uuid.UUID) -> bytes:
+        self.valuations += 1
+        positions = []
+        market_value = cost_basis = 0.0
+        latest_tick = None
+        for name, (quantity, average_cost) in sorted(self._holdings.get(portfolio_id, {}).items()):
+            tick, price = self._prices.get(name, (None, None))
+            value = quantity * price if price is not None else None
+            positions.append({
+                "instrument_ticker": name,
+                "quantity": quantity,
+                "price": price,
+                "market_value": value,
+                "unrealized_pnl": value - quantity * average_cost if value is not None else None,
+            })
+            if value is not None:
+                market_value += value
+                cost_basis += quantity * average_cost
+                latest_tick = tick if latest_tick is None else max(latest_tick, tick)
+        return orjson.dumps({
+            "portfolio_id": str(portfolio_id),
+            "tick": latest_tick,
+            "market_value": market_value,
+            "cost_basis": cost_basis,
+            "unrealized_pnl": market_value - cost_basis,
+            "positions": positions,
+        })
+
+    def _schedule_flush(self) -> None:
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            asyncio.get_running_loop().call_soon(self._flush)
+
+    def _flush(self) -> None:
+        self._flush_scheduled = False
+        pending, self._pending = self._pending, set()
+        for portfolio_id in pending:
+            slots = self._subscribers.get(portfolio_id)
+            if not slots:
+                continue
+            payload = self._valuate(portfolio_id)
+            for slot in slots:
+                slot.put(payload)
+
+    async def _handle(self, channel: str, data: bytes) -> None:
+        if channel == self.holdings_channel:
+            portfolio_id = uuid.UUID(data.decode())
+            if portfolio_id in self._subscribers:
+                await self._load(portfolio_id)
+                self._pending.add(portfolio_id)
+                self._schedule_flush()
+            return
+        update = orjson.loads(data)
+        self.on_price(update["instrument_name"], float(update["price"]), int(update["tick"]))
+
+    async def _listen(self) -> None:
+        attempt = 0
+        while True:
+            try:
+                async with self.redis.pubsub() as pubsub:
+                    await pubsub.subscribe(self.price_channel, self.holdings_channel)
+                    attempt = 0
+                    async for message in pubsub.listen():
+                        if message["type"] != "message":
+                            continue
+                        channel = message["channel"]
+                        channel = channel.decode() if isinstance(channel, bytes) else channel
+                        try:
+                            await self._handle(channel, message["data"])
+                        except Exception:
+                            logger.exception(f"Invalid message on {channel}")
+            except RedisError:
+                delay = backoff_delay(attempt, base=0.5, cap=10.0)
+                attempt += 1
+                logger.warning(f"Valuation hub lost its Redis subscription; retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+
+valuation_hub = ValuationHub(
+    AsyncSessionLocal,
+    price_channel=settings.LIVE_PRICE_CHANNEL,
+    holdings_channel=settings.LIVE_HOLDINGS_CHANNEL,
+)
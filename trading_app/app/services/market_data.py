@@ -0,0 +1,212 @@
+# trading_app/app/services/market_data.py
+import math
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+
+CANDLE_FIELDS = ("tick", "open", "high", "low", "close", "volume")
+
+_UNIT_MS = {"D": 86_400_000, "W": 7 * 86_400_000}
+
+
+def resolution_ms(resolution: str) -> int:
+    """
+    Candle width of a pipeline resolution: minutes ('1', '60') or a
+    day/week suffix ('1D', '1W').
+    """
+    unit = resolution[-1:].upper()
+    if unit in _UNIT_MS:
+        return int(resolution[:-1] or 1) * _UNIT_MS[unit]
+    return int(resolution) * 60_000
+
+
+@dataclass(frozen=True)
+class Candles:
+    """
+    Columnar candle series ordered by `tick` (epoch milliseconds).
+    """
+    tick: np.ndarray    # int64
+    open: np.ndarray    # float64
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.tick)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name in CANDLE_FIELDS)
+
+    @classmethod
+    def from_rows(cls, rows) -> "Candles":
+        """
+        Builds the arrays from (tick, open, high, low, close, volume) rows.
+        """
+        if not rows:
+            return cls(
+                tick=np.empty(0, dtype=np.int64),
+                **{name: np.empty(0, dtype=np.float64) for name in CANDLE_FIELDS[1:]},
+            )
+        columns = zip(*rows)
+        tick = np.fromiter(next(columns), dtype=np.int64, count=len(rows))
+        return cls(
+            tick=tick,
+            **{name: np.fromiter(values, dtype=np.float64, count=len(rows))
+               for name, values in zip(CANDLE_FIELDS[1:], columns)},
+        )
+
+    def take(self, index) -> "Candles":
+        return Candles(**{name: getattr(self, name)[index] for name in CANDLE_FIELDS})
+
+    def between(self, start: int | None = None, end: int | None = None) -> "Candles":
+        """
+        Candles with start <= tick < end, found by binary search.
+        """
+        lo = 0 if start is None else int(np.searchsorted(self.tick, start, side="left"))
+        hi = len(self) if end is None else int(np.searchsorted(self.tick, end, side="left"))
+        return self.take(slice(lo, hi))
+
+    def merge(self, newer: "Candles", max_length: int | None = None) -> "Candles":
+        """
+        Appends `newer`, letting it replace any overlapping ticks (the last
+        candle is usually still forming), and keeps the latest `max_length`.
+        """
+        if len(newer):
+            keep = int(np.searchsorted(self.tick, newer.tick[0], side="left"))
+            merged = Candles(**{
+                name: np.concatenate((getattr(self, name)[:keep], getattr(newer, name)))
+                for name in CANDLE_FIELDS
+            })
+        else:
+            merged = self
+        if max_length is not None and len(merged) > max_length:
+            merged = merged.take(slice(len(merged) - max_length, None))
+        return merged
+
+    def to_columns(self) -> dict[str, list]:
+        return {name: getattr(self, name).tolist() for name in CANDLE_FIELDS}
+
+
+def closes_on_grid(candles: Candles, grid: np.ndarray) -> np.ndarray:
+    """
+    The latest close at or before each grid tick; ticks before the first
+    candle take its close.
+    """
+    index = np.clip(np.searchsorted(candles.tick, grid, side="right") - 1, 0, None)
+    return candles.close[index]
+
+
+def rebucket_ohlc(candles: Candles, max_points: int) -> Candles:
+    """
+    Merges runs of consecutive candles into at most `max_points` wider
+    candles: first open, highest high, lowest low, last close, summed volume.
+    """
+    n = len(candles)
+    if n <= max_points:
+        return candles
+    size = math.ceil(n / max_points)
+    starts = np.arange(0, n, size)
+    ends = np.minimum(starts + size, n) - 1
+    return Candles(
+        tick=candles.tick[starts],
+        open=candles.open[starts],
+        high=np.maximum.reduceat(candles.high, starts),
+        low=np.minimum.reduceat(candles.low, starts),
+        close=candles.close[ends],
+        volume=np.add.reduceat(candles.volume, starts),
+    )
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: picks `threshold` points (always keeping
+    the first and last) that best preserve the visual shape of the series.
+    The area computation within each bucket is vectorized; only the walk
+    over buckets is a Python loop, i.e. O(threshold) iterations.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = x.astype(np.float64)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_lo, next_hi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[next_lo:next_hi].mean()
+        avg_y = y[next_lo:next_hi].mean()
+        area = np.abs(
+            (x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a])
+        )
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def downsample(candles: Candles, max_points: int, method: str) -> Candles:
+    if method == "lttb":
+        return candles.take(lttb_indices(candles.tick, candles.close, max_points))
+    return rebucket_ohlc(candles, max_points)
+
+
+class CandleCache:
+    """
+    In-process LRU cache of candle series bounded by total array memory
+    rather than entry count, since one minute-resolution series can be
+    thousands of times larger than a daily one. Entries larger than the
+    whole budget are not cached.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._data: OrderedDict[tuple, tuple[float, Candles]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: tuple) -> tuple[float, Candles] | None:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._data.move_to_end(key)
+        return entry
+
+    def set(self, key: tuple, candles: Candles, fetched_at: float) -> None:
+        self.delete(key)
+        if candles.nbytes > self.max_bytes:
+            return
+        self._data[key] = (fetched_at, candles)
+        self.nbytes += candles.nbytes
+        while self.nbytes > self.max_bytes:
+            _, (_, evicted) = self._data.popitem(last=False)
+            self.nbytes -= evicted.nbytes
+            self.evictions += 1
+
+    def delete(self, key: tuple) -> None:
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self.nbytes -= entry[1].nbytes
+
+    def clear(self) -> None:
+        self._data.clear()
+        self.nbytes = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self),
+            "nbytes": self.nbytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
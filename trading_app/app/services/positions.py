@@ -0,0 +1,268 @@
+
+# trading_app/app/services/positions.py
+from dataclasses import dataclass
+from decimal import Decimal
+
+import numpy as np
+
+# Holdings below this are float residue of a fully closed position.
+_FLAT_EPSILON = 1e-12
+
+
+@dataclass(frozen=True)
+class TransactionArrays:
+    """
+    Columnar view of a portfolio's transactions, one array per column.
+    """
+    tickers: np.ndarray      # object (str)
+    is_buy: np.ndarray       # bool
+    quantity: np.ndarray     # float64
+    price: np.ndarray        # float64
+    timestamp: np.ndarray    # datetime64[us]
+
+    def __len__(self) -> int:
+        return len(self.tickers)
+
+    @classmethod
+    def from_rows(cls, rows) -> "TransactionArrays":
+        """
+        Builds the arrays from (ticker, type, quantity, price, date) rows.
+        """
+        if not rows:
+            return cls(
+                tickers=np.empty(0, dtype=object),
+                is_buy=np.empty(0, dtype=bool),
+                quantity=np.empty(0, dtype=np.float64),
+                price=np.empty(0, dtype=np.float64),
+                timestamp=np.empty(0, dtype="datetime64[us]"),
+            )
+        tickers, types, quantity, price, dates = zip(*rows)
+        return cls(
+            tickers=np.array(tickers, dtype=object),
+            is_buy=np.array(types, dtype=object) == "BUY",
+            quantity=np.array(quantity, dtype=np.float64),
+            price=np.array(price, dtype=np.float64),
+            # Drop the tz (values are UTC) so NumPy does not warn on conversion.
+            timestamp=np.array([d.replace(tzinfo=None) for d in dates], dtype="datetime64[us]"),
+        )
+
+
+@dataclass(frozen=True)
+class Positions:
+    """
+    Per-ticker results, aligned on `tickers` (sorted).
+    """
+    tickers: np.ndarray
+    quantity: np.ndarray
+    average_cost: np.ndarray
+    average_cost_basis: np.ndarray
+    fifo_cost_basis: np.ndarray
+    realized_pnl_average: np.ndarray
+    realized_pnl_fifo: np.ndarray
+
+    def to_records(self, include_closed: bool = True) -> list[dict]:
+        keep = np.ones(len(self.tickers), dtype=bool) if include_closed else self.quantity != 0
+        return [
+            {
+                "instrument_ticker": str(self.tickers[i]),
+                "quantity": float(self.quantity[i]),
+                "average_cost": float(self.average_cost[i]),
+                "average_cost_basis": float(self.average_cost_basis[i]),
+                "fifo_cost_basis": float(self.fifo_cost_basis[i]),
+                "realized_pnl_average": float(self.realized_pnl_average[i]),
+                "realized_pnl_fifo": float(self.realized_pnl_fifo[i]),
+            }
+            for i in np.flatnonzero(keep)
+        ]
+
+
+def _affine_scan(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    Solves x[t] = a[t] * x[t-1] + b[t] (x[-1] = 0) for every t with a
+    log-step scan: log2(n) vectorized passes, each composing every step
+    with the one `shift` rows before it. Products of a only shrink towards
+    zero, so long histories cannot overflow.
+    """
+    a = a.copy()
+    b = b.copy()
+    shift = 1
+    while shift < len(a):
+        b[shift:] = a[shift:] * b[:-shift] + b[shift:]
+        a[shift:] = a[shift:] * a[:-shift]
+        shift *= 2
+    return b
+
+
+def compute_positions(txns: TransactionArrays) -> Positions:
+    """
+    Computes net quantity, average and FIFO cost basis and realized P&L for
+    every ticker in a few vectorized passes; there is no per-transaction
+    Python loop.
+
+    Sells beyond the quantity held (short sells) are left unmatched: they
+    realize nothing and later buys open new lots instead of covering them.
+    With U the running maximum of the shortfall, the units held are always
+    net quantity + U, and the units sold against lots are sells - U.
+
+    FIFO works on cumulative bought quantity: matched sells always consume
+    the oldest lots, so the cost of everything sold is the cost of the
+    first `matched` units bought, a linear interpolation into the running
+    buy-cost sum found with one `searchsorted` over the whole portfolio.
+
+    Average cost is a running average: buys blend into it, sells realize
+    against the average at that moment and leave it unchanged, and it
+    resets when the position goes flat. The held cost follows the linear
+    recurrence basis = ratio * basis + buy cost, solved by `_affine_scan`.
+    """
+    tickers, codes = np.unique(txns.tickers, return_inverse=True)
+    codes = codes.ravel()
+    order = np.lexsort((txns.timestamp, codes))
+    codes = codes[order]
+    is_buy = txns.is_buy[order]
+    quantity = txns.quantity[order]
+    price = txns.price[order]
+
+    n_tickers = len(tickers)
+    buy_qty = np.where(is_buy, quantity, 0.0)
+    sell_qty = np.where(is_buy, 0.0, quantity)
+    buy_cost = buy_qty * price
+
+    total_buy_qty = np.bincount(codes, weights=buy_qty, minlength=n_tickers)
+    total_buy_cost = np.bincount(codes, weights=buy_cost, minlength=n_tickers)
+    total_sell_qty = np.bincount(codes, weights=sell_qty, minlength=n_tickers)
+    net_qty = total_buy_qty - total_sell_qty
+
+    # Per-ticker running net quantity and shortfall (one pass per ticker).
+    n_rows = len(codes)
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]]) if n_rows else np.empty(0, dtype=np.intp)
+    last_row = np.r_[starts[1:] - 1, n_rows - 1] if n_rows else starts
+    running_net = np.concatenate([np.cumsum(g) for g in np.split(buy_qty - sell_qty, starts[1:])])
+    shortfall = np.concatenate([
+        np.maximum.accumulate(np.maximum(-g, 0.0)) for g in np.split(running_net, starts[1:])
+    ])
+    held = running_net + shortfall
+    held[held < _FLAT_EPSILON] = 0.0
+    first_row = np.zeros(n_rows, dtype=bool)
+    first_row[starts] = True
+    shortfall_before = np.where(first_row, 0.0, np.r_[0.0, shortfall[:-1]])
+    held_before = np.where(first_row, 0.0, np.r_[0.0, held[:-1]])
+    matched = np.where(is_buy, 0.0, sell_qty - (shortfall - shortfall_before))
+    matched_qty = np.bincount(codes, weights=matched, minlength=n_tickers)
+    matched_proceeds = np.bincount(codes, weights=matched * price, minlength=n_tickers)
+
+    # Average cost: a sell keeps held/held_before of the cost, a buy adds
+    # its cost, and the first row of each ticker starts from nothing.
+    with np.errstate(divide="ignore", invalid="ignore"):
+        kept = np.where(is_buy | (held_before == 0), 1.0, held / held_before)
+    basis = _affine_scan(np.where(first_row, 0.0, kept), buy_cost)
+    basis_before = np.where(first_row, 0.0, np.r_[0.0, basis[:-1]])
+    sold_at_average = np.bincount(codes, weights=np.where(is_buy, 0.0, basis_before - basis), minlength=n_tickers)
+    average_cost_basis = np.zeros(n_tickers)
+    held_now = np.zeros(n_tickers)
+    average_cost_basis[codes[last_row]] = basis[last_row]
+    held_now[codes[last_row]] = held[last_row]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        average_cost = np.where(held_now > 0, average_cost_basis / held_now, 0.0)
+
+    # Running sums of bought quantity/cost across the ticker-grouped array,
+    # with a leading zero so that index j covers rows [0, j).
+    cum_qty = np.concatenate(([0.0], np.cumsum(buy_qty)))
+    cum_cost = np.concatenate(([0.0], np.cumsum(buy_cost)))
+    group_start_qty = np.concatenate(([0.0], np.cumsum(total_buy_qty)[:-1]))
+    group_start_cost = np.concatenate(([0.0], np.cumsum(total_buy_cost)[:-1]))
+
+    target = group_start_qty + matched_qty
+    # Row `crossing` is the buy lot in which the target quantity is reached.
+    crossing = np.maximum(np.searchsorted(cum_qty, target, side="left") - 1, 0)
+    crossing_price = price[np.minimum(crossing, len(price) - 1)]
+    cost_through_target = cum_cost[crossing] + (target - cum_qty[crossing]) * crossing_price
+    fifo_sold_cost = np.where(matched_qty > 0, cost_through_target - group_start_cost, 0.0)
+
+    return Positions(
+        tickers=tickers,
+        quantity=net_qty,
+        average_cost=average_cost,
+        average_cost_basis=average_cost_basis,
+        fifo_cost_basis=total_buy_cost - fifo_sold_cost,
+        realized_pnl_average=matched_proceeds - sold_at_average,
+        realized_pnl_fifo=matched_proceeds - fifo_sold_cost,
+    )
+
+
+@dataclass
+class SnapshotDelta:
+    """
+    Contribution of one or more transactions to a ticker's running
+    aggregates. Subtracting a transaction's delta undoes it exactly, which
+    is what makes incremental snapshot maintenance possible.
+    """
+    buy_quantity: Decimal = Decimal(0)
+    buy_cost: Decimal = Decimal(0)
+    sell_quantity: Decimal = Decimal(0)
+    sell_proceeds: Decimal = Decimal(0)
+    transaction_count: int = 0
+
+    def add(self, transaction_type: str, quantity: Decimal, price: Decimal, sign: int = 1) -> None:
+        if transaction_type == "BUY":
+            self.buy_quantity += sign * quantity
+            self.buy_cost += sign * quantity * price
+        else:
+            self.sell_quantity += sign * quantity
+            self.sell_proceeds += sign * quantity * price
+        self.transaction_count += sign
+
+
+@dataclass
+class RunningCost:
+    """
+    Average-cost state of one ticker, advanced one transaction at a time in
+    date order; the Decimal counterpart of `compute_positions`' running
+    average. Unlike SnapshotDelta it depends on order, so a transaction
+    dated before the last one applied means replaying the ticker.
+    """
+    held_quantity: Decimal = Decimal(0)
+    held_cost: Decimal = Decimal(0)
+    realized_pnl: Decimal = Decimal(0)
+
+    def apply(self, transaction_type: str, quantity: Decimal, price: Decimal) -> None:
+        if transaction_type == "BUY":
+            self.held_quantity += quantity
+            self.held_cost += quantity * price
+            return
+        # Sells beyond the quantity held are left unmatched.
+        matched = min(quantity, self.held_quantity)
+        if matched <= 0:
+            return
+        average = self.held_cost / self.held_quantity
+        self.realized_pnl += matched * (price - average)
+        if matched == self.held_quantity:
+            self.held_quantity, self.held_cost = Decimal(0), Decimal(0)
+        else:
+            self.held_quantity -= matched
+            self.held_cost -= matched * average
+
+
+def holding_from_aggregates(
+    instrument_ticker: str,
+    buy_quantity: Decimal,
+    sell_quantity: Decimal,
+    held_quantity: Decimal,
+    held_cost: Decimal,
+    realized_pnl: Decimal,
+    transaction_count: int,
+) -> dict:
+    """
+    Derives a holding from snapshot aggregates: net quantity from the
+    sums, average cost and realized P&L from the running average, matching
+    `compute_positions`' average-cost figures.
+    """
+    quantity = buy_quantity - sell_quantity
+    average_cost = held_cost / held_quantity if held_quantity else Decimal(0)
+    return {
+        "instrument_ticker": instrument_ticker,
+        "quantity": quantity,
+        "average_cost": average_cost,
+        "cost_basis": held_cost,
+        "realized_pnl": realized_pnl,
+        "transaction_count": transaction_count,
+    }
@@ -0,0 +1,131 @@
+# trading_app/app/services/risk.py
+from dataclasses import dataclass
+from statistics import NormalDist
+
+import numpy as np
+
+from app.services.market_data import Candles, closes_on_grid
+
+
+@dataclass(frozen=True)
+class PriceMatrix:
+    """
+    Closes of several instruments aligned on one tick grid: `closes[t, i]`
+    is the close of `tickers[i]` at `tick[t]`.
+    """
+    tick: np.ndarray     # int64, (T,)
+    tickers: list[str]
+    closes: np.ndarray   # float64, (T, N)
+
+    @classmethod
+    def from_candles(cls, prices: dict[str, Candles], tickers: list[str]) -> "PriceMatrix":
+        """
+        Builds the matrix on the union of the instruments' ticks, forward
+        filling gaps. Instruments without candles are left out.
+        """
+        tickers = [t for t in tickers if t in prices and len(prices[t])]
+        grid = np.unique(np.concatenate(
+            [prices[t].tick for t in tickers] or [np.empty(0, dtype=np.int64)]
+        ))
+        closes = np.empty((len(grid), len(tickers)))
+        for j, ticker in enumerate(tickers):
+            closes[:, j] = closes_on_grid(prices[ticker], grid)
+        return cls(tick=grid, tickers=tickers, closes=closes)
+
+
+def compute_risk(
+    matrix: PriceMatrix,
+    quantities: np.ndarray,
+    *,
+    benchmark: np.ndarray | None = None,
+    confidence: float = 0.95,
+    window: int = 20,
+    periods_per_year: int = 365,
+) -> dict:
+    """
+    Portfolio risk for the current holdings from one (time x instrument)
+    returns matrix:
+
+    - the covariance matrix comes from a single matrix product and yields
+      per-instrument volatility, the correlation matrix and the parametric
+      (variance-covariance) VaR;
+    - portfolio returns are one matrix-vector product, giving historical
+      VaR, rolling volatility (via cumulative sums) and max drawdown;
+    - beta is taken against the `benchmark` close series, if given, which
+      must be aligned on `matrix.tick`.
+
+    VaR figures are one-period losses in currency at `confidence`.
+    Returns and weights use the latest closes (current holdings held
+    constant over the history).
+    """
+    closes = matrix.closes
+    n_periods, n_instruments = closes.shape
+    result = {
+        "tickers": matrix.tickers,
+        "observations": max(n_periods - 1, 0),
+        "portfolio_value": 0.0,
+        "volatility": None,
+        "rolling_volatility_tick": [],
+        "rolling_volatility": [],
+        "var_historical": None,
+        "var_parametric": None,
+        "max_drawdown": None,
+        "beta": None,
+        "instrument_volatility": [],
+        "correlation": [],
+    }
+    if n_instruments == 0 or n_periods < 3:
+        return result
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = np.nan_to_num(closes[1:] / closes[:-1] - 1.0, nan=0.0, posinf=0.0, neginf=0.0)
+    exposure = quantities * closes[-1]
+    value = float(exposure.sum())
+    weights = exposure / value if value else np.zeros(n_instruments)
+
+    centered = returns - returns.mean(axis=0)
+    cov = centered.T @ centered / (len(returns) - 1)
+    std = np.sqrt(np.diag(cov))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        corr = np.where(np.outer(std, std) > 0, cov / np.outer(std, std), 0.0)
+    np.fill_diagonal(corr, 1.0)
+
+    portfolio_returns = returns @ weights
+    portfolio_std = float(np.sqrt(max(weights @ cov @ weights, 0.0)))
+    z = NormalDist().inv_cdf(1 - confidence)
+    annualize = np.sqrt(periods_per_year)
+
+    # Rolling sample std from windowed sums of r and r^2.
+    rolling = []
+    if len(portfolio_returns) >= window > 1:
+        c1 = np.concatenate(([0.0], np.cumsum(portfolio_returns)))
+        c2 = np.concatenate(([0.0], np.cumsum(portfolio_returns ** 2)))
+        s1 = c1[window:] - c1[:-window]
+        s2 = c2[window:] - c2[:-window]
+        variance = np.maximum((s2 - s1 ** 2 / window) / (window - 1), 0.0)
+        rolling = (np.sqrt(variance) * annualize).tolist()
+        result["rolling_volatility_tick"] = matrix.tick[window:].tolist()
+
+    growth = np.cumprod(1.0 + portfolio_returns)
+    drawdown = 1.0 - growth / np.maximum.accumulate(growth)
+
+    beta = None
+    if benchmark is not None and len(benchmark) == n_periods:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            benchmark_returns = np.nan_to_num(benchmark[1:] / benchmark[:-1] - 1.0)
+        benchmark_var = benchmark_returns.var(ddof=1)
+        if benchmark_var > 0:
+            beta = float(np.cov(portfolio_returns, benchmark_returns)[0, 1] / benchmark_var)
+
+    result.update(
+        portfolio_value=value,
+        volatility=portfolio_std * annualize,
+        rolling_volatility=rolling,
+        var_historical=float(-np.quantile(portfolio_returns, 1 - confidence) * value),
+        var_parametric=float(-(portfolio_returns.mean() + z * portfolio_std) * value),
+        max_drawdown=float(drawdown.max()),
+        beta=beta,
+        instrument_volatility=(std * annualize).tolist(),
+        correlation=corr.tolist(),
+    )
+    return result
@@ -0,0 +1,162 @@
+
+# trading_app/app/services/transaction_import.py
+import codecs
+import csv
+import datetime
+import io
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Awaitable, Callable
+
+import orjson
+from pydantic import ValidationError
+
+from app.schemas.transaction import TransactionBase
+from app.services.positions import SnapshotDelta
+
+IMPORT_COLUMNS = [
+    "id",
+    "portfolio_id",
+    "instrument_ticker",
+    "transaction_type",
+    "quantity",
+    "price",
+    "transaction_date",
+]
+
+CHUNK_SIZE = 64 * 1024
+MAX_CSV_RECORD_CHARS = 64 * 1024  # Longest CSV record, quoted newlines included
+
+
+@dataclass
+class ImportReport:
+    """
+    Running statistics for one import. Only the first `max_errors` rejected
+    rows are kept in detail so that a bad file cannot exhaust memory.
+    `deltas` sums the accepted rows per ticker for the position snapshots.
+    """
+    max_errors: int
+    rows_total: int = 0
+    rows_rejected: int = 0
+    errors: list[dict] = field(default_factory=list)
+    deltas: dict[str, SnapshotDelta] = field(default_factory=dict)
+    earliest_date: datetime.datetime | None = None
+    started_at: float = field(default_factory=time.perf_counter)
+
+    def reject(self, row_number: int, messages: list[str]) -> None:
+        self.rows_rejected += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"row": row_number, "errors": messages})
+
+
+async def iter_lines(read: Callable[[int], Awaitable[bytes]]) -> AsyncIterator[str]:
+    """
+    Yields decoded lines from a chunked byte source, holding at most one
+    chunk plus one partial line in memory.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    while True:
+        chunk = await read(CHUNK_SIZE)
+        if not chunk:
+            break
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending.strip():
+        yield pending.rstrip("\r")
+
+
+async def iter_raw_rows(lines: AsyncIterator[str], file_format: str) -> AsyncIterator[tuple[int, dict | None, str | None]]:
+    """
+    Turns CSV (with a header line) or NDJSON lines into dicts. Yields
+    (row_number, row, parse_error) and skips blank lines. A CSV record runs
+    on over following lines while a quoted field is open (balanced quotes
+    close it), and the whole record is then parsed by csv.reader.
+    """
+    header: list[str] | None = None
+    row_number = 0
+    pending: list[str] = []
+    pending_chars = 0
+    async for line in lines:
+        if file_format == "csv":
+            pending.append(line)
+            pending_chars += len(line) + 1
+            record = "\n".join(pending)
+            if record.count('"') % 2 and pending_chars <= MAX_CSV_RECORD_CHARS:
+                continue  # A quoted field continues on the next line
+            pending, pending_chars = [], 0
+            if not record.strip():
+                continue
+            if header is not None:
+                row_number += 1
+            if record.count('"') % 2:
+                yield row_number, None, f"unterminated quoted field or record over {MAX_CSV_RECORD_CHARS} characters"
+                continue
+            try:
+                values = next(csv.reader(io.StringIO(record, newline=""), strict=True))
+            except csv.Error as e:
+                yield row_number, None, f"invalid CSV: {e}"
+                continue
+            if header is None:
+                header = [name.strip() for name in values]
+                continue
+            if len(values) != len(header):
+                yield row_number, None, f"expected {len(header)} columns, got {len(values)}"
+                continue
+            yield row_number, dict(zip(header, values)), None
+        else:
+            if not line.strip():
+                continue
+            row_number += 1
+            try:
+                row = orjson.loads(line)
+            except orjson.JSONDecodeError as e:
+                yield row_number, None, f"invalid JSON: {e}"
+                continue
+            if not isinstance(row, dict):
+                yield row_number, None, "expected a JSON object"
+                continue
+            yield row_number, row, None
+    if pending and "\n".join(pending).strip():
+        yield row_number + 1, None, "unterminated quoted field"
+
+
+async def iter_valid_records(
+    raw_rows: AsyncIterator[tuple[int, dict | None, str | None]],
+    portfolio_id: uuid.UUID,
+    report: ImportReport,
+) -> AsyncIterator[tuple]:
+    """
+    Validates each row against TransactionBase and yields COPY-ready tuples
+    in IMPORT_COLUMNS order; invalid rows are recorded on the report.
+    """
+    async for row_number, row, parse_error in raw_rows:
+        report.rows_total += 1
+        if parse_error is not None:
+            report.reject(row_number, [parse_error])
+            continue
+        try:
+            txn = TransactionBase.model_validate(row)
+        except ValidationError as e:
+            report.reject(
+                row_number,
+                [f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in e.errors()],
+            )
+            continue
+        delta = report.deltas.setdefault(txn.instrument_ticker, SnapshotDelta())
+        delta.add(txn.transaction_type, txn.quantity, txn.price)
+        if report.earliest_date is None or txn.transaction_date < report.earliest_date:
+            report.earliest_date = txn.transaction_date
+        yield (
+            uuid.uuid4(),
+            portfolio_id,
+            txn.instrument_ticker,
+            txn.transaction_type,
+            txn.quantity,
+            txn.price,
+            txn.transaction_date,
+        )
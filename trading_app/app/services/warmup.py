@@ -0,0 +1,130 @@
+# trading_app/app/services/warmup.py
+import asyncio
+import time
+
+import aiohttp
+from loguru import logger
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+from app.clients.librarian import LibrarianClient
+from app.core.config import settings
+from app.crud import crud_market, crud_position_snapshot
+
+
+class Readiness:
+    """
+    Startup state reported by /ready. `timings` holds the duration of each
+    startup phase in seconds; `errors` the phases that failed (a failed
+    optional phase does not block readiness).
+    """
+
+    def __init__(self):
+        self.ready = False
+        self.timings: dict[str, float] = {}
+        self.errors: dict[str, str] = {}
+        self._task: asyncio.Task | None = None
+
+    def record(self, phase: str, started: float) -> None:
+        self.timings[phase] = time.perf_counter() - started
+        logger.info(f"Startup phase '{phase}' took {self.timings[phase] * 1000:.0f} ms")
+
+    def report(self) -> dict:
+        return {
+            "status": "ready" if self.ready else "starting",
+            "timings": self.timings,
+            "errors": self.errors,
+        }
+
+    def start(self, *phases) -> None:
+        """
+        Runs the warm-up in the background so the server can answer /health
+        and /ready meanwhile. Phases are (name, coroutine function,
+        required) tuples run in order; required phases are retried until
+        they succeed.
+        """
+        self._task = asyncio.create_task(self._run(phases), name="warmup")
+
+    async def stop(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self, phases) -> None:
+        started = time.perf_counter()
+        for name, phase, required in phases:
+            phase_started = time.perf_counter()
+            while True:
+                try:
+                    await phase()
+                except Exception as e:
+                    self.errors[name] = repr(e)
+                    if not required:
+                        logger.warning(f"Optional startup phase '{name}' failed: {e!r}")
+                        break
+                    logger.warning(f"Startup phase '{name}' failed, retrying: {e!r}")
+                    await asyncio.sleep(settings.WARMUP_RETRY_SECONDS)
+                else:
+                    self.errors.pop(name, None)
+                    break
+            self.record(name, phase_started)
+        self.record("warmup_total", started)
+        self.ready = True
+
+
+async def warm_db_pool(engine: AsyncEngine, connections: int) -> None:
+    """
+    Opens `connections` pooled connections at the same time (so the pool
+    really creates that many) and returns them to the pool. If any of them
+    fails the others are cancelled, so none is left holding a connection.
+    """
+    if connections <= 0:
+        return
+    all_open = asyncio.Event()
+    opened = 0
+
+    async def open_one() -> None:
+        nonlocal opened
+        async with engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+            opened += 1
+            if opened == connections:
+                all_open.set()
+            await all_open.wait()
+
+    async with asyncio.TaskGroup() as group:
+        for _ in range(connections):
+            group.create_task(open_one())
+
+
+async def warm_librarian(client: LibrarianClient, connections: int) -> None:
+    """
+    Resolves the Librarian host and leaves `connections` keep-alive
+    connections in the client's pool. Any HTTP status counts: only the
+    connection matters.
+    """
+    session = await client.get_session()
+    timeout = aiohttp.ClientTimeout(total=settings.LIBRARIAN_CONNECT_TIMEOUT_SECONDS * 2)
+
+    async def ping() -> None:
+        async with session.get(settings.LIBRARIAN_HEALTH_URL, timeout=timeout) as response:
+            await response.read()
+
+    await asyncio.gather(*(ping() for _ in range(connections)))
+
+
+async def preload_candles(session_factory: async_sessionmaker[AsyncSession], instruments: int) -> None:
+    """
+    Loads the recent-candle window of the most-held instruments, at the
+    resolutions used by live valuation and the daily analytics.
+    """
+    if instruments <= 0:
+        return
+    async with session_factory() as db:
+        tickers = await crud_position_snapshot.get_most_held_tickers(db, limit=instruments)
+        for ticker in tickers:
+            for resolution in dict.fromkeys((settings.LIVE_PRICE_RESOLUTION, "1D")):
+                await crud_market.get_recent_candles(db, instrument_name=ticker, resolution=resolution)
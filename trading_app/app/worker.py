@@ -0,0 +1,108 @@
+# trading_app/app/worker.py
+"""
+Background job worker. Run one or more processes next to the API:
+
+    python -m app.worker
+
+Each process consumes the job stream with JOB_WORKER_CONCURRENCY jobs in
+flight; SIGTERM stops taking new jobs and waits for the running ones.
+Connection pools are sized from the JOB_* budgets (see app/core/pools.py).
+"""
+import asyncio
+import os
+import signal
+import socket
+import uuid
+
+if __name__ == "__main__":
+    # Pools are sized when app.core.pools is first imported, so the role
+    # must be set before any app module is.
+    os.environ["PROCESS_ROLE"] = "job"
+
+from fastapi import HTTPException
+
+from app.clients.librarian import librarian_client
+from app.core.config import settings
+from app.core.redis import redis_client
+from app.crud import crud_conversation
+from app.crud.conversation_writer import conversation_writer
+from app.db.session import AsyncSessionLocal
+from app.schemas.ai import AIChatRequest, AIChatResponse
+from app.services.jobs import JobError, JobHandler, JobWorker, job_queue
+
+
+async def handle_ai_chat(user_id: uuid.UUID, payload: dict) -> dict:
+    """
+    The `/ai/chat` flow as a job: same context window, same write-behind
+    persistence, with the answer stored as the job result.
+    """
+    request = AIChatRequest.model_validate(payload)
+    async with AsyncSessionLocal() as db:
+        history = await crud_conversation.get_chat_context(
+            db,
+            user_id=user_id,
+            conversation_id=request.conversation_id,
+            max_turns=settings.CONVERSATION_HISTORY_MAX_TURNS,
+            max_tokens=settings.CONVERSATION_HISTORY_MAX_TOKENS,
+        )
+    if history is None:
+        raise JobError("Conversation not found")
+
+    try:
+        librarian_response = await librarian_client.query(
+            user_id=str(user_id),
+            prompt=request.prompt,
+            conversation_history=history,
+            use_cache=request.use_cache,
+        )
+    except HTTPException as e:
+        raise JobError(e.detail)
+
+    conversation_id = await crud_conversation.queue_turn(
+        user_id=user_id,
+        conversation_id=request.conversation_id,
+        prompt=request.prompt,
+        response=librarian_response,
+    )
+    return AIChatResponse(
+        answer=librarian_response.get("answer", "No answer found."),
+        conversation_id=str(conversation_id),
+        sources=librarian_response.get("sources", []),
+    ).model_dump(mode="json")
+
+
+HANDLERS: dict[str, JobHandler] = {
+    "ai_chat": handle_ai_chat,
+}
+
+
+async def main() -> None:
+    worker = JobWorker(
+        job_queue,
+        HANDLERS,
+        concurrency=settings.JOB_WORKER_CONCURRENCY,
+        consumer=f"{socket.gethostname()}-{os.getpid()}",
+        claim_idle=settings.JOB_CLAIM_IDLE_SECONDS,
+        max_attempts=settings.JOB_MAX_ATTEMPTS,
+    )
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, worker.stop)
+
+    conversation_writer.start()
+    try:
+        await worker.run()
+    finally:
+        # Drain queued conversation turns before tearing anything down
+        await conversation_writer.stop()
+        await librarian_client.close()
+        await redis_client.aclose()
+
+
+if __name__ == "__main__":
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
+    asyncio.run(main())
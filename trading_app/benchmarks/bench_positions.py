@@ -0,0 +1,50 @@
+# trading_app/benchmarks/bench_positions.py
+"""
+Benchmark for the vectorized positions engine.
+
+Run from `trading_app/`:
+
+    python -m benchmarks.bench_positions --sizes 100000 1000000 --tickers 200
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.services.positions import TransactionArrays, compute_positions
+
+
+def synthetic_transactions(n: int, n_tickers: int, seed: int = 42) -> TransactionArrays:
+    rng = np.random.default_rng(seed)
+    universe = np.array([f"TICK{i:04d}" for i in range(n_tickers)], dtype=object)
+    start = np.datetime64("2015-01-01T00:00:00", "us")
+    return TransactionArrays(
+        tickers=universe[rng.integers(0, n_tickers, n)],
+        # Buy-heavy so that most sells have lots to match against.
+        is_buy=rng.random(n) < 0.6,
+        quantity=rng.integers(1, 500, n).astype(np.float64),
+        price=rng.uniform(1, 1_000, n),
+        timestamp=start + rng.integers(0, 10 * 365 * 24 * 3600, n).astype("timedelta64[s]"),
+    )
+
+
+def run(sizes: list[int], n_tickers: int, repeat: int) -> None:
+    print(f"{'transactions':>14} {'tickers':>8} {'best (ms)':>10} {'txn/s':>14}")
+    for n in sizes:
+        txns = synthetic_transactions(n, n_tickers)
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            compute_positions(txns)
+            timings.append(time.perf_counter() - start)
+        best = min(timings)
+        print(f"{n:>14,} {n_tickers:>8} {best * 1000:>10.1f} {n / best:>14,.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--tickers", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    run(args.sizes, args.tickers, args.repeat)
@@ -0,0 +1,69 @@
+# trading_app/benchmarks/bench_risk.py
+"""
+Benchmark for the risk analytics engine: one vectorized pass over the
+(time x instrument) returns matrix versus computing each metric per
+instrument or instrument pair.
+
+Run from `trading_app/`:
+
+    python -m benchmarks.bench_risk --instruments 50 100 250 500 --years 5
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.services.risk import PriceMatrix, compute_risk
+
+
+def synthetic_prices(n_instruments: int, years: int, seed: int = 42) -> PriceMatrix:
+    rng = np.random.default_rng(seed)
+    n_periods = years * 365
+    returns = rng.normal(0.0003, 0.02, size=(n_periods, n_instruments))
+    return PriceMatrix(
+        tick=np.arange(n_periods, dtype=np.int64) * 86_400_000,
+        tickers=[f"TICK{i:04d}" for i in range(n_instruments)],
+        closes=100 * np.cumprod(1 + returns, axis=0),
+    )
+
+
+def per_instrument_baseline(matrix: PriceMatrix) -> None:
+    """
+    The naive approach: per-instrument return series and volatilities, and
+    a correlation per pair.
+    """
+    n = len(matrix.tickers)
+    series = [matrix.closes[1:, i] / matrix.closes[:-1, i] - 1 for i in range(n)]
+    [s.std(ddof=1) for s in series]
+    for i in range(n):
+        for j in range(i + 1, n):
+            np.corrcoef(series[i], series[j])
+
+
+def best_of(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def run(instrument_counts: list[int], years: int, repeat: int, baseline: bool) -> None:
+    print(f"{'instruments':>12} {'days':>6} {'vectorized (ms)':>16} {'baseline (ms)':>14}")
+    for n in instrument_counts:
+        matrix = synthetic_prices(n, years)
+        quantities = np.ones(n)
+        vectorized = best_of(lambda: compute_risk(matrix, quantities, benchmark=matrix.closes[:, 0]), repeat)
+        naive = best_of(lambda: per_instrument_baseline(matrix), 1) if baseline else float("nan")
+        print(f"{n:>12,} {len(matrix.tick):>6,} {vectorized * 1000:>16.1f} {naive * 1000:>14.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--instruments", type=int, nargs="+", default=[50, 100, 250, 500])
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--no-baseline", dest="baseline", action="store_false")
+    args = parser.parse_args()
+    run(args.instruments, args.years, args.repeat, args.baseline)
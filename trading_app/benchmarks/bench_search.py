@@ -0,0 +1,177 @@
+# trading_app/benchmarks/bench_search.py
+"""
+Benchmark for conversation full-text search: the GIN-indexed search_vector
+query behind `GET /ai/conversations/search` versus a per-user ILIKE scan
+of the same turns.
+
+Needs a migrated database (DATABASE_* settings, as for the app). Seed once,
+then run as often as needed, from `trading_app/`:
+
+    python -m benchmarks.bench_search --seed --conversations 1000000 --users 1000
+    python -m benchmarks.bench_search --repeat 20
+    python -m benchmarks.bench_search --cleanup
+
+Seeded users have `@bench.invalid` emails and are the only rows touched.
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from sqlalchemy import text
+
+from app.crud import crud_conversation
+from app.db.session import AsyncSessionLocal, engine, read_engine
+
+BENCH_EMAILS = "bench-%@bench.invalid"
+
+# Drawn with a skew towards the front, so the first words are in most
+# turns and the synthetic tail is rare: every query selectivity is covered.
+COMMON_WORDS = [
+    "market", "price", "bitcoin", "portfolio", "risk", "volatility", "trend", "order",
+    "position", "ether", "funding", "hedge", "spread", "liquidity", "option", "futures",
+    "drawdown", "momentum", "support", "resistance", "breakout", "leverage", "margin", "yield",
+]
+VOCABULARY = COMMON_WORDS + [f"token{i:04d}" for i in range(5_000)]
+
+QUERIES = {
+    "common word": "market",
+    "mid word": "leverage",
+    "rare word": "token4990",
+    "phrase": '"bitcoin price"',
+    "or + exclude": "hedge or margin -futures",
+}
+
+
+async def seed(conversations: int, users: int, turns: int, words: int) -> None:
+    started = time.perf_counter()
+    async with engine.begin() as conn:
+        await conn.execute(text("""
+            INSERT INTO app_data.users (id, email, hashed_password, is_active)
+            SELECT gen_random_uuid(), 'bench-' || i || '@bench.invalid', '!', true
+            FROM generate_series(1, :users) AS i
+        """), {"users": users})
+        await conn.execute(text("""
+            WITH bench AS (
+                SELECT array_agg(id ORDER BY email) AS ids FROM app_data.users WHERE email LIKE :emails
+            )
+            INSERT INTO app_data.ai_conversations (id, user_id, created_at, last_seq)
+            SELECT gen_random_uuid(), bench.ids[1 + g.i % cardinality(bench.ids)], now() - g.i * interval '1 minute', :turns
+            FROM bench, generate_series(0, :conversations - 1) AS g(i)
+        """), {"emails": BENCH_EMAILS, "conversations": conversations, "turns": turns})
+        # The lateral subquery references the outer row so that every turn
+        # gets its own random text.
+        await conn.execute(text("""
+            WITH vocabulary AS (SELECT CAST(:vocabulary AS text[]) AS w)
+            INSERT INTO app_data.ai_conversation_turns
+                (conversation_id, seq, role, content, token_count, created_at)
+            SELECT c.id, s.seq, CASE WHEN s.seq % 2 = 1 THEN 'user' ELSE 'assistant' END,
+                   t.content, GREATEST(1, length(t.content) / 4), c.created_at
+            FROM app_data.ai_conversations AS c
+            JOIN app_data.users AS u ON u.id = c.user_id AND u.email LIKE :emails
+            CROSS JOIN generate_series(1, :turns) AS s(seq)
+            CROSS JOIN vocabulary AS v
+            CROSS JOIN LATERAL (
+                SELECT string_agg(v.w[1 + floor(cardinality(v.w) * power(random(), 3))::int], ' ') AS content
+                FROM generate_series(1, :words)
+                WHERE c.id IS NOT NULL AND s.seq IS NOT NULL
+            ) AS t
+        """), {"emails": BENCH_EMAILS, "turns": turns, "words": words, "vocabulary": VOCABULARY})
+        await conn.execute(text("ANALYZE app_data.ai_conversations"))
+        await conn.execute(text("ANALYZE app_data.ai_conversation_turns"))
+    print(f"Seeded {conversations:,} conversations x {turns} turns in {time.perf_counter() - started:.1f}s")
+
+
+async def cleanup() -> None:
+    async with engine.begin() as conn:
+        # Turns go with their conversations (ON DELETE CASCADE).
+        await conn.execute(text("""
+            DELETE FROM app_data.ai_conversations
+            WHERE user_id IN (SELECT id FROM app_data.users WHERE email LIKE :emails)
+        """), {"emails": BENCH_EMAILS})
+        await conn.execute(text("DELETE FROM app_data.users WHERE email LIKE :emails"), {"emails": BENCH_EMAILS})
+    print("Removed benchmark users and conversations")
+
+
+async def indexed_search(user_id, query: str, pages: int, limit: int) -> int:
+    hits, after = 0, None
+    async with AsyncSessionLocal() as db:
+        for _ in range(pages):
+            rows = await crud_conversation.search_turns(db, user_id=user_id, text=query, after=after, limit=limit)
+            hits += len(rows)
+            if len(rows) < limit:
+                break
+            after = (rows[-1].rank, rows[-1].conversation_id, rows[-1].seq)
+    return hits
+
+
+async def ilike_search(user_id, query: str, pages: int, limit: int) -> int:
+    # What a search looks like without the index: match the raw text of
+    # every turn the user owns. Only the first term of the query is used.
+    term = query.strip('"').split()[0]
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(text("""
+            SELECT t.conversation_id, t.seq, t.content
+            FROM app_data.ai_conversation_turns AS t
+            JOIN app_data.ai_conversations AS c ON c.id = t.conversation_id
+            WHERE c.user_id = :user_id AND t.content ILIKE :pattern
+            ORDER BY t.created_at DESC
+            LIMIT :limit
+        """), {"user_id": user_id, "pattern": f"%{term}%", "limit": pages * limit})
+        return len(result.all())
+
+
+def percentile(timings: list[float], q: float) -> float:
+    return statistics.quantiles(timings, n=100)[int(q) - 1] if len(timings) > 1 else timings[0]
+
+
+async def run(repeat: int, pages: int, limit: int) -> None:
+    async with AsyncSessionLocal() as db:
+        user_ids = (await db.execute(
+            text("SELECT id FROM app_data.users WHERE email LIKE :emails"), {"emails": BENCH_EMAILS}
+        )).scalars().all()
+    if not user_ids:
+        raise SystemExit("No benchmark data; run with --seed first")
+    rng = random.Random(42)
+
+    print(f"{'query':>14} {'method':>8} {'hits':>6} {'p50 (ms)':>10} {'p95 (ms)':>10}")
+    for name, query in QUERIES.items():
+        for method, search in (("gin", indexed_search), ("ilike", ilike_search)):
+            timings, hits = [], 0
+            for _ in range(repeat):
+                user_id = rng.choice(user_ids)
+                start = time.perf_counter()
+                hits += await search(user_id, query, pages, limit)
+                timings.append(time.perf_counter() - start)
+            print(
+                f"{name:>14} {method:>8} {hits // repeat:>6} "
+                f"{percentile(timings, 50) * 1000:>10.1f} {percentile(timings, 95) * 1000:>10.1f}"
+            )
+
+
+async def main(args: argparse.Namespace) -> None:
+    try:
+        if args.cleanup:
+            await cleanup()
+            return
+        if args.seed:
+            await seed(args.conversations, args.users, args.turns, args.words)
+        await run(args.repeat, args.pages, args.limit)
+    finally:
+        await engine.dispose()
+        await read_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seed", action="store_true", help="Insert the benchmark data set first")
+    parser.add_argument("--cleanup", action="store_true", help="Delete the benchmark data set and exit")
+    parser.add_argument("--conversations", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=1_000)
+    parser.add_argument("--turns", type=int, default=2, help="Turns per conversation")
+    parser.add_argument("--words", type=int, default=30, help="Words per turn")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=3, help="Pages fetched per search, following the cursor")
+    parser.add_argument("--limit", type=int, default=20)
+    asyncio.run(main(parser.parse_args()))
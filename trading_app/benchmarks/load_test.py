@@ -0,0 +1,260 @@
+# trading_app/benchmarks/load_test.py
+"""
+Async load generator for a running instance of the API.
+
+Each scenario runs `--concurrency` workers for `--duration` seconds and
+reports p50/p95/p99 latency and requests per second. Results are written
+as JSON to `--output` (default benchmarks/results/<timestamp>.json); pass
+a previous report as `--baseline` to flag regressions (exit code 1).
+
+Run from `trading_app/` against an app wired to the fake Librarian
+(see tests/mocks/librarian/server.py):
+
+    python -m benchmarks.load_test --base-url http://localhost:8000 \\
+        --scenarios login chat chat_stream transactions_list --concurrency 32 --duration 20
+
+Scenarios: register, login, chat, chat_stream, transactions_list and,
+with --portfolio-id plus the owner's --email/--password,
+transactions_create.
+"""
+import argparse
+import asyncio
+import datetime
+import subprocess
+import sys
+import time
+import uuid
+from pathlib import Path
+
+import aiohttp
+import numpy as np
+import orjson
+
+RESULTS_DIR = Path(__file__).parent / "results"
+PASSWORD = "load-test-password"
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: list[float] = []
+        self.errors = 0
+        self.statuses: dict[int, int] = {}
+
+    def record(self, seconds: float, status: int) -> None:
+        self.latencies.append(seconds)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if status >= 400:
+            self.errors += 1
+
+    def summary(self, elapsed: float) -> dict:
+        latencies = np.array(self.latencies) * 1000
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if len(latencies) else (0.0, 0.0, 0.0)
+        return {
+            "requests": len(latencies),
+            "errors": self.errors,
+            "error_rate": self.errors / len(latencies) if len(latencies) else 0.0,
+            "rps": len(latencies) / elapsed if elapsed else 0.0,
+            "p50_ms": float(p50),
+            "p95_ms": float(p95),
+            "p99_ms": float(p99),
+            "mean_ms": float(latencies.mean()) if len(latencies) else 0.0,
+            "max_ms": float(latencies.max()) if len(latencies) else 0.0,
+            "statuses": {str(k): v for k, v in sorted(self.statuses.items())},
+        }
+
+
+async def register(session: aiohttp.ClientSession) -> tuple[str, int]:
+    email = f"load-{uuid.uuid4().hex}@example.com"
+    async with session.post("/api/v1/auth/register", json={"email": email, "password": PASSWORD}) as response:
+        await response.read()
+        return email, response.status
+
+
+async def login(session: aiohttp.ClientSession, email: str, password: str = PASSWORD) -> tuple[str | None, int]:
+    async with session.post("/api/v1/auth/login", data={"username": email, "password": password}) as response:
+        body = await response.read()
+        token = orjson.loads(body)["access_token"] if response.status == 200 else None
+        return token, response.status
+
+
+def scenario_request(name: str, args, emails: list[str], tokens: list[str]):
+    """
+    Returns a coroutine function issuing one request of the scenario and
+    returning its status code.
+    """
+    counter = 0
+
+    def auth() -> dict:
+        nonlocal counter
+        counter += 1
+        return {"Authorization": f"Bearer {tokens[counter % len(tokens)]}"}
+
+    async def do_register(session):
+        return (await register(session))[1]
+
+    async def do_login(session):
+        nonlocal counter
+        counter += 1
+        return (await login(session, emails[counter % len(emails)]))[1]
+
+    async def do_chat(session):
+        payload = {"prompt": f"Outlook for asset {uuid.uuid4().hex[:8]}?", "use_cache": args.chat_cache}
+        async with session.post("/api/v1/ai/chat", json=payload, headers=auth()) as response:
+            await response.read()
+            return response.status
+
+    async def do_chat_stream(session):
+        payload = {"prompt": f"Outlook for asset {uuid.uuid4().hex[:8]}?"}
+        async with session.post("/api/v1/ai/chat/stream", json=payload, headers=auth()) as response:
+            async for _ in response.content.iter_any():
+                pass
+            return response.status
+
+    async def do_transactions_list(session):
+        async with session.get("/api/v1/transactions", params={"limit": 100}, headers=auth()) as response:
+            await response.read()
+            return response.status
+
+    async def do_transactions_create(session):
+        payload = {
+            "portfolio_id": args.portfolio_id,
+            "instrument_ticker": "LOADTEST",
+            "transaction_type": "BUY",
+            "quantity": "1",
+            "price": "100",
+            "transaction_date": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        }
+        async with session.post("/api/v1/transactions", json=payload, headers=auth()) as response:
+            await response.read()
+            return response.status
+
+    return {
+        "register": do_register,
+        "login": do_login,
+        "chat": do_chat,
+        "chat_stream": do_chat_stream,
+        "transactions_list": do_transactions_list,
+        "transactions_create": do_transactions_create,
+    }[name]
+
+
+async def run_scenario(session: aiohttp.ClientSession, request, concurrency: int, duration: float) -> dict:
+    recorder = Recorder()
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                status = await request(session)
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                status = 599
+            recorder.record(time.perf_counter() - start, status)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return recorder.summary(time.perf_counter() - start)
+
+
+async def run(args) -> dict:
+    connector = aiohttp.TCPConnector(limit=args.concurrency)
+    timeout = aiohttp.ClientTimeout(total=args.request_timeout)
+    async with aiohttp.ClientSession(args.base_url, connector=connector, timeout=timeout) as session:
+        # Users for the authenticated scenarios are created up front and
+        # are not part of any measurement.
+        if args.email:
+            emails = [args.email]
+            token, _ = await login(session, args.email, args.password)
+            tokens = [token]
+        else:
+            emails = [email for email, _ in await asyncio.gather(*(register(session) for _ in range(args.users)))]
+            tokens = [token for token, _ in await asyncio.gather(*(login(session, email) for email in emails))]
+        tokens = [token for token in tokens if token]
+        if not tokens:
+            sys.exit("Could not log in any load-test user; is the API reachable?")
+
+        results = {}
+        for name in args.scenarios:
+            if name == "transactions_create" and not args.portfolio_id:
+                print("skipping transactions_create: needs --portfolio-id", file=sys.stderr)
+                continue
+            request = scenario_request(name, args, emails, tokens)
+            results[name] = await run_scenario(session, request, args.concurrency, args.duration)
+            summary = results[name]
+            print(
+                f"{name:>20} {summary['requests']:>8,} req {summary['rps']:>9.1f} rps "
+                f"p50 {summary['p50_ms']:>8.1f} p95 {summary['p95_ms']:>8.1f} p99 {summary['p99_ms']:>8.1f} ms "
+                f"errors {summary['error_rate']:.2%}"
+            )
+    return results
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list[str]:
+    """
+    Scenarios whose p95 grew or whose throughput fell by more than
+    `tolerance` (a fraction) relative to the baseline.
+    """
+    regressions = []
+    for name, current in report["scenarios"].items():
+        previous = baseline["scenarios"].get(name)
+        if previous is None:
+            continue
+        if previous["p95_ms"] and current["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {previous['p95_ms']:.1f} -> {current['p95_ms']:.1f} ms")
+        if previous["rps"] and current["rps"] < previous["rps"] * (1 - tolerance):
+            regressions.append(f"{name}: rps {previous['rps']:.1f} -> {current['rps']:.1f}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--scenarios", nargs="+", default=["login", "chat", "chat_stream", "transactions_list"],
+                        choices=["register", "login", "chat", "chat_stream", "transactions_list", "transactions_create"])
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=15.0, help="Seconds per scenario")
+    parser.add_argument("--users", type=int, default=8, help="Users registered for authenticated scenarios")
+    parser.add_argument("--email", help="Use this existing user instead of registering new ones")
+    parser.add_argument("--password", default=PASSWORD)
+    parser.add_argument("--portfolio-id", help="A portfolio owned by --email, for transactions_create")
+    parser.add_argument("--chat-cache", action="store_true", help="Allow Librarian answer caching in chat")
+    parser.add_argument("--request-timeout", type=float, default=60.0)
+    parser.add_argument("--output", type=Path)
+    parser.add_argument("--baseline", type=Path, help="Earlier report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed relative regression")
+    args = parser.parse_args()
+
+    started_at = datetime.datetime.now(datetime.timezone.utc)
+    scenarios = asyncio.run(run(args))
+    report = {
+        "started_at": started_at.isoformat(),
+        "git_revision": git_revision(),
+        "base_url": args.base_url,
+        "concurrency": args.concurrency,
+        "duration_seconds": args.duration,
+        "scenarios": scenarios,
+    }
+    output = args.output or RESULTS_DIR / f"{started_at:%Y%m%dT%H%M%SZ}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_bytes(orjson.dumps(report, option=orjson.OPT_INDENT_2))
+    print(f"report written to {output}")
+
+    if args.baseline:
+        regressions = compare(report, orjson.loads(args.baseline.read_bytes()), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+# trading_app/tests/mocks/librarian/server.py
+"""
+Local stand-in for the Librarian service, for load tests and benchmarks.
+
+Serves the endpoints the app calls, with configurable latency, error
+rate and streaming behaviour:
+
+    POST /api/v1/chat          -> {"answer": ..., "sources": [...]}
+    POST /api/v1/chat/stream   -> SSE `data: {"token": ...}` chunks, then [DONE]
+    POST /api/v1/chat/batch    -> {"results": [{"answer": ..., "sources": [...]}, ...]}
+
+Run from `trading_app/`, then point the app at it:
+
+    python -m tests.mocks.librarian.server --port 8100 --latency-ms 300 --jitter 0.5 --error-rate 0.01
+    LIBRARIAN_API_URL=http://localhost:8100/api/v1/chat \\
+    LIBRARIAN_STREAM_API_URL=http://localhost:8100/api/v1/chat/stream uvicorn app.main:app
+"""
+import argparse
+import asyncio
+import random
+from dataclasses import dataclass
+
+import orjson
+from aiohttp import web
+
+
+@dataclass
+class FakeLibrarianConfig:
+    latency_ms: float = 300.0  # Median time to the (first) response byte
+    jitter: float = 0.5  # Sigma of the log-normal latency distribution; 0 = constant
+    error_rate: float = 0.0  # Fraction of requests answered with `error_status`
+    error_status: int = 503
+    stream_chunks: int = 20
+    chunk_interval_ms: float = 25.0
+
+    def latency(self) -> float:
+        median = self.latency_ms / 1000
+        return median * random.lognormvariate(0, self.jitter) if self.jitter else median
+
+
+def create_app(config: FakeLibrarianConfig) -> web.Application:
+    async def fail_or_wait(request: web.Request) -> web.Response | None:
+        request.app["requests"] += 1
+        await asyncio.sleep(config.latency())
+        if random.random() < config.error_rate:
+            request.app["errors"] += 1
+            return web.json_response({"detail": "injected failure"}, status=config.error_status)
+        return None
+
+    async def chat(request: web.Request) -> web.Response:
+        payload = await request.json()
+        error = await fail_or_wait(request)
+        if error is not None:
+            return error
+        return web.json_response({
+            "answer": f"Stub answer to: {payload.get('prompt', '')[:100]}",
+            "sources": [{"title": "stub", "score": 1.0}],
+        })
+
+    async def chat_batch(request: web.Request) -> web.Response:
+        payload = await request.json()
+        error = await fail_or_wait(request)
+        if error is not None:
+            return error
+        return web.json_response({
+            "results": [
+                {"answer": f"Stub answer to: {query.get('prompt', '')[:100]}", "sources": [{"title": "stub", "score": 1.0}]}
+                for query in payload.get("queries", [])
+            ],
+        })
+
+    async def chat_stream(request: web.Request) -> web.StreamResponse:
+        await request.json()
+        error = await fail_or_wait(request)
+        if error is not None:
+            return error
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        for i in range(config.stream_chunks):
+            await response.write(b"data: " + orjson.dumps({"token": f"tok{i} "}) + b"\n\n")
+            await asyncio.sleep(config.chunk_interval_ms / 1000)
+        await response.write(b"data: " + orjson.dumps({"sources": [{"title": "stub"}]}) + b"\n\n")
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    async def stats(request: web.Request) -> web.Response:
+        return web.json_response({"requests": request.app["requests"], "errors": request.app["errors"]})
+
+    app = web.Application()
+    app["requests"] = 0
+    app["errors"] = 0
+    app.router.add_post("/api/v1/chat", chat)
+    app.router.add_post("/api/v1/chat/stream", chat_stream)
+    app.router.add_post("/api/v1/chat/batch", chat_batch)
+    app.router.add_get("/stats", stats)
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--jitter", type=float, default=0.5)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--stream-chunks", type=int, default=20)
+    parser.add_argument("--chunk-interval-ms", type=float, default=25.0)
+    args = parser.parse_args()
+    config = FakeLibrarianConfig(
+        latency_ms=args.latency_ms,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        stream_chunks=args.stream_chunks,
+        chunk_interval_ms=args.chunk_interval_ms,
+    )
+    web.run_app(create_app(config), host=args.host, port=args.port)
@@ -0,0 +1,110 @@
+# trading_app/tests/test_admission.py
+import asyncio
+import uuid
+
+import pytest
+from fastapi import HTTPException
+from starlette import status
+from starlette.requests import ClientDisconnect
+
+from app.core.admission import AdmissionController, AdmittedStreamingResponse, ConcurrencyPool
+
+
+@pytest.mark.asyncio
+async def test_pool_hands_slots_to_waiters_in_order():
+    pool = ConcurrencyPool("test", limit=1, max_queue=2, per_user=5, max_wait=1)
+    user = uuid.uuid4()
+    await pool.acquire(user)
+    order = []
+
+    async def wait_then_record(n):
+        await pool.acquire(user)
+        order.append(n)
+
+    waiters = [asyncio.create_task(wait_then_record(n)) for n in range(2)]
+    await asyncio.sleep(0)
+    assert pool.waiting == 2
+
+    # The queue is full, so a third waiter is turned away immediately.
+    with pytest.raises(HTTPException) as exc_info:
+        await pool.acquire(user)
+    assert exc_info.value.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert exc_info.value.headers["Retry-After"] == "1"
+
+    pool.release(user, 0.01)
+    pool.release(user, 0.01)
+    await asyncio.gather(*waiters)
+    assert order == [0, 1]
+    assert pool.active == 1
+
+
+@pytest.mark.asyncio
+async def test_pool_limits_each_user_and_rejects_hopeless_waits():
+    pool = ConcurrencyPool("test", limit=1, max_queue=10, per_user=1, max_wait=0.5)
+    first, second = uuid.uuid4(), uuid.uuid4()
+    await pool.acquire(first)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await pool.acquire(first)
+    assert exc_info.value.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+
+    # Requests have been taking ~3 s, so queueing for 0.5 s cannot succeed.
+    pool._mean_service = 3.0
+    with pytest.raises(HTTPException) as exc_info:
+        await pool.acquire(second)
+    assert exc_info.value.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert exc_info.value.headers["Retry-After"] == "3"
+    assert pool.waiting == 0
+
+
+def test_try_acquire_never_queues_or_exceeds_the_user_limit():
+    pool = ConcurrencyPool("test", limit=3, max_queue=10, per_user=2, max_wait=1)
+    first, second = uuid.uuid4(), uuid.uuid4()
+
+    assert pool.try_acquire(first)
+    assert pool.try_acquire(first)
+    assert not pool.try_acquire(first)
+    assert pool.try_acquire(second)
+    assert not pool.try_acquire(second)  # The pool is full
+    assert pool.active == 3 and pool.waiting == 0
+
+    pool.release(first, 0.01)
+    assert pool.try_acquire(first)
+
+
+@pytest.mark.asyncio
+async def test_controller_releases_the_slot():
+    pool = ConcurrencyPool("chat", limit=1, max_queue=0, per_user=1, max_wait=1)
+    controller = AdmissionController({"chat": pool}, buckets={})
+    user = uuid.uuid4()
+
+    slot = await controller.admit("chat", user)
+    slot.release()
+    slot.release()
+
+    assert pool.active == 0
+    assert (await controller.admit("chat", user)).pool is pool
+
+
+@pytest.mark.asyncio
+async def test_streaming_response_releases_the_slot_when_the_body_never_starts():
+    pool = ConcurrencyPool("chat", limit=1, max_queue=0, per_user=1, max_wait=1)
+    controller = AdmissionController({"chat": pool}, buckets={})
+    started = False
+
+    async def body():
+        nonlocal started
+        started = True
+        yield b"never sent"
+
+    async def gone(message):
+        raise OSError("client disconnected")
+
+    slot = await controller.admit("chat", uuid.uuid4())
+    response = AdmittedStreamingResponse(body(), slot=slot)
+    assert slot.kept
+    with pytest.raises(ClientDisconnect):
+        await response({"type": "http", "asgi": {"spec_version": "2.4"}}, None, gone)
+
+    assert not started
+    assert pool.active == 0
@@ -1,11 +1,20 @@
 
 # trading_app/tests/test_ai_api.py
+import asyncio
+import datetime
+import uuid
+from types import SimpleNamespace
+
+import orjson
 import pytest
+from fastapi import HTTPException
 from httpx import AsyncClient
 from starlette import status
 from unittest.mock import patch, AsyncMock
 
 from app.api.deps import get_current_user
+from app.core.admission import admission_controller
+from app.main import app
 from tests.utils import get_test_user, get_user_token_headers
 
 @pytest.mark.asyncio
@@ -52,4 +61,159 @@ async def test_chat_with_ai_unauthenticated(client: AsyncClient):
         json={"prompt": "This should fail."},
     )
     # Assert
-    assert response.status_code == status.HTTP_401_UNAUTHORIZED
\ No newline at end of file
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+@pytest.mark.asyncio
+@patch("app.crud.crud_conversation.conversation_writer.create_conversation", new_callable=AsyncMock)
+@patch("app.crud.crud_conversation.conversation_writer.enqueue", new_callable=AsyncMock)
+async def test_chat_stream_forwards_tokens(
+    mock_enqueue: AsyncMock,
+    mock_create_conversation: AsyncMock,
+    client: AsyncClient,
+):
+    # Arrange
+    async def fake_stream(self, user_id, prompt, conversation_history=None):
+        yield {"token": "The market "}
+        yield {"token": "is volatile."}
+        yield {"sources": [{"id": "doc-1"}]}
+
+    app.dependency_overrides[get_current_user] = get_test_user
+
+    # Act
+    try:
+        with patch("app.clients.librarian.LibrarianClient.stream_query", fake_stream):
+            response = await client.post(
+                "/api/v1/ai/chat/stream",
+                json={"prompt": "What is the market outlook?"},
+            )
+    finally:
+        app.dependency_overrides.clear()
+
+    # Assert
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [block for block in response.text.split("\n\n") if block]
+    assert events[0] == 'event: token\ndata: {"token":"The market "}'
+    assert events[-1].startswith("event: done")
+    [conversation] = mock_create_conversation.call_args[0]
+    [turns] = mock_enqueue.call_args[0]
+    assert str(conversation["id"]) in events[-1]
+    assert [turn["role"] for turn in turns] == ["user", "assistant"]
+    assert turns[1]["content"] == "The market is volatile."
+
+@pytest.mark.asyncio
+@patch("app.crud.crud_conversation.conversation_writer.create_conversation", new_callable=AsyncMock)
+@patch("app.crud.crud_conversation.conversation_writer.enqueue", new_callable=AsyncMock)
+async def test_chat_batch_streams_results_and_saves_one_conversation(
+    mock_enqueue: AsyncMock,
+    mock_create_conversation: AsyncMock,
+    client: AsyncClient,
+):
+    # Arrange
+    async def fake_query(self, user_id, prompt, conversation_history=None, use_cache=True):
+        if prompt == "Bad?":
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="down")
+        return {"answer": f"About {prompt}", "sources": []}
+
+    app.dependency_overrides[get_current_user] = get_test_user
+
+    # Act
+    try:
+        with patch("app.clients.librarian.LibrarianClient.query", fake_query):
+            response = await client.post(
+                "/api/v1/ai/chat/batch",
+                json={"prompts": ["BTC?", "Bad?", "ETH?"]},
+            )
+    finally:
+        app.dependency_overrides.clear()
+
+    # Assert
+    assert response.status_code == status.HTTP_200_OK
+    lines = [orjson.loads(line) for line in response.text.splitlines()]
+    by_index = {line["index"]: line for line in lines[:-1]}
+    assert by_index[0]["answer"] == "About BTC?"
+    assert by_index[1]["error"] == "down"
+    assert lines[-1]["done"] and lines[-1]["answered"] == 2 and lines[-1]["failed"] == 1
+
+    mock_enqueue.assert_called_once()
+    [conversation] = mock_create_conversation.call_args[0]
+    [turns] = mock_enqueue.call_args[0]
+    assert str(conversation["id"]) == lines[-1]["conversation_id"]
+    assert [turn["content"] for turn in turns] == ["BTC?", "About BTC?", "ETH?", "About ETH?"]
+
+
+@pytest.mark.asyncio
+@patch("app.crud.crud_conversation.conversation_writer.create_conversation", new_callable=AsyncMock)
+@patch("app.crud.crud_conversation.conversation_writer.enqueue", new_callable=AsyncMock)
+async def test_chat_batch_fan_out_stays_within_the_chat_allowance(
+    mock_enqueue: AsyncMock,
+    mock_create_conversation: AsyncMock,
+    client: AsyncClient,
+):
+    # Arrange
+    in_flight = peak = 0
+
+    async def fake_query(self, user_id, prompt, conversation_history=None, use_cache=True):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return {"answer": f"About {prompt}", "sources": []}
+
+    app.dependency_overrides[get_current_user] = get_test_user
+    pool = admission_controller.pools["chat"]
+
+    # Act
+    try:
+        with patch("app.clients.librarian.LibrarianClient.query", fake_query), \
+                patch("app.clients.librarian.librarian_client.batch_api_url", None):
+            response = await client.post(
+                "/api/v1/ai/chat/batch",
+                json={"prompts": [f"T{i}?" for i in range(6)]},
+            )
+    finally:
+        app.dependency_overrides.clear()
+
+    # Assert
+    assert response.status_code == status.HTTP_200_OK
+    assert orjson.loads(response.text.splitlines()[-1])["answered"] == 6
+    assert peak == pool.per_user
+    assert pool.active == 0
+
+
+@pytest.mark.asyncio
+async def test_search_conversations_pages_with_a_keyset_cursor(client: AsyncClient):
+    # Arrange
+    conversation_id = uuid.uuid4()
+    rows = [
+        SimpleNamespace(
+            conversation_id=conversation_id, seq=seq, role="assistant", rank=rank,
+            created_at=datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc),
+            snippet="the <mark>bitcoin</mark> halving",
+        )
+        for seq, rank in ((4, 0.5), (2, 0.25))
+    ]
+    search = AsyncMock(side_effect=[rows, []])
+    app.dependency_overrides[get_current_user] = get_test_user
+
+    # Act
+    try:
+        with patch("app.crud.crud_conversation.search_turns", search):
+            first = await client.get("/api/v1/ai/conversations/search", params={"q": "bitcoin", "limit": 2})
+            cursor = first.json()["next_cursor"]
+            second = await client.get(
+                "/api/v1/ai/conversations/search", params={"q": "bitcoin", "limit": 2, "cursor": cursor}
+            )
+            invalid = await client.get("/api/v1/ai/conversations/search", params={"q": "bitcoin", "cursor": "x"})
+    finally:
+        app.dependency_overrides.clear()
+
+    # Assert
+    assert first.status_code == status.HTTP_200_OK
+    assert [hit["seq"] for hit in first.json()["hits"]] == [4, 2]
+    assert first.json()["hits"][0]["snippet"] == "the <mark>bitcoin</mark> halving"
+    assert search.call_args_list[0].kwargs["after"] is None
+    assert search.call_args_list[1].kwargs["after"] == (0.25, conversation_id, 2)
+    assert second.json() == {"hits": [], "next_cursor": None}
+    assert invalid.status_code == status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,64 @@
+# trading_app/tests/test_cache.py
+import asyncio
+
+import pytest
+
+from app.core.cache import LRUCache, SingleFlight, TieredCache
+from tests.utils import FakeRedis
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")  # "b" is now the least recently used entry
+    cache.set("c", 3)
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+
+def test_lru_cache_expires_entries():
+    cache = LRUCache(maxsize=2, ttl=60)
+    cache.set("a", 1, ttl=-1)
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_tiered_cache_falls_back_to_redis_and_counts():
+    redis = FakeRedis()
+    cache = TieredCache("test", maxsize=10, ttl=60, redis=redis)
+
+    assert await cache.get("k") is None
+    await cache.set("k", {"id": "1"})
+    cache.local.clear()  # simulate another worker process
+
+    assert await cache.get("k") == {"id": "1"}
+    assert await cache.get("k") == {"id": "1"}
+
+    stats = cache.stats()
+    assert stats["misses"] == 1
+    assert stats["redis_hits"] == 1
+    assert stats["local_hits"] == 1
+
+    await cache.delete("k")
+    assert await cache.get("k") is None
+
+
+@pytest.mark.asyncio
+async def test_single_flight_coalesces_concurrent_calls():
+    flight = SingleFlight()
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "value"
+
+    results = await asyncio.gather(*(flight.do("k", fetch) for _ in range(5)))
+
+    assert results == ["value"] * 5
+    assert calls == 1
+    assert flight.coalesced == 4
@@ -0,0 +1,140 @@
+# trading_app/tests/test_conditional.py
+import uuid
+
+import pytest
+from fastapi import HTTPException
+from pydantic import BaseModel
+from redis.exceptions import RedisError
+from starlette import status
+from starlette.requests import Request
+
+from app.core.conditional import ConditionalResponseCache, ResourceVersions
+from tests.utils import FakeRedis
+
+
+USER = uuid.uuid4()
+
+
+class Page(BaseModel):
+    value: int
+
+
+def make_request(if_none_match: str | None = None) -> Request:
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/api/v1/portfolios/p/holdings",
+        "query_string": b"include_closed=false",
+        "headers": headers,
+    })
+
+
+@pytest.mark.asyncio
+async def test_conditional_get_serves_304_and_cached_bodies_until_a_bump():
+    redis = FakeRedis()
+    versions = ResourceVersions(redis, settle_seconds=0)
+    cache = ConditionalResponseCache(versions, secret="s", maxsize=10, ttl=60, redis=redis)
+    user_id = uuid.uuid4()
+    builds = 0
+
+    async def build() -> Page:
+        nonlocal builds
+        builds += 1
+        return Page(value=builds)
+
+    async def get(if_none_match=None):
+        return await cache.respond(
+            make_request(if_none_match), user_id=user_id, scopes=["portfolio:p"], build=build
+        )
+
+    first = await get()
+    etag = first.headers["etag"]
+    assert first.body == b'{"value":1}'
+
+    not_modified = await get(etag)
+    assert not_modified.status_code == status.HTTP_304_NOT_MODIFIED
+    assert (await get()).body == b'{"value":1}'
+    assert builds == 1
+
+    await versions.bump("portfolio:p")
+    changed = await get(etag)
+    assert changed.status_code == status.HTTP_200_OK
+    assert changed.headers["etag"] != etag
+    assert changed.body == b'{"value":2}'
+
+
+@pytest.mark.asyncio
+async def test_recent_writes_bypass_the_cache_while_settling():
+    redis = FakeRedis()
+    versions = ResourceVersions(redis, settle_seconds=1)
+    cache = ConditionalResponseCache(versions, secret="s", maxsize=10, ttl=60, redis=redis)
+
+    async def build() -> Page:
+        return Page(value=1)
+
+    await versions.bump("user:u")
+    response = await cache.respond(make_request(), user_id=uuid.uuid4(), scopes=["user:u"], build=build)
+
+    assert "etag" not in response.headers
+    assert cache.stats()["bypassed"] == 1
+
+
+class FailingWrites(FakeRedis):
+    """Reads work; pipelined writes fail while `failing` is set."""
+
+    failing = True
+
+    def pipeline(self, transaction=True):
+        if self.failing:
+            raise RedisError("READONLY You can't write against a read only replica.")
+        return super().pipeline(transaction)
+
+
+@pytest.mark.asyncio
+async def test_failed_bump_disables_caching_until_it_succeeds():
+    redis = FailingWrites()
+    versions = ResourceVersions(redis, settle_seconds=0)
+    cache = ConditionalResponseCache(versions, secret="s", maxsize=10, ttl=60, redis=redis)
+    value = 1
+
+    async def build() -> Page:
+        return Page(value=value)
+
+    async def get(if_none_match=None):
+        return await cache.respond(
+            make_request(if_none_match), user_id=USER, scopes=["portfolio:p"], build=build
+        )
+
+    etag = (await get()).headers["etag"]
+    value = 2
+    await versions.bump("portfolio:p")  # Fails: the version in Redis is unchanged
+
+    stale = await get(etag)
+    assert stale.status_code == status.HTTP_200_OK
+    assert stale.body == b'{"value":2}'
+
+    redis.failing = False
+    retried = await get(etag)  # The bump is retried first, so the old ETag no longer matches
+    assert retried.status_code == status.HTTP_200_OK
+    assert retried.headers["etag"] != etag
+    assert await versions.get(["portfolio:p"]) == [1]
+
+
+@pytest.mark.asyncio
+async def test_wildcard_if_none_match_requires_the_ownership_check():
+    redis = FakeRedis()
+    cache = ConditionalResponseCache(ResourceVersions(redis, settle_seconds=0), secret="s", maxsize=10, ttl=60, redis=redis)
+
+    async def not_yours() -> Page:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Portfolio not found")
+
+    async def yours() -> Page:
+        return Page(value=1)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await cache.respond(make_request("*"), user_id=USER, scopes=["portfolio:p"], build=not_yours)
+    assert exc_info.value.status_code == status.HTTP_404_NOT_FOUND
+
+    response = await cache.respond(make_request("*"), user_id=USER, scopes=["portfolio:p"], build=yours)
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
@@ -0,0 +1,154 @@
+# trading_app/tests/test_conversation_writer.py
+import uuid
+
+import pytest
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from app.crud.conversation_writer import ConversationWriter
+
+
+class RecordingSession:
+    """Captures the rows passed to `execute` per table instead of hitting the DB."""
+
+    flushes: list[dict[str, list[dict]]] = []
+
+    async def __aenter__(self):
+        self.flushes.append({})
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, statement, params):
+        self.flushes[-1][statement.table.name] = list(params)
+
+    async def commit(self):
+        pass
+
+
+class FlakySession(RecordingSession):
+    """Loses the connection `outages` times, then rejects any 'bad' turn."""
+
+    outages = 0
+
+    async def execute(self, statement, params):
+        if FlakySession.outages:
+            FlakySession.outages -= 1
+            raise OperationalError("INSERT", {}, ConnectionResetError("connection reset"))
+        if any(row["content"] == "bad" for row in params):
+            raise IntegrityError("INSERT", {}, ValueError("violates check constraint"))
+        await super().execute(statement, params)
+
+
+class CountingWriter(ConversationWriter):
+    """Allocates seq from an in-memory counter standing in for `last_seq`."""
+
+    def __init__(self, *args, last_seq: dict[uuid.UUID, int], **kwargs):
+        super().__init__(*args, **kwargs)
+        self.last_seq = last_seq
+
+    async def _allocate_seq(self, db, counts):
+        first = {}
+        for conversation_id, count in counts.items():
+            if conversation_id in self.last_seq:
+                first[conversation_id] = self.last_seq[conversation_id] + 1
+                self.last_seq[conversation_id] += count
+        return first
+
+
+def _turns(conversation_id: uuid.UUID, count: int = 2) -> list[dict]:
+    return [{"conversation_id": conversation_id, "content": str(i)} for i in range(count)]
+
+
+@pytest.mark.asyncio
+async def test_writer_batches_and_drains_on_stop():
+    RecordingSession.flushes = []
+    conversation_ids = [uuid.uuid4() for _ in range(3)]
+    writer = CountingWriter(
+        RecordingSession, batch_size=2, flush_interval=60, max_queue=100,
+        last_seq={conversation_id: 0 for conversation_id in conversation_ids},
+    )
+
+    for conversation_id in conversation_ids:
+        await writer.enqueue(_turns(conversation_id))
+    await writer.stop()
+
+    assert [len(flush["ai_conversation_turns"]) for flush in RecordingSession.flushes] == [4, 2]
+    stats = writer.stats()
+    assert stats["flushed_rows"] == 6
+    assert stats["queue_depth"] == 0
+
+
+@pytest.mark.asyncio
+async def test_seq_follows_the_shared_counter_across_writers():
+    RecordingSession.flushes = []
+    conversation_id = uuid.uuid4()
+    # Two worker processes appending to one conversation share its counter.
+    last_seq = {conversation_id: 4}
+    writers = [
+        CountingWriter(RecordingSession, batch_size=10, flush_interval=60, max_queue=100, last_seq=last_seq)
+        for _ in range(2)
+    ]
+
+    await writers[0].enqueue(_turns(conversation_id))
+    await writers[1].enqueue(_turns(conversation_id))
+    await writers[0].enqueue(_turns(conversation_id, count=1))
+    for writer in writers:
+        await writer.stop()
+
+    seqs = [row["seq"] for flush in RecordingSession.flushes for row in flush["ai_conversation_turns"]]
+    assert sorted(seqs) == [5, 6, 7, 8, 9]
+    assert [row["content"] for row in RecordingSession.flushes[0]["ai_conversation_turns"]] == ["0", "1", "0"]
+
+
+@pytest.mark.asyncio
+async def test_turns_of_deleted_conversations_are_counted_as_failed():
+    RecordingSession.flushes = []
+    kept, deleted = uuid.uuid4(), uuid.uuid4()
+    writer = CountingWriter(RecordingSession, batch_size=10, flush_interval=60, max_queue=100, last_seq={kept: 0})
+
+    await writer.enqueue(_turns(kept))
+    await writer.enqueue(_turns(deleted))
+    await writer.stop()
+
+    assert [row["seq"] for row in RecordingSession.flushes[0]["ai_conversation_turns"]] == [1, 2]
+    assert writer.stats()["flushed_rows"] == 2
+    assert writer.stats()["failed_rows"] == 2
+
+
+@pytest.mark.asyncio
+async def test_transient_errors_are_retried():
+    RecordingSession.flushes = []
+    FlakySession.outages = 2
+    conversation_id = uuid.uuid4()
+    writer = CountingWriter(
+        FlakySession, batch_size=10, flush_interval=60, max_queue=100,
+        max_retries=3, retry_backoff=0, last_seq={conversation_id: 0},
+    )
+
+    await writer.enqueue(_turns(conversation_id))
+    await writer.stop()
+
+    assert [row["content"] for row in RecordingSession.flushes[-1]["ai_conversation_turns"]] == ["0", "1"]
+    assert writer.stats()["retries"] == 2
+    assert writer.stats()["flushed_rows"] == 2
+
+
+@pytest.mark.asyncio
+async def test_a_bad_row_only_drops_itself():
+    RecordingSession.flushes = []
+    FlakySession.outages = 0
+    conversation_id = uuid.uuid4()
+    writer = CountingWriter(
+        FlakySession, batch_size=10, flush_interval=60, max_queue=100, last_seq={conversation_id: 0}
+    )
+
+    turns = _turns(conversation_id, count=5)
+    turns[3]["content"] = "bad"
+    await writer.enqueue(turns)
+    await writer.stop()
+
+    written = [row for flush in RecordingSession.flushes for row in flush.get("ai_conversation_turns", [])]
+    assert [row["content"] for row in written] == ["0", "1", "2", "4"]
+    assert writer.stats()["flushed_rows"] == 4
+    assert writer.stats()["failed_rows"] == 1
@@ -0,0 +1,28 @@
+# trading_app/tests/test_db_session.py
+import pytest
+from sqlalchemy import insert, select
+
+from app.db.session import AsyncSessionLocal, read_engine, use_primary, write_engine
+from app.models.portfolio import Portfolio
+
+
+@pytest.mark.asyncio
+async def test_routing_session_pins_to_primary_after_a_write():
+    async with AsyncSessionLocal() as db:
+        session = db.sync_session
+        assert session.get_bind(clause=select(Portfolio)) is read_engine.sync_engine
+        assert session.get_bind(clause=select(Portfolio).with_for_update()) is write_engine.sync_engine
+        # Locking reads and writes pin the session; later reads follow.
+        assert session.get_bind(clause=select(Portfolio)) is write_engine.sync_engine
+
+    async with AsyncSessionLocal() as db:
+        assert db.sync_session.get_bind(clause=insert(Portfolio)) is write_engine.sync_engine
+        assert db.sync_session.get_bind(clause=select(Portfolio)) is write_engine.sync_engine
+
+
+@pytest.mark.asyncio
+async def test_use_primary_routes_unclassified_work_to_the_writer():
+    async with AsyncSessionLocal() as db:
+        assert db.sync_session.get_bind() is read_engine.sync_engine
+        use_primary(db)
+        assert db.sync_session.get_bind() is write_engine.sync_engine
@@ -0,0 +1,103 @@
+# trading_app/tests/test_equity.py
+import datetime
+import uuid
+
+import numpy as np
+
+from app.services.equity import EquityCurveCache, build_equity_curve
+from app.services.market_data import Candles
+from app.services.positions import TransactionArrays
+
+DAY_MS = 86_400_000
+EPOCH = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def _daily(closes: list[float]) -> Candles:
+    close = np.array(closes, dtype=np.float64)
+    return Candles(
+        tick=np.arange(len(close), dtype=np.int64) * DAY_MS + int(EPOCH.timestamp() * 1000),
+        open=close, high=close, low=close, close=close, volume=np.ones(len(close)),
+    )
+
+
+def _day(n: float) -> datetime.datetime:
+    return EPOCH + datetime.timedelta(days=n)
+
+
+def test_equity_curve_values_positions_at_each_close():
+    rows = [
+        ("AAA", "BUY", 10.0, 100.0, _day(1.5)),
+        ("BBB", "BUY", 2.0, 50.0, _day(2.5)),
+        ("AAA", "SELL", 4.0, 104.0, _day(3.5)),
+    ]
+    prices = {"AAA": _daily([99, 101, 102, 103, 105]), "BBB": _daily([50, 51, 52, 53, 54])}
+    curve = build_equity_curve(TransactionArrays.from_rows(rows), prices)
+
+    assert curve.tick[0] == prices["AAA"].tick[1]  # starts at the first transaction's candle
+    np.testing.assert_allclose(curve.value, [10 * 101, 10 * 102 + 2 * 52, 6 * 103 + 2 * 53, 6 * 105 + 2 * 54])
+    np.testing.assert_allclose(curve.net_invested, [1000, 1100, 1100 - 4 * 104, 1100 - 4 * 104])
+
+
+def test_tail_recompute_matches_full_build():
+    rows = [("AAA", "BUY", 1.0, 10.0, _day(i + 0.5)) for i in range(0, 20, 3)]
+    prices = {"AAA": _daily(list(range(10, 30)))}
+    txns = TransactionArrays.from_rows(rows)
+    full = build_equity_curve(txns, prices)
+
+    cut = int(full.tick[8])
+    rebuilt = full.before(cut).extend(build_equity_curve(txns, prices, start=cut))
+
+    np.testing.assert_array_equal(rebuilt.tick, full.tick)
+    np.testing.assert_allclose(rebuilt.value, full.value)
+    np.testing.assert_allclose(rebuilt.net_invested, full.net_invested)
+
+
+def test_cache_plans_recompute_from_dirty_candle():
+    cache = EquityCurveCache(maxsize=10, ttl=60)
+    portfolio_id = uuid.uuid4()
+    rows = [("AAA", "BUY", 1.0, 10.0, _day(0.5))]
+    curve = build_equity_curve(TransactionArrays.from_rows(rows), {"AAA": _daily([10, 11, 12, 13])})
+
+    assert cache.plan(portfolio_id, "1D")[1] is None
+    _, _, version = cache.plan(portfolio_id, "1D")
+    cache.set(portfolio_id, "1D", curve, version)
+    assert cache.plan(portfolio_id, "1D")[1] == -1
+
+    cache.mark_dirty(portfolio_id, int(curve.tick[2]) + 1_000)
+    prefix, start, version = cache.plan(portfolio_id, "1D")
+    assert start == curve.tick[2]
+    assert len(prefix) == 2
+
+    cache.set(portfolio_id, "1D", curve, version)
+    assert cache.plan(portfolio_id, "1D")[1] == -1
+
+
+def test_change_during_the_first_build_is_not_lost():
+    cache = EquityCurveCache(maxsize=10, ttl=60)
+    portfolio_id = uuid.uuid4()
+    rows = [("AAA", "BUY", 1.0, 10.0, _day(0.5))]
+    stale = build_equity_curve(TransactionArrays.from_rows(rows), {"AAA": _daily([10, 11, 12, 13])})
+
+    _, start, version = cache.plan(portfolio_id, "1D")
+    assert start is None
+    # A transaction commits while the first build is still loading data.
+    cache.mark_dirty(portfolio_id, int(stale.tick[1]))
+    cache.set(portfolio_id, "1D", stale, version)
+
+    assert cache.plan(portfolio_id, "1D")[1] is None  # Built again from scratch
+    _, _, version = cache.plan(portfolio_id, "1D")
+    cache.set(portfolio_id, "1D", stale, version)
+    assert cache.plan(portfolio_id, "1D")[1] == -1
+
+
+def test_positions_are_valued_per_instrument():
+    rows = [
+        ("AAA", "BUY", 3.0, 10.0, _day(0.5)),
+        ("BBB", "BUY", 1.0, 5.0, _day(1.5)),
+        ("CCC", "BUY", 2.0, 7.0, _day(1.5)),  # No candles: valued at its last price
+        ("AAA", "SELL", 1.0, 12.0, _day(2.5)),
+    ]
+    prices = {"AAA": _daily([10, 11, 12, 13]), "BBB": _daily([5, 6, 7, 8])}
+    curve = build_equity_curve(TransactionArrays.from_rows(rows), prices)
+
+    np.testing.assert_allclose(curve.value, [30, 33 + 6 + 14, 24 + 7 + 14, 26 + 8 + 14])
@@ -0,0 +1,63 @@
+# trading_app/tests/test_hashing.py
+import asyncio
+from unittest.mock import patch
+
+import pytest
+from fastapi import HTTPException
+from passlib.hash import bcrypt
+from starlette import status
+
+from app.core import security
+from app.core.config import settings
+from app.core.hashing import PasswordHasher
+from tests.utils import FakeRedis
+
+
+@pytest.fixture
+def restore_pwd_context():
+    original = security.pwd_context.to_dict()
+    yield
+    security.pwd_context.load(original)
+
+
+@pytest.mark.asyncio
+async def test_hash_and_verify_off_loop():
+    hasher = PasswordHasher(max_workers=1, max_queue=1)
+    hashed = await hasher.hash("s3cret")
+    assert await hasher.verify("s3cret", hashed)
+    assert not await hasher.verify("wrong", hashed)
+    hasher.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_rejects_when_queue_is_full():
+    hasher = PasswordHasher(max_workers=1, max_queue=0)
+    first = asyncio.create_task(hasher.hash("s3cret"))
+    await asyncio.sleep(0)  # let the first call take the only slot
+
+    with pytest.raises(HTTPException) as exc_info:
+        await hasher.hash("another")
+    assert exc_info.value.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert exc_info.value.headers["Retry-After"] == "1"
+
+    await first
+    hasher.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_calibration_is_shared_and_never_downgrades(restore_pwd_context, monkeypatch):
+    monkeypatch.setattr(settings, "BCRYPT_MIN_ROUNDS", 5)
+    redis = FakeRedis()
+    first, second = PasswordHasher(max_workers=1, max_queue=1), PasswordHasher(max_workers=1, max_queue=1)
+
+    # The second worker would have measured differently, but adopts the first's cost.
+    with patch("app.core.hashing._calibrate_rounds", side_effect=[6, 9]) as measure:
+        assert await first.calibrate(250, redis) == 6
+        assert await second.calibrate(250, redis) == 6
+    assert measure.call_count == 1
+
+    assert security.pwd_context.needs_update(bcrypt.using(rounds=4).hash("s3cret"))
+    assert not security.pwd_context.needs_update(bcrypt.using(rounds=5).hash("s3cret"))
+    assert not security.pwd_context.needs_update(bcrypt.using(rounds=7).hash("s3cret"))
+    first.shutdown()
+    second.shutdown()
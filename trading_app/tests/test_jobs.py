@@ -0,0 +1,58 @@
+# trading_app/tests/test_jobs.py
+import uuid
+
+import pytest
+
+from app.services.jobs import FAILED, QUEUED, SUCCEEDED, JobError, JobQueue, JobWorker
+from tests.utils import FakeRedis
+
+
+def make_worker(redis: FakeRedis, handlers: dict, max_attempts: int = 3) -> JobWorker:
+    queue = JobQueue(redis, stream="jobs", group="workers", result_ttl=60, max_length=100)
+    return JobWorker(queue, handlers, concurrency=2, consumer="test", claim_idle=60, max_attempts=max_attempts)
+
+
+@pytest.mark.asyncio
+async def test_worker_runs_a_submitted_job_and_stores_the_result():
+    redis = FakeRedis()
+
+    async def echo(user_id, payload):
+        return {"user_id": str(user_id), "prompt": payload["prompt"]}
+
+    worker = make_worker(redis, {"echo": echo})
+    user_id = uuid.uuid4()
+    job_id = await worker.queue.submit("echo", user_id, {"prompt": "hi"})
+    assert (await worker.queue.get(job_id))["status"] == QUEUED
+
+    message_id, fields = redis.store["jobs"][0]
+    await worker._handle(message_id, fields)
+
+    job = await worker.queue.get(job_id)
+    assert job["status"] == SUCCEEDED
+    assert job["result"] == {"user_id": str(user_id), "prompt": "hi"}
+    assert job["attempts"] == 1
+    assert redis.acked == [message_id]
+    assert (f"job-events:{job_id}", SUCCEEDED) in redis.published
+
+
+@pytest.mark.asyncio
+async def test_worker_fails_jobs_with_handler_errors_and_after_max_attempts():
+    redis = FakeRedis()
+
+    async def reject(user_id, payload):
+        raise JobError("Conversation not found")
+
+    worker = make_worker(redis, {"reject": reject}, max_attempts=1)
+    job_id = await worker.queue.submit("reject", uuid.uuid4(), {})
+    message_id, fields = redis.store["jobs"][0]
+
+    await worker._handle(message_id, fields)
+    job = await worker.queue.get(job_id)
+    assert job["status"] == FAILED
+    assert job["error"] == "Conversation not found"
+
+    # A redelivery (e.g. claimed from a crashed worker) beyond the limit is not retried.
+    await worker._handle(message_id, fields)
+    job = await worker.queue.get(job_id)
+    assert job["error"] == "Job abandoned after 1 attempts"
+    assert worker.stats()["failed"] == 2
@@ -0,0 +1,256 @@
+# trading_app/tests/test_librarian_client.py
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from fastapi import HTTPException
+from starlette import status
+
+from app.clients.librarian import LibrarianClient, LibrarianRequestError
+from app.clients.resilience import CircuitBreaker
+from tests.utils import FakeRedis
+
+
+@pytest.fixture
+def librarian() -> LibrarianClient:
+    client = LibrarianClient()
+    client.cache.redis = FakeRedis()
+    return client
+
+
+@pytest.mark.asyncio
+async def test_query_coalesces_and_caches(librarian: LibrarianClient):
+    async def slow_answer(*args, **kwargs):
+        await asyncio.sleep(0.01)
+        return {"answer": "Bullish.", "sources": []}
+
+    with patch.object(LibrarianClient, "_query", new_callable=AsyncMock) as mock_query:
+        mock_query.side_effect = slow_answer
+        answers = await asyncio.gather(
+            *(librarian.query(user_id="1", prompt="What is the outlook?") for _ in range(3))
+        )
+        # Whitespace and case differences share the cache entry.
+        cached = await librarian.query(user_id="1", prompt="  what is the   OUTLOOK? ")
+
+    assert answers == [{"answer": "Bullish.", "sources": []}] * 3
+    assert cached == {"answer": "Bullish.", "sources": []}
+    mock_query.assert_called_once()
+    stats = librarian.cache_stats()
+    assert stats["coalesced"] == 2
+    assert stats["local_hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_answers_without_history_are_shared_across_users(librarian: LibrarianClient):
+    with patch.object(LibrarianClient, "_query", new_callable=AsyncMock) as mock_query:
+        mock_query.return_value = {"answer": "Bullish.", "sources": []}
+        first = await librarian.query(user_id="1", prompt="What is the outlook?")
+        second = await librarian.query(user_id="2", prompt="what is the outlook?")
+
+    assert first == second
+    mock_query.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_users_do_not_share_answers_with_history(librarian: LibrarianClient):
+    history = [{"role": "user", "content": "I hold BTC."}]
+    with patch.object(LibrarianClient, "_query", new_callable=AsyncMock) as mock_query:
+        mock_query.side_effect = lambda user_id, *args: {"answer": f"For {user_id}.", "sources": []}
+        answers = await asyncio.gather(
+            *(
+                librarian.query(user_id=user_id, prompt="What is the outlook?", conversation_history=history)
+                for user_id in ("1", "2")
+            )
+        )
+        cached = await librarian.query(user_id="2", prompt="What is the outlook?", conversation_history=history)
+
+    assert [answer["answer"] for answer in answers] == ["For 1.", "For 2."]
+    assert cached["answer"] == "For 2."
+    assert mock_query.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_query_cache_opt_out(librarian: LibrarianClient):
+    with patch.object(LibrarianClient, "_query", new_callable=AsyncMock) as mock_query:
+        mock_query.return_value = {"answer": "Fresh.", "sources": []}
+        await librarian.query(user_id="1", prompt="Outlook?", use_cache=False)
+        await librarian.query(user_id="1", prompt="Outlook?", use_cache=False)
+
+    assert mock_query.call_count == 2
+    assert librarian.cache_stats()["misses"] == 0
+
+
+@pytest.mark.asyncio
+@patch("app.clients.librarian.backoff_delay", return_value=0)
+async def test_query_retries_transient_failures(_backoff, librarian: LibrarianClient):
+    with patch.object(LibrarianClient, "_post", new_callable=AsyncMock) as mock_post:
+        mock_post.side_effect = [
+            LibrarianRequestError("HTTP 502"),
+            {"answer": "Recovered.", "sources": []},
+        ]
+        response = await librarian.query(user_id="1", prompt="Outlook?", use_cache=False)
+
+    assert response["answer"] == "Recovered."
+    assert mock_post.call_count == 2
+    assert librarian.breaker.state == CircuitBreaker.CLOSED
+
+
+@pytest.mark.asyncio
+async def test_query_does_not_retry_client_errors(librarian: LibrarianClient):
+    with patch.object(LibrarianClient, "_post", new_callable=AsyncMock) as mock_post:
+        mock_post.side_effect = LibrarianRequestError("HTTP 400", retryable=False)
+        with pytest.raises(HTTPException) as exc_info:
+            await librarian.query(user_id="1", prompt="Outlook?", use_cache=False)
+
+    assert exc_info.value.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    mock_post.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_client_errors_do_not_trip_the_breaker(librarian: LibrarianClient):
+    librarian.breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    with patch.object(LibrarianClient, "_post", new_callable=AsyncMock) as mock_post:
+        mock_post.side_effect = LibrarianRequestError("HTTP 400", retryable=False, upstream_fault=False)
+        with pytest.raises(HTTPException):
+            await librarian.query(user_id="1", prompt="Outlook?", use_cache=False)
+
+    assert librarian.breaker.state == CircuitBreaker.CLOSED
+
+
+@pytest.mark.asyncio
+@patch("app.clients.librarian.backoff_delay", return_value=0)
+async def test_retries_stop_at_the_overall_deadline(_backoff, librarian: LibrarianClient, monkeypatch):
+    monkeypatch.setattr("app.core.config.settings.LIBRARIAN_TOTAL_TIMEOUT_SECONDS", 0.2)
+    monkeypatch.setattr("app.core.config.settings.LIBRARIAN_MAX_RETRIES", 100)
+    monkeypatch.setattr("app.core.config.settings.LIBRARIAN_HEDGE_ENABLED", False)
+    timeouts = []
+
+    async def slow_failure(self, payload, url, deadline):
+        timeouts.append(self._attempt_timeout(deadline).total)
+        await asyncio.sleep(0.05)
+        raise LibrarianRequestError("HTTP 502")
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    with patch.object(LibrarianClient, "_post", new=slow_failure):
+        with pytest.raises(HTTPException) as exc_info:
+            await librarian.query(user_id="1", prompt="Outlook?", use_cache=False)
+
+    assert exc_info.value.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert loop.time() - started < 0.5
+    assert len(timeouts) < 10
+    assert all(later < earlier for earlier, later in zip(timeouts, timeouts[1:]))
+
+
+@pytest.mark.asyncio
+async def test_open_breaker_fails_fast(librarian: LibrarianClient):
+    librarian.breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    librarian.breaker.record_failure()
+
+    with patch.object(LibrarianClient, "_post", new_callable=AsyncMock) as mock_post:
+        with pytest.raises(HTTPException) as exc_info:
+            await librarian.query(user_id="1", prompt="Outlook?", use_cache=False)
+
+    assert exc_info.value.headers["Retry-After"] == "60"
+    mock_post.assert_not_called()
+
+
+def test_breaker_half_open_trial():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0, trial_timeout=60)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    assert breaker.allow()  # reset timeout elapsed: one trial request
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+@pytest.mark.asyncio
+async def test_cancelled_half_open_trial_does_not_wedge_the_breaker(librarian: LibrarianClient):
+    librarian.breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0, trial_timeout=60)
+    librarian.breaker.record_failure()
+    started = asyncio.Event()
+
+    async def hang(*args, **kwargs):
+        started.set()
+        await asyncio.sleep(60)
+
+    with patch.object(LibrarianClient, "_post", new=hang):
+        trial = asyncio.create_task(librarian.query(user_id="1", prompt="Outlook?", use_cache=False))
+        await started.wait()
+        assert librarian.breaker.state == CircuitBreaker.HALF_OPEN
+        trial.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await trial
+
+    with patch.object(LibrarianClient, "_post", new_callable=AsyncMock) as mock_post:
+        mock_post.return_value = {"answer": "Back.", "sources": []}
+        response = await librarian.query(user_id="1", prompt="Outlook?", use_cache=False)
+
+    assert response["answer"] == "Back."
+    assert librarian.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_lost_half_open_trial_expires():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0, trial_timeout=0)
+    breaker.record_failure()
+    assert breaker.allow()  # The trial never reports back...
+    assert breaker.allow()  # ...so the next call becomes the trial
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+
+@pytest.mark.asyncio
+async def test_client_against_fake_librarian_server(librarian: LibrarianClient):
+    from aiohttp.test_utils import TestServer
+
+    from tests.mocks.librarian.server import FakeLibrarianConfig, create_app
+
+    config = FakeLibrarianConfig(latency_ms=1, jitter=0, stream_chunks=3, chunk_interval_ms=0)
+    async with TestServer(create_app(config)) as server:
+        librarian.api_url = str(server.make_url("/api/v1/chat"))
+        librarian.stream_api_url = str(server.make_url("/api/v1/chat/stream"))
+        librarian.batch_api_url = str(server.make_url("/api/v1/chat/batch"))
+        try:
+            answer = await librarian.query(user_id="1", prompt="Outlook?", use_cache=False)
+            chunks = [chunk async for chunk in librarian.stream_query(user_id="1", prompt="Outlook?")]
+            batch = await librarian.batch_query(user_id="1", prompts=["Outlook?", "BTC?"])
+            cached = await librarian.batch_query(user_id="1", prompts=["BTC?"])
+        finally:
+            await librarian.close()
+
+    assert answer["answer"].startswith("Stub answer")
+    assert [item["answer"] for item in batch] == ["Stub answer to: Outlook?", "Stub answer to: BTC?"]
+    assert cached == [batch[1]]
+    assert [chunk.get("token") for chunk in chunks[:3]] == ["tok0 ", "tok1 ", "tok2 "]
+    assert "sources" in chunks[-1]
+
+
+@pytest.mark.asyncio
+async def test_malformed_stream_chunk_is_a_bad_gateway(librarian: LibrarianClient):
+    from aiohttp import web
+    from aiohttp.test_utils import TestServer
+
+    async def chat_stream(request: web.Request) -> web.StreamResponse:
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        await response.write(b'data: {"token": "ok "}\n\ndata: {"token": \n\n')
+        return response
+
+    app = web.Application()
+    app.router.add_post("/api/v1/chat/stream", chat_stream)
+    async with TestServer(app) as server:
+        librarian.stream_api_url = str(server.make_url("/api/v1/chat/stream"))
+        chunks = []
+        try:
+            with pytest.raises(HTTPException) as exc_info:
+                async for chunk in librarian.stream_query(user_id="1", prompt="Outlook?"):
+                    chunks.append(chunk)
+        finally:
+            await librarian.close()
+
+    assert chunks == [{"token": "ok "}]
+    assert exc_info.value.status_code == status.HTTP_502_BAD_GATEWAY
@@ -0,0 +1,60 @@
+# trading_app/tests/test_live_valuation.py
+import asyncio
+import uuid
+
+import orjson
+import pytest
+
+from app.services.live_valuation import LatestValue, ValuationHub
+
+
+class _Hub(ValuationHub):
+    """Hub with canned holdings instead of a database and no Redis listener."""
+
+    def __init__(self, holdings):
+        super().__init__(None, redis=object(), price_channel="prices", holdings_channel="holdings")
+        self.canned = holdings
+
+    def start(self) -> None:
+        pass
+
+    async def _load(self, portfolio_id):
+        self._set_holdings(portfolio_id, self.canned[portfolio_id])
+
+
+@pytest.mark.asyncio
+async def test_latest_value_keeps_only_newest():
+    slot = LatestValue()
+    slot.put(1)
+    slot.put(2)
+    assert await slot.get() == 2
+    assert slot.coalesced == 1
+
+
+@pytest.mark.asyncio
+async def test_price_update_values_portfolio_once_for_all_clients():
+    portfolio_id = uuid.uuid4()
+    hub = _Hub({portfolio_id: {"BTC": (2.0, 100.0), "ETH": (10.0, 5.0)}})
+    hub.on_price("BTC", 110.0, 1)
+    hub.on_price("ETH", 6.0, 1)
+
+    clients = [await hub.subscribe(portfolio_id) for _ in range(50)]
+    initial = orjson.loads(await clients[0].get())
+    assert initial["market_value"] == pytest.approx(2 * 110 + 10 * 6)
+
+    valuations = hub.valuations
+    for tick, price in enumerate([120.0, 130.0, 140.0], start=2):
+        hub.on_price("BTC", price, tick)
+    hub.on_price("DOGE", 1.0, 2)  # not held: no work
+    await asyncio.sleep(0)
+
+    assert hub.valuations == valuations + 1
+    # Clients that had not read the initial value only see the latest one.
+    assert clients[1].coalesced == 1
+    payloads = [orjson.loads(await client.get()) for client in clients]
+    assert {p["market_value"] for p in payloads} == {2 * 140 + 10 * 6}
+    assert payloads[0]["unrealized_pnl"] == pytest.approx(2 * 40 + 10 * 1)
+
+    for client in clients:
+        hub.unsubscribe(portfolio_id, client)
+    assert hub._by_instrument == {}
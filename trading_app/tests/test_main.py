@@ -1,4 +1,7 @@
 # trading_app/tests/test_main.py
+import os
+import subprocess
+import sys
 
 import pytest
 from httpx import AsyncClient
@@ -11,4 +14,40 @@ async def test_health_check(client: AsyncClient):
     """
     response = await client.get("/health")
     assert response.status_code == status.HTTP_200_OK
-    assert response.json() == {"status": "ok"}
\ No newline at end of file
+    assert response.json() == {"status": "ok"}
+
+
+@pytest.mark.asyncio
+async def test_metrics_report_route_latency_and_component_stats(client: AsyncClient):
+    await client.get("/health")
+    response = await client.get("/metrics")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert 'http_request_duration_seconds_count{method="GET",route="/health",status="200"}' in body
+    assert "conversation_writer_queue_depth" in body
+    assert "db_write_pool_checked_out" in body
+    assert "db_read_pool_checked_out" in body
+    assert 'route="/metrics"' not in body
+
+
+_WORKER_SCRIPT = """
+from app.core.metrics import EVENT_LOOP_LAG, render_metrics, stats_collector
+EVENT_LOOP_LAG.observe(0.001)
+stats_collector.add("writer", lambda: {"queue_depth": 3})
+stats_collector.publish()
+print(render_metrics().decode())
+"""
+
+
+def test_multiprocess_metrics_aggregate_all_workers(tmp_path):
+    env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path)}
+    outputs = [
+        subprocess.run([sys.executable, "-c", _WORKER_SCRIPT], env=env, capture_output=True, text=True, check=True).stdout
+        for _ in range(2)
+    ]
+
+    # The second worker's scrape covers both workers.
+    assert "event_loop_lag_seconds_count 2.0" in outputs[1]
+    assert outputs[1].count("writer_queue_depth{pid=") == 2
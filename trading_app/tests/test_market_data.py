@@ -0,0 +1,102 @@
+# trading_app/tests/test_market_data.py
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import numpy as np
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.core.config import settings
+from app.crud import crud_market
+from app.services.market_data import CandleCache, Candles, lttb_indices, rebucket_ohlc
+
+
+def _candles(n: int, seed: int = 3) -> Candles:
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(size=n))
+    open_ = np.concatenate(([100.0], close[:-1]))
+    return Candles(
+        tick=np.arange(n, dtype=np.int64) * 60_000,
+        open=open_,
+        high=np.maximum(open_, close) + 1,
+        low=np.minimum(open_, close) - 1,
+        close=close,
+        volume=rng.uniform(1, 10, size=n),
+    )
+
+
+def test_rebucket_ohlc_preserves_extremes_and_volume():
+    candles = _candles(10_003)
+    bucketed = rebucket_ohlc(candles, 1_000)
+
+    assert len(bucketed) <= 1_000
+    assert bucketed.tick[0] == candles.tick[0]
+    assert bucketed.open[0] == candles.open[0]
+    assert bucketed.close[-1] == candles.close[-1]
+    assert bucketed.high.max() == candles.high.max()
+    assert bucketed.low.min() == candles.low.min()
+    assert np.isclose(bucketed.volume.sum(), candles.volume.sum())
+
+
+def test_lttb_keeps_endpoints_and_peaks():
+    candles = _candles(5_000)
+    candles.close[2_500] = 1_000.0  # a spike must survive downsampling
+    index = lttb_indices(candles.tick, candles.close, 500)
+
+    assert len(index) == 500
+    assert index[0] == 0 and index[-1] == 4_999
+    assert np.all(np.diff(index) > 0)
+    assert 2_500 in index
+
+
+def test_merge_replaces_forming_candle():
+    candles = _candles(10)
+    newer = candles.take(slice(9, None))
+    newer = Candles(**{**vars(newer), "close": newer.close + 5})
+    merged = candles.merge(newer, max_length=8)
+
+    assert len(merged) == 8
+    assert merged.close[-1] == candles.close[-1] + 5
+    assert merged.tick[0] == candles.tick[2]
+
+
+def test_candle_cache_evicts_by_memory_budget():
+    small = _candles(100)
+    cache = CandleCache(max_bytes=small.nbytes * 2)
+    cache.set(("A", "1"), small, fetched_at=0)
+    cache.set(("B", "1"), small, fetched_at=0)
+    cache.get(("A", "1"))  # "B" is now the least recently used entry
+    cache.set(("C", "1"), small, fetched_at=0)
+
+    assert cache.get(("B", "1")) is None
+    assert cache.get(("A", "1")) is not None
+    assert cache.nbytes == small.nbytes * 2
+
+    cache.set(("D", "1"), _candles(1_000), fetched_at=0)  # over budget on its own
+    assert cache.get(("D", "1")) is None
+    assert cache.stats()["evictions"] == 1
+
+
+@pytest.mark.asyncio
+async def test_chart_over_a_long_uncached_range_is_bucketed_in_sql(monkeypatch):
+    monkeypatch.setattr(settings, "MARKET_CANDLE_CACHE_WINDOW", 10)
+    recent = _candles(10)  # A full window: older history lives only in the DB
+    statements = []
+
+    class FakeSession:
+        async def execute(self, statement):
+            statements.append(statement)
+            if len(statements) == 1:
+                return SimpleNamespace(one=lambda: (0, 59_999_999, 1_000_000))
+            return SimpleNamespace(all=lambda: [(0, 1.0, 2.0, 0.5, 1.5, 10.0), (6_000_000, 1.5, 3.0, 1.0, 2.5, 20.0)])
+
+    with patch("app.crud.crud_market.get_recent_candles", AsyncMock(return_value=recent)), \
+            patch("app.crud.crud_market.fetch_candles", AsyncMock(side_effect=AssertionError("loaded row by row"))):
+        candles, source_points = await crud_market.get_chart_candles(
+            FakeSession(), instrument_name="BTC", resolution="1", start=None, end=None, max_points=1_000, method="lttb"
+        )
+
+    assert source_points == 1_000_000
+    assert candles.tick.tolist() == [0, 6_000_000]
+    sql = str(statements[1].compile(dialect=postgresql.dialect()))
+    assert "GROUP BY" in sql and "array_agg(public.ohlc.open ORDER BY public.ohlc.tick ASC)" in sql
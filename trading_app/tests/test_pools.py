@@ -0,0 +1,77 @@
+# trading_app/tests/test_pools.py
+import pytest
+
+from app.core.cache import TieredCache
+from app.core.config import settings
+from app.core.invalidation import InvalidationBus
+from app.core.pools import EnginePool, compute_worker_pools, split_engine_budget
+from tests.utils import FakeRedis
+
+
+def test_unbudgeted_workers_keep_the_configured_pools():
+    config = settings.model_copy(update={"WEB_CONCURRENCY": 4, "DB_CONNECTION_BUDGET": None})
+    pools = compute_worker_pools(config)
+    assert pools.write == EnginePool(config.DB_WRITE_POOL_SIZE, config.DB_WRITE_MAX_OVERFLOW)
+    assert pools.read == EnginePool(config.DB_READ_POOL_SIZE, config.DB_READ_MAX_OVERFLOW)
+
+
+def test_connection_budget_is_shared_between_workers_and_engines():
+    config = settings.model_copy(update={
+        "WEB_CONCURRENCY": 4,
+        "DB_CONNECTION_BUDGET": 60,
+        "DB_WRITE_POOL_SIZE": 5, "DB_WRITE_MAX_OVERFLOW": 5,
+        "DB_READ_POOL_SIZE": 10, "DB_READ_MAX_OVERFLOW": 10,
+        "LIBRARIAN_CONNECTION_BUDGET": 100,
+        "LIBRARIAN_POOL_LIMIT_PER_HOST": 50,
+    })
+    pools = compute_worker_pools(config)
+    assert pools.write == EnginePool(size=2, max_overflow=3)
+    assert pools.read == EnginePool(size=5, max_overflow=5)
+    assert (pools.write.connections + pools.read.connections) * pools.workers <= 60
+    assert pools.librarian_limit == 25
+    assert pools.librarian_limit_per_host == 25
+
+
+def test_job_workers_take_their_own_budget():
+    config = settings.model_copy(update={
+        "PROCESS_ROLE": "job",
+        "WEB_CONCURRENCY": None,
+        "DB_CONNECTION_BUDGET": 60,
+        "JOB_WORKER_PROCESSES": 2,
+        "JOB_DB_CONNECTION_BUDGET": 10,
+        "DB_WRITE_POOL_SIZE": 5, "DB_WRITE_MAX_OVERFLOW": 5,
+        "DB_READ_POOL_SIZE": 10, "DB_READ_MAX_OVERFLOW": 10,
+        "LIBRARIAN_CONNECTION_BUDGET": 100,
+        "JOB_LIBRARIAN_CONNECTION_BUDGET": None,
+    })
+    pools = compute_worker_pools(config)
+    assert pools.workers == 2
+    assert pools.write.connections + pools.read.connections == 5
+    assert pools.librarian_limit == config.LIBRARIAN_POOL_LIMIT
+
+
+def test_tiny_budgets_still_leave_each_engine_a_connection():
+    assert split_engine_budget(1, EnginePool(5, 5)) == EnginePool(size=1, max_overflow=0)
+    config = settings.model_copy(update={"WEB_CONCURRENCY": 8, "DB_CONNECTION_BUDGET": 8})
+    pools = compute_worker_pools(config)
+    assert pools.write.size == 1 and pools.read.size == 1
+
+
+@pytest.mark.asyncio
+async def test_cache_deletes_reach_other_workers_local_tiers():
+    redis = FakeRedis()
+    bus_a = InvalidationBus(redis=redis, channel="inv")
+    bus_b = InvalidationBus(redis=redis, channel="inv")
+    cache_a = TieredCache("user", maxsize=10, ttl=60, redis=redis, bus=bus_a)
+    cache_b = TieredCache("user", maxsize=10, ttl=60, redis=redis, bus=bus_b)
+    await cache_a.set("a@example.com", {"id": 1})
+    assert await cache_b.get("a@example.com") == {"id": 1}  # Now in B's local tier
+
+    await cache_a.delete("a@example.com")
+    [(channel, message)] = redis.published
+    assert channel == "inv"
+    bus_a._handle(message)  # A's own echo is ignored
+    assert bus_a.received == 0
+    bus_b._handle(message)
+    assert bus_b.received == 1
+    assert await cache_b.get("a@example.com") is None
@@ -0,0 +1,224 @@
+# trading_app/tests/test_positions.py
+import datetime
+import uuid
+from collections import defaultdict, deque
+from decimal import Decimal
+
+import numpy as np
+import pytest
+
+from app.crud import crud_position_snapshot
+from app.models.portfolio import PositionSnapshot, Transaction
+from app.schemas.transaction import TransactionCreate
+from app.services.positions import (
+    RunningCost,
+    SnapshotDelta,
+    TransactionArrays,
+    compute_positions,
+    holding_from_aggregates,
+)
+
+
+def _reference_fifo(rows):
+    """Straightforward lot-by-lot FIFO used as the oracle for the vectorized engine."""
+    lots = defaultdict(deque)
+    realized = defaultdict(float)
+    for ticker, side, qty, price, _ in sorted(rows, key=lambda r: (r[0], r[4])):
+        if side == "BUY":
+            lots[ticker].append([qty, price])
+            continue
+        remaining = qty
+        while remaining > 0 and lots[ticker]:
+            lot = lots[ticker][0]
+            used = min(lot[0], remaining)
+            realized[ticker] += used * (price - lot[1])
+            lot[0] -= used
+            remaining -= used
+            if lot[0] == 0:
+                lots[ticker].popleft()
+    basis = {t: sum(q * p for q, p in lots[t]) for t in lots}
+    return basis, realized
+
+
+def _reference_average(rows):
+    """Trade-by-trade running average cost, reset whenever the position is flat."""
+    held = defaultdict(float)
+    basis = defaultdict(float)
+    realized = defaultdict(float)
+    for ticker, side, qty, price, _ in sorted(rows, key=lambda r: (r[0], r[4])):
+        if side == "BUY":
+            held[ticker] += qty
+            basis[ticker] += qty * price
+            continue
+        matched = min(qty, held[ticker])
+        if matched == 0:
+            continue
+        average = basis[ticker] / held[ticker]
+        realized[ticker] += matched * (price - average)
+        held[ticker] -= matched
+        basis[ticker] = held[ticker] * average if held[ticker] > 1e-12 else 0.0
+    return basis, realized
+
+
+def _random_rows(n: int, seed: int = 7):
+    rng = np.random.default_rng(seed)
+    start = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+    held = defaultdict(float)
+    rows = []
+    for i in range(n):
+        ticker = f"T{rng.integers(0, 5)}"
+        qty = float(rng.integers(1, 50))
+        side = "SELL" if held[ticker] >= qty and rng.random() < 0.4 else "BUY"
+        held[ticker] += qty if side == "BUY" else -qty
+        rows.append((ticker, side, qty, float(rng.uniform(10, 200)), start + datetime.timedelta(minutes=i)))
+    return rows
+
+
+def _mixed_rows(n: int, seed: int = 11):
+    """Buys and sells in any order, including sells of more than is held."""
+    rng = np.random.default_rng(seed)
+    start = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+    return [
+        (f"T{rng.integers(0, 4)}", "SELL" if rng.random() < 0.45 else "BUY",
+         float(rng.integers(1, 50)), float(rng.uniform(10, 200)), start + datetime.timedelta(minutes=i))
+        for i in range(n)
+    ]
+
+
+def test_fifo_matches_reference_implementation():
+    rows = _random_rows(500)
+    positions = compute_positions(TransactionArrays.from_rows(rows))
+    expected_basis, expected_realized = _reference_fifo(rows)
+
+    for i, ticker in enumerate(positions.tickers):
+        assert positions.fifo_cost_basis[i] == pytest.approx(expected_basis[ticker])
+        assert positions.realized_pnl_fifo[i] == pytest.approx(expected_realized[ticker])
+
+
+@pytest.mark.parametrize("rows", [_random_rows(500), _mixed_rows(2_000)])
+def test_positions_match_references_for_mixed_buys_and_sells(rows):
+    positions = compute_positions(TransactionArrays.from_rows(rows))
+    fifo_basis, fifo_realized = _reference_fifo(rows)
+    average_basis, average_realized = _reference_average(rows)
+
+    for i, ticker in enumerate(positions.tickers):
+        assert positions.fifo_cost_basis[i] == pytest.approx(fifo_basis[ticker])
+        assert positions.realized_pnl_fifo[i] == pytest.approx(fifo_realized[ticker])
+        assert positions.average_cost_basis[i] == pytest.approx(average_basis[ticker], abs=1e-6)
+        assert positions.realized_pnl_average[i] == pytest.approx(average_realized[ticker])
+
+
+def test_average_cost_resets_after_the_position_is_closed():
+    day = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+    rows = [
+        ("AAPL", "BUY", 10.0, 100.0, day),
+        ("AAPL", "SELL", 10.0, 110.0, day + datetime.timedelta(days=1)),
+        ("AAPL", "BUY", 10.0, 200.0, day + datetime.timedelta(days=2)),
+    ]
+    [record] = compute_positions(TransactionArrays.from_rows(rows)).to_records()
+
+    assert record["realized_pnl_average"] == pytest.approx(100)
+    assert record["average_cost"] == pytest.approx(200)
+    assert record["average_cost_basis"] == pytest.approx(2000)
+
+
+def test_sell_before_any_buy_is_left_unmatched():
+    day = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+    rows = [
+        ("AAPL", "SELL", 5.0, 100.0, day),
+        ("AAPL", "BUY", 10.0, 50.0, day + datetime.timedelta(days=1)),
+    ]
+    [record] = compute_positions(TransactionArrays.from_rows(rows)).to_records()
+
+    assert record["quantity"] == 5
+    assert record["realized_pnl_fifo"] == 0
+    assert record["realized_pnl_average"] == 0
+    assert record["fifo_cost_basis"] == pytest.approx(500)
+    assert record["average_cost"] == pytest.approx(50)
+
+
+def test_simple_position():
+    day = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+    rows = [
+        ("AAPL", "BUY", 10.0, 100.0, day),
+        ("AAPL", "BUY", 10.0, 120.0, day + datetime.timedelta(days=1)),
+        ("AAPL", "SELL", 15.0, 130.0, day + datetime.timedelta(days=2)),
+    ]
+    [record] = compute_positions(TransactionArrays.from_rows(rows)).to_records()
+
+    assert record["quantity"] == 5
+    assert record["average_cost"] == pytest.approx(110)
+    assert record["fifo_cost_basis"] == pytest.approx(5 * 120)
+    assert record["realized_pnl_fifo"] == pytest.approx(15 * 130 - (10 * 100 + 5 * 120))
+    assert record["realized_pnl_average"] == pytest.approx(15 * (130 - 110))
+
+
+def test_empty_portfolio():
+    assert compute_positions(TransactionArrays.from_rows([])).to_records() == []
+
+
+@pytest.mark.parametrize("rows", [_random_rows(200), _mixed_rows(300)])
+def test_snapshot_deltas_match_full_recompute_and_revert_exactly(rows):
+    delta = SnapshotDelta()
+    running = RunningCost()
+    for ticker, side, qty, price, _ in rows:
+        if ticker == "T0":
+            delta.add(side, Decimal(str(qty)), Decimal(str(price)))
+            running.apply(side, Decimal(str(qty)), Decimal(str(price)))
+
+    positions = compute_positions(TransactionArrays.from_rows(rows))
+    i = list(positions.tickers).index("T0")
+    holding = holding_from_aggregates("T0", delta.buy_quantity, delta.sell_quantity, running.held_quantity,
+                                      running.held_cost, running.realized_pnl, delta.transaction_count)
+    assert float(holding["quantity"]) == pytest.approx(positions.quantity[i])
+    assert float(holding["average_cost"]) == pytest.approx(positions.average_cost[i])
+    assert float(holding["cost_basis"]) == pytest.approx(positions.average_cost_basis[i], abs=1e-6)
+    assert float(holding["realized_pnl"]) == pytest.approx(positions.realized_pnl_average[i])
+
+    ticker, side, qty, price, _ = next(row for row in rows if row[0] == "T0")
+    before = SnapshotDelta(**vars(delta))
+    delta.add(side, Decimal(str(qty)), Decimal(str(price)))
+    delta.add(side, Decimal(str(qty)), Decimal(str(price)), sign=-1)
+    assert delta == before
+
+
+class _SnapshotSession:
+    """Answers every query with `snapshot`, like a portfolio with one position."""
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+
+    async def execute(self, statement):
+        snapshot = self.snapshot
+
+        class Result:
+            def scalars(self):
+                return self
+
+            def first(self):
+                return snapshot
+
+        return Result()
+
+
+@pytest.mark.asyncio
+async def test_naive_transaction_dates_advance_an_existing_snapshot():
+    last = datetime.datetime(2024, 1, 2, tzinfo=datetime.timezone.utc)
+    snapshot = PositionSnapshot(
+        held_quantity=Decimal("2"), held_cost=Decimal("200"), realized_pnl=Decimal("0"), last_transaction_date=last
+    )
+    naive = datetime.datetime(2024, 1, 3, 12)
+    assert TransactionCreate(
+        portfolio_id=uuid.uuid4(), instrument_ticker="BTC", transaction_type="SELL",
+        quantity="1", price="150", transaction_date=naive,
+    ).transaction_date == naive.replace(tzinfo=datetime.timezone.utc)
+
+    transaction = Transaction(
+        portfolio_id=uuid.uuid4(), instrument_ticker="BTC", transaction_type="SELL",
+        quantity=Decimal("1"), price=Decimal("150"), transaction_date=naive,
+    )
+    await crud_position_snapshot.advance_running_cost(_SnapshotSession(snapshot), transaction=transaction)
+
+    assert snapshot.held_quantity == Decimal("1")
+    assert snapshot.held_cost == Decimal("100")
+    assert snapshot.realized_pnl == Decimal("50")
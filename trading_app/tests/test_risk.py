@@ -0,0 +1,48 @@
+# trading_app/tests/test_risk.py
+import numpy as np
+import pytest
+
+from app.services.risk import PriceMatrix, compute_risk
+
+
+def _matrix(n_periods: int = 500, n_instruments: int = 4, seed: int = 11) -> PriceMatrix:
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0.0005, 0.02, size=(n_periods, n_instruments))
+    closes = 100 * np.cumprod(1 + returns, axis=0)
+    return PriceMatrix(
+        tick=np.arange(n_periods, dtype=np.int64) * 86_400_000,
+        tickers=[f"T{i}" for i in range(n_instruments)],
+        closes=closes,
+    )
+
+
+def test_risk_matches_per_metric_reference():
+    matrix = _matrix()
+    quantities = np.array([10.0, 5.0, 20.0, 1.0])
+    report = compute_risk(matrix, quantities, benchmark=matrix.closes[:, 0], window=20, periods_per_year=365)
+
+    returns = matrix.closes[1:] / matrix.closes[:-1] - 1
+    exposure = quantities * matrix.closes[-1]
+    portfolio_returns = returns @ (exposure / exposure.sum())
+
+    assert report["portfolio_value"] == pytest.approx(exposure.sum())
+    assert report["volatility"] == pytest.approx(portfolio_returns.std(ddof=1) * np.sqrt(365))
+    np.testing.assert_allclose(report["correlation"], np.corrcoef(returns.T), atol=1e-12)
+    assert report["rolling_volatility"][-1] == pytest.approx(portfolio_returns[-20:].std(ddof=1) * np.sqrt(365))
+    assert len(report["rolling_volatility"]) == len(report["rolling_volatility_tick"])
+    assert report["var_historical"] == pytest.approx(-np.quantile(portfolio_returns, 0.05) * exposure.sum())
+    assert report["var_parametric"] > 0
+
+    growth = np.cumprod(1 + portfolio_returns)
+    assert report["max_drawdown"] == pytest.approx((1 - growth / np.maximum.accumulate(growth)).max())
+
+    benchmark_returns = returns[:, 0]
+    expected_beta = np.cov(portfolio_returns, benchmark_returns)[0, 1] / benchmark_returns.var(ddof=1)
+    assert report["beta"] == pytest.approx(expected_beta)
+
+
+def test_risk_with_no_history():
+    matrix = PriceMatrix(tick=np.empty(0, dtype=np.int64), tickers=[], closes=np.empty((0, 0)))
+    report = compute_risk(matrix, np.empty(0))
+    assert report["volatility"] is None
+    assert report["correlation"] == []
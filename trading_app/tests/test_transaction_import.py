@@ -0,0 +1,126 @@
+# trading_app/tests/test_transaction_import.py
+import datetime
+import uuid
+from decimal import Decimal
+
+import pytest
+
+from app.services.transaction_import import (
+    ImportReport,
+    iter_lines,
+    iter_raw_rows,
+    iter_valid_records,
+)
+
+
+def chunked_reader(data: bytes, chunk_size: int = 7):
+    """Returns an UploadFile.read-like coroutine that serves tiny chunks."""
+    offset = 0
+
+    async def read(_size: int) -> bytes:
+        nonlocal offset
+        chunk = data[offset:offset + chunk_size]
+        offset += chunk_size
+        return chunk
+
+    return read
+
+
+async def _collect(data: bytes, file_format: str, max_errors: int = 10):
+    report = ImportReport(max_errors=max_errors)
+    portfolio_id = uuid.uuid4()
+    raw_rows = iter_raw_rows(iter_lines(chunked_reader(data)), file_format)
+    records = [record async for record in iter_valid_records(raw_rows, portfolio_id, report)]
+    return records, report
+
+
+@pytest.mark.asyncio
+async def test_csv_import_validates_rows_across_chunk_boundaries():
+    data = (
+        "instrument_ticker,transaction_type,quantity,price,transaction_date\r\n"
+        "AAPL,BUY,10,150.25,2024-01-02T10:00:00Z\r\n"
+        "AAPL,HOLD,10,150.25,2024-01-02T10:00:00Z\r\n"
+        "MSFT,SELL,-1,300,2024-01-03T10:00:00Z\r\n"
+        "\r\n"
+        "MSFT,SELL,2,310.5,2024-01-04T10:00:00Z"
+    ).encode()
+
+    records, report = await _collect(data, "csv")
+
+    assert [(r[2], r[3], r[4]) for r in records] == [
+        ("AAPL", "BUY", Decimal("10")),
+        ("MSFT", "SELL", Decimal("2")),
+    ]
+    assert report.rows_total == 4
+    assert report.rows_rejected == 2
+    assert [error["row"] for error in report.errors] == [2, 3]
+    assert report.errors[0]["errors"][0].startswith("transaction_type")
+
+
+@pytest.mark.asyncio
+async def test_ndjson_import_reports_bad_json_and_caps_errors():
+    data = (
+        b'{"instrument_ticker": "BTC\xc3\xa9", "transaction_type": "BUY", "quantity": "0.5",'
+        b' "price": "42000", "transaction_date": "2024-01-02T10:00:00Z"}\n'
+        b"not json\n"
+        b"[1, 2]\n"
+    )
+
+    records, report = await _collect(data, "ndjson", max_errors=1)
+
+    assert len(records) == 1
+    assert records[0][2] == "BTCé"
+    assert report.rows_rejected == 2
+    assert len(report.errors) == 1
+
+
+@pytest.mark.asyncio
+async def test_naive_and_aware_dates_mix_as_utc():
+    data = (
+        b'{"instrument_ticker": "BTC", "transaction_type": "BUY", "quantity": "1", "price": "10",'
+        b' "transaction_date": "2024-01-02T10:00:00+02:00"}\n'
+        b'{"instrument_ticker": "BTC", "transaction_type": "BUY", "quantity": "1", "price": "10",'
+        b' "transaction_date": "2024-01-02T09:00:00"}\n'
+    )
+
+    records, report = await _collect(data, "ndjson")
+
+    assert report.rows_rejected == 0
+    assert [r[6] for r in records] == [
+        datetime.datetime(2024, 1, 2, 8, tzinfo=datetime.timezone.utc),
+        datetime.datetime(2024, 1, 2, 9, tzinfo=datetime.timezone.utc),
+    ]
+    assert report.earliest_date == datetime.datetime(2024, 1, 2, 8, tzinfo=datetime.timezone.utc)
+
+
+@pytest.mark.asyncio
+async def test_values_beyond_the_column_precision_are_rejected():
+    data = (
+        "instrument_ticker,transaction_type,quantity,price,transaction_date\n"
+        "AAPL,BUY,1e12,150,2024-01-02T10:00:00Z\n"
+        "AAPL,BUY,1,0.123456789,2024-01-02T10:00:00Z\n"
+        "AAPL,BUY,99999999999.12345678,150,2024-01-02T10:00:00Z\n"
+    ).encode()
+
+    records, report = await _collect(data, "csv")
+
+    assert len(records) == 1
+    assert [error["row"] for error in report.errors] == [1, 2]
+    assert report.errors[0]["errors"][0].startswith("quantity")
+    assert report.errors[1]["errors"][0].startswith("price")
+
+
+@pytest.mark.asyncio
+async def test_csv_quoted_fields_may_span_lines():
+    data = (
+        'instrument_ticker,transaction_type,quantity,price,transaction_date\r\n'
+        '"AA\r\n\r\nPL",BUY,1,150,2024-01-02T10:00:00Z\r\n'
+        '"MSFT","SELL","2","310.5","2024-01-04T10:00:00Z"\r\n'
+        '"BROKEN,BUY,1,1,2024-01-04T10:00:00Z\r\n'
+    ).encode()
+
+    records, report = await _collect(data, "csv")
+
+    assert [r[2] for r in records] == ["AA\n\nPL", "MSFT"]
+    assert report.rows_total == 3
+    assert report.errors == [{"row": 3, "errors": ["unterminated quoted field"]}]
@@ -0,0 +1,84 @@
+# trading_app/tests/test_transactions_api.py
+import datetime
+import uuid
+from unittest.mock import patch
+
+import orjson
+import pytest
+from httpx import AsyncClient
+from starlette import status
+
+from app.api.deps import get_current_user
+from app.api.v1.transactions import _decode_cursor, _encode_cursor, router
+from app.core.admission import admission_controller
+from app.db.session import get_db
+from app.main import app
+from app.models.portfolio import Transaction
+from tests.utils import get_test_user
+
+
+def test_cursor_round_trip():
+    transaction = Transaction(
+        id=uuid.uuid4(),
+        transaction_date=datetime.datetime(2024, 5, 1, 12, 30, tzinfo=datetime.timezone.utc),
+    )
+    assert _decode_cursor(_encode_cursor(transaction)) == (
+        transaction.transaction_date,
+        transaction.id,
+    )
+
+
+@pytest.mark.asyncio
+async def test_list_transactions_rejects_invalid_cursor(client: AsyncClient):
+    app.dependency_overrides[get_current_user] = get_test_user
+    try:
+        response = await client.get("/api/v1/transactions", params={"cursor": "not-a-cursor"})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.asyncio
+async def test_list_transactions_unauthenticated(client: AsyncClient):
+    response = await client.get("/api/v1/transactions")
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.asyncio
+async def test_ndjson_export_holds_its_slot_until_the_body_is_sent(client: AsyncClient):
+    pool = admission_controller.pools["crud"]
+    active_while_streaming = []
+
+    class FakeSession:
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc_info):
+            return False
+
+    async def stream_transactions(db, query):
+        active_while_streaming.append(pool.active)
+        yield Transaction(
+            id=uuid.uuid4(), portfolio_id=uuid.uuid4(), instrument_ticker="BTC", transaction_type="BUY",
+            quantity=1, price=100, transaction_date=datetime.datetime(2024, 5, 1, tzinfo=datetime.timezone.utc),
+        )
+
+    app.dependency_overrides[get_current_user] = get_test_user
+    try:
+        with patch("app.api.v1.transactions.AsyncSessionLocal", FakeSession), \
+                patch("app.crud.crud_transaction.stream_transactions", stream_transactions):
+            response = await client.get("/api/v1/transactions", params={"format": "ndjson"})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == status.HTTP_200_OK
+    assert orjson.loads(response.text)["instrument_ticker"] == "BTC"
+    assert active_while_streaming == [1]
+    assert pool.active == 0
+
+
+def test_mutating_endpoints_use_the_primary():
+    for route in router.routes:
+        if route.methods & {"POST", "PUT", "PATCH", "DELETE"}:
+            assert get_db in {dependency.call for dependency in route.dependant.dependencies}, route.path
@@ -0,0 +1,78 @@
+# trading_app/tests/test_warmup.py
+import asyncio
+from contextlib import asynccontextmanager
+from unittest.mock import patch
+
+import pytest
+from httpx import AsyncClient
+from starlette import status
+
+from app.main import readiness
+from app.services.warmup import Readiness, warm_db_pool
+
+
+@pytest.mark.asyncio
+@patch("app.services.warmup.settings.WARMUP_RETRY_SECONDS", 0)
+async def test_required_phases_retry_and_optional_failures_do_not_block():
+    attempts = 0
+
+    async def flaky_db():
+        nonlocal attempts
+        attempts += 1
+        if attempts < 3:
+            raise ConnectionError("pgbouncer not up yet")
+
+    async def broken_librarian():
+        raise ConnectionError("librarian down")
+
+    state = Readiness()
+    state.start(("db_pool", flaky_db, True), ("librarian_pool", broken_librarian, False))
+    await state._task
+
+    assert state.ready
+    assert attempts == 3
+    assert set(state.timings) == {"db_pool", "librarian_pool", "warmup_total"}
+    assert list(state.errors) == ["librarian_pool"]
+
+
+@pytest.mark.asyncio
+async def test_failed_db_pool_warmup_returns_every_connection():
+    held = 0
+    attempts = 0
+
+    class FlakyConnection:
+        async def execute(self, statement):
+            if attempts == 3:
+                raise ConnectionError("too many clients")
+
+    class FakeEngine:
+        @asynccontextmanager
+        async def connect(self):
+            nonlocal held, attempts
+            attempts += 1
+            held += 1
+            try:
+                yield FlakyConnection()
+            finally:
+                held -= 1
+
+    with pytest.raises(ExceptionGroup):
+        await asyncio.wait_for(warm_db_pool(FakeEngine(), connections=3), timeout=1)
+
+    assert held == 0
+
+
+@pytest.mark.asyncio
+async def test_ready_endpoint_gates_on_warmup(client: AsyncClient):
+    readiness.ready = False
+    response = await client.get("/ready")
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert response.json()["status"] == "starting"
+
+    readiness.ready = True
+    try:
+        response = await client.get("/ready")
+    finally:
+        readiness.ready = False
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["status"] == "ready"
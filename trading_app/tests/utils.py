@@ -0,0 +1,119 @@
+# trading_app/tests/utils.py
+import uuid
+
+from faker import Faker
+from httpx import AsyncClient
+
+from app.models.user import User
+
+fake = Faker()
+
+class FakeRedis:
+    """Minimal in-memory stand-in for the redis.asyncio commands the cache uses."""
+
+    def __init__(self):
+        self.store = {}
+        self.published = []
+        self.acked = []
+
+    async def get(self, key):
+        return self.store.get(key)
+
+    async def set(self, key, value, ex=None, px=None, nx=False):
+        if nx and key in self.store:
+            return None
+        self.store[key] = value
+        return True
+
+    async def delete(self, key):
+        self.store.pop(key, None)
+
+    async def mget(self, keys):
+        return [self.store.get(key) for key in keys]
+
+    async def incr(self, key):
+        self.store[key] = int(self.store.get(key, 0)) + 1
+        return self.store[key]
+
+    async def exists(self, key):
+        return int(key in self.store)
+
+    async def expire(self, key, seconds):
+        return key in self.store
+
+    async def hset(self, key, field=None, value=None, mapping=None):
+        fields = self.store.setdefault(key, {})
+        if field is not None:
+            fields[field] = value
+        fields.update(mapping or {})
+
+    async def hgetall(self, key):
+        return {
+            field.encode(): value if isinstance(value, bytes) else str(value).encode()
+            for field, value in self.store.get(key, {}).items()
+        }
+
+    async def hincrby(self, key, field, amount=1):
+        fields = self.store.setdefault(key, {})
+        fields[field] = int(fields.get(field, 0)) + amount
+        return fields[field]
+
+    async def publish(self, channel, message):
+        self.published.append((channel, message))
+        return 0
+
+    async def xadd(self, name, fields, maxlen=None, approximate=True):
+        stream = self.store.setdefault(name, [])
+        message_id = f"{len(stream) + 1}-0".encode()
+        stream.append((message_id, {key.encode(): value for key, value in fields.items()}))
+        return message_id
+
+    async def xack(self, name, group, *message_ids):
+        self.acked.extend(message_ids)
+        return len(message_ids)
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+class FakePipeline:
+    """Queues commands and runs them against the FakeRedis on execute()."""
+
+    def __init__(self, redis: FakeRedis):
+        self.redis = redis
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.commands.clear()
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.commands.append((name, args, kwargs))
+
+    async def execute(self):
+        return [await getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.commands]
+
+def get_test_user() -> User:
+    """
+    A detached, active user for overriding `get_current_user` in tests
+    that should not touch the database.
+    """
+    return User(id=uuid.uuid4(), email=fake.email(), is_active=True)
+
+async def get_user_token_headers(client: AsyncClient) -> dict[str, str]:
+    """
+    Registers a fresh user through the API and returns its bearer headers.
+    """
+    email = fake.email()
+    password = fake.password()
+    await client.post(
+        "/api/v1/auth/register",
+        json={"email": email, "password": password},
+    )
+    response = await client.post(
+        "/api/v1/auth/login",
+        data={"username": email, "password": password},
+    )
+    token = response.json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}